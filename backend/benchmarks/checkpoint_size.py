@@ -0,0 +1,123 @@
+"""Measure checkpoint bytes of a research run with the compact and the legacy source layout.
+
+Runs the graph against the fake Gemini backend with an in-memory checkpointer,
+which serializes like the Postgres checkpointer (JsonPlusSerializer, one blob per
+changed channel per superstep, plus the pending writes of every task), and sums
+the serialized bytes. The legacy layout replays the previous state shape: every
+citation's `{"label", "short_url", "value"}` source dicts appended to
+`sources_gathered` by each `web_research` branch.
+
+Example:
+    python benchmarks/checkpoint_size.py --queries 3 --loops 3
+"""
+
+import argparse
+import importlib
+import json
+import os
+from typing import Any, Dict
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+
+import fake_gemini  # noqa: E402
+
+graph_module = importlib.import_module("agent.graph")
+
+
+def _size(typed: Any) -> int:
+    return len(typed[1]) if typed else 0
+
+
+def checkpoint_bytes(saver: InMemorySaver) -> Dict[str, int]:
+    """Return the serialized bytes held by `saver`, split by checkpoints, channel blobs and writes."""
+    checkpoints = sum(
+        _size(checkpoint) + _size(metadata)
+        for namespaces in saver.storage.values()
+        for checkpoints in namespaces.values()
+        for checkpoint, metadata, _ in checkpoints.values()
+    )
+    blobs = sum(_size(blob) for blob in saver.blobs.values())
+    writes = sum(
+        _size(write[2])
+        for task_writes in saver.writes.values()
+        for write in task_writes.values()
+    )
+    source_blobs = sum(
+        _size(blob)
+        for (_, _, channel, _), blob in saver.blobs.items()
+        if channel in ("source_table", "sources_gathered")
+    )
+    return {
+        "checkpoints": checkpoints,
+        "channel_blobs": blobs,
+        "source_channel_blobs": source_blobs,
+        "writes": writes,
+        "total": checkpoints + blobs + writes,
+    }
+
+
+def use_legacy_layout() -> None:
+    """Make `web_research` write the previous per-citation source lists."""
+    web_research_update = graph_module._web_research_update
+    graph_module.build_source_table = list
+
+    def legacy_update(state, response):
+        update = web_research_update(state, response)
+        update["sources_gathered"] = update.pop("source_table")
+        return update
+
+    graph_module._web_research_update = legacy_update
+
+
+def run(args) -> Dict[str, int]:
+    """Run one research question on a fresh checkpointer and return its byte counts."""
+    saver = InMemorySaver()
+    graph = graph_module.graph.copy(update={"checkpointer": saver})
+    graph.invoke(
+        {
+            "messages": [
+                HumanMessage(
+                    content="What changed in grid-scale energy storage this year?"
+                )
+            ],
+            "initial_search_query_count": args.queries,
+            "max_research_loops": args.loops,
+        },
+        {"configurable": {"thread_id": "checkpoint-size"}},
+    )
+    return checkpoint_bytes(saver)
+
+
+def main() -> None:
+    """Measure both layouts and print the comparison as JSON."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--queries", type=int, default=3, help="Initial search queries")
+    parser.add_argument("--loops", type=int, default=3, help="Research loops")
+    args = parser.parse_args()
+
+    fake_gemini.install(graph_module)
+    compact = run(args)
+    use_legacy_layout()
+    legacy = run(args)
+    print(
+        json.dumps(
+            {
+                "queries": args.queries,
+                "loops": args.loops,
+                "legacy_bytes": legacy,
+                "compact_bytes": compact,
+                "total_reduction": f"{1 - compact['total'] / legacy['total']:.0%}",
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
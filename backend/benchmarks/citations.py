@@ -0,0 +1,113 @@
+"""Micro-benchmark of the citation pipeline on synthetic answers.
+
+Compares the single-pass `insert_citation_markers` / `expand_short_urls` with the
+previous implementations, which re-sliced the text once per citation and ran one
+full-text `replace` per gathered source. No model is called.
+"""
+
+import argparse
+import os
+import random
+import timeit
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from agent.utils import (  # noqa: E402
+    SHORT_URL_PREFIX,
+    expand_short_urls,
+    insert_citation_markers,
+)
+
+
+def legacy_insert_citation_markers(text, citations_list):
+    """Insert markers by rebuilding the string once per citation."""
+    sorted_citations = sorted(
+        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    )
+    modified_text = text
+    for citation_info in sorted_citations:
+        end_idx = citation_info["end_index"]
+        marker_to_insert = ""
+        for segment in citation_info["segments"]:
+            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
+        modified_text = (
+            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+        )
+    return modified_text
+
+
+def legacy_expand_short_urls(text, sources):
+    """Expand short urls with one full-text replace per source."""
+    for source in sources:
+        if source["short_url"] in text:
+            text = text.replace(source["short_url"], source["value"])
+    return text
+
+
+def synthetic_case(size: int, citations: int, seed: int = 0):
+    """Return a text of `size` characters, its citations and the matching sources."""
+    rng = random.Random(seed)
+    words = ["solar", "capacity", "grew", "by", "percent", "in", "2024", "wind", "grid"]
+    text = " ".join(rng.choice(words) for _ in range(size // 5))[:size]
+    sources = [
+        {
+            "label": f"site{i}",
+            "short_url": f"{SHORT_URL_PREFIX}{i // 10}-{i % 10}",
+            "value": f"https://vertexaisearch.cloud.google.com/grounding-api-redirect/{'x' * 200}{i}",
+        }
+        for i in range(citations)
+    ]
+    citations_list = []
+    for i in range(citations):
+        end = rng.randrange(1, size)
+        citations_list.append(
+            {
+                "start_index": rng.randrange(0, end),
+                "end_index": end,
+                "segments": [sources[i], sources[rng.randrange(citations)]],
+            }
+        )
+    return text, citations_list, sources
+
+
+def main() -> None:
+    """Time both pipelines and check that they produce the same output."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--size", type=int, default=50_000, help="Answer size in characters"
+    )
+    parser.add_argument(
+        "--citations", type=int, default=500, help="Number of citations"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions")
+    args = parser.parse_args()
+
+    text, citations_list, sources = synthetic_case(args.size, args.citations)
+    marked = insert_citation_markers(text, citations_list)
+    assert marked == legacy_insert_citation_markers(text, citations_list)
+    assert expand_short_urls(marked, sources)[0] == legacy_expand_short_urls(
+        marked, sources
+    )
+
+    cases = {
+        "insert_citation_markers": (
+            lambda: legacy_insert_citation_markers(text, citations_list),
+            lambda: insert_citation_markers(text, citations_list),
+        ),
+        "expand_short_urls": (
+            lambda: legacy_expand_short_urls(marked, sources),
+            lambda: expand_short_urls(marked, sources),
+        ),
+    }
+    print(f"{args.size} chars, {args.citations} citations")
+    print(f"{'step':<24} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for name, (legacy, current) in cases.items():
+        legacy_ms = min(timeit.repeat(legacy, number=1, repeat=args.repeat)) * 1000
+        current_ms = min(timeit.repeat(current, number=1, repeat=args.repeat)) * 1000
+        print(
+            f"{name:<24} {legacy_ms:>10.2f} {current_ms:>15.2f} {legacy_ms / current_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
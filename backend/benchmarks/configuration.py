@@ -0,0 +1,72 @@
+"""Compare per-call configuration resolution with and without caching.
+
+Times `Configuration.from_runnable_config` against the previous implementation,
+which read the environment and validated a fresh model on every call, for the
+kind of config each node and fan-out branch receives. No model is called.
+
+Example:
+    python benchmarks/configuration.py --calls 100000
+"""
+
+import argparse
+import os
+import time
+from typing import Any, Callable, Dict
+
+from agent.configuration import Configuration
+
+
+def legacy_from_runnable_config(config: Dict[str, Any]) -> Configuration:
+    """Build the configuration uncached: env lookups and a full validation per call."""
+    configurable = config["configurable"] if config and "configurable" in config else {}
+    raw_values = {
+        name: os.environ.get(name.upper(), configurable.get(name))
+        for name in Configuration.model_fields.keys()
+    }
+    values = {k: v for k, v in raw_values.items() if v is not None}
+    return Configuration(**values)
+
+
+def per_call_us(
+    fn: Callable[[Dict[str, Any]], Configuration], config: Dict[str, Any], calls: int
+) -> float:
+    """Return the mean time of `fn(config)` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(config)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main() -> None:
+    """Run the comparison and print a table."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--calls", type=int, default=100000, help="Calls per implementation"
+    )
+    args = parser.parse_args()
+
+    # A node's config carries run metadata besides the agent settings
+    config = {
+        "configurable": {
+            "thread_id": "b2f5c0de",
+            "checkpoint_ns": "web_research:1",
+            "query_generator_model": "gemini-2.0-flash",
+            "max_research_loops": 3,
+        }
+    }
+    assert legacy_from_runnable_config(config) == Configuration.from_runnable_config(
+        config
+    )
+
+    legacy = per_call_us(legacy_from_runnable_config, config, args.calls)
+    cached = per_call_us(Configuration.from_runnable_config, config, args.calls)
+    print(f"{'implementation':<16} {'us/call':>10}")
+    print(f"{'uncached':<16} {legacy:>10.2f}")
+    print(f"{'cached':<16} {cached:>10.2f}")
+    print(f"speedup: {legacy / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
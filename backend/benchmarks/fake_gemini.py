@@ -0,0 +1,326 @@
+"""Deterministic local stand-ins for the Gemini clients used by `agent.graph`.
+
+`FakeGenaiClient` replaces the google genai client used for grounded search and
+returns responses with grounding chunks and supports, either replayed from a
+recording or synthesized. `FakeChatModel` replaces `ChatGoogleGenerativeAI` for
+query generation, reflection and the final answer. Both sleep according to a
+configurable latency distribution instead of calling the network.
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, ConfigDict
+
+from agent.clients import set_genai_client
+from agent.search_cache import normalize_query, payload_to_response
+from agent.utils import SHORT_URL_PREFIX
+
+WORDS = (
+    "solar wind grid storage capacity growth policy market price demand supply "
+    "battery hydrogen emissions investment efficiency forecast report region"
+).split()
+
+
+class LatencyModel:
+    """A latency distribution, parsed from `fixed:S`, `uniform:LO:HI` or `lognormal:MEDIAN:SIGMA`."""
+
+    def __init__(self, spec: str = "fixed:0", seed: int = 0):
+        kind, *args = spec.split(":")
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(arg) for arg in args]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Return one latency in seconds."""
+        with self._lock:
+            if self.kind == "fixed":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.args)
+            median, sigma = self.args
+            return self._rng.lognormvariate(0, sigma) * median
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    return f"{topic.capitalize()} {' '.join(rng.choice(WORDS) for _ in range(12))}."
+
+
+def synthetic_payload(
+    query: str, chunks: int = 5, sentences: int = 8
+) -> Dict[str, Any]:
+    """Build a grounded search payload (text, grounding chunks and supports) for `query`.
+
+    The payload is deterministic in the normalized query.
+    """
+    rng = random.Random(normalize_query(query))
+    text, supports = "", []
+    for _ in range(sentences):
+        sentence = _sentence(rng, query)
+        start = len(text)
+        text += sentence + " "
+        supports.append(
+            {
+                "start_index": start,
+                "end_index": start + len(sentence),
+                "grounding_chunk_indices": rng.sample(range(chunks), k=min(2, chunks)),
+            }
+        )
+    return {
+        "text": text.strip(),
+        "chunks": [
+            {
+                "uri": f"https://vertexaisearch.cloud.google.com/grounding-api-redirect/{rng.getrandbits(256):064x}",
+                "title": f"{rng.choice(WORDS)}{idx}.com",
+            }
+            for idx in range(chunks)
+        ],
+        "supports": supports,
+    }
+
+
+def _stream_chunks(response) -> List[Any]:
+    # Text in small pieces, with the grounding metadata on the last chunk as Gemini sends it
+    text = response.text
+    pieces = [text[i : i + 64] for i in range(0, len(text), 64)] or [""]
+    chunks = [
+        payload_to_response({"text": piece, "chunks": [], "supports": []})
+        for piece in pieces
+    ]
+    chunks[-1].candidates[0].grounding_metadata = response.candidates[
+        0
+    ].grounding_metadata
+    return chunks
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGenaiClient"):
+        self._client = client
+
+    def generate_content(self, *, model: str, contents: str, config: Any = None):
+        time.sleep(self._client.latency.sample())
+        return self._client.response_for(contents)
+
+    def generate_content_stream(self, *, model: str, contents: str, config: Any = None):
+        # The sampled latency is spread evenly over the chunks
+        latency = self._client.latency.sample()
+        chunks = _stream_chunks(self._client.response_for(contents))
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+
+class _FakeAsyncModels:
+    def __init__(self, client: "FakeGenaiClient"):
+        self._client = client
+
+    async def generate_content(self, *, model: str, contents: str, config: Any = None):
+        await asyncio.sleep(self._client.latency.sample())
+        return self._client.response_for(contents)
+
+    async def generate_content_stream(
+        self, *, model: str, contents: str, config: Any = None
+    ):
+        latency = self._client.latency.sample()
+        chunks = _stream_chunks(self._client.response_for(contents))
+
+        async def stream():
+            for chunk in chunks:
+                await asyncio.sleep(latency / len(chunks))
+                yield chunk
+
+        return stream()
+
+
+class _FakeAio:
+    def __init__(self, client: "FakeGenaiClient"):
+        self.models = _FakeAsyncModels(client)
+
+
+class FakeGenaiClient:
+    """Stand-in for `google.genai.Client` that serves grounded search responses locally.
+
+    Responses are replayed from `recorded` (normalized query -> search cache payload)
+    when available, and synthesized otherwise.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        recorded: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.latency = latency or LatencyModel()
+        self.recorded = recorded or {}
+        self.calls = 0
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+
+    @classmethod
+    def from_recording(cls, path: str, latency: Optional[LatencyModel] = None):
+        """Load responses from a JSONL file of `{"query": ..., "payload": {...}}` lines."""
+        recorded = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recorded[normalize_query(record["query"])] = record["payload"]
+        return cls(latency, recorded)
+
+    def response_for(self, contents: str):
+        """Return the grounded response for the search prompt `contents`."""
+        self.calls += 1
+        match = re.search(r'information on "(.*?)" and synthesize', contents, re.S)
+        query = match.group(1) if match else contents
+        payload = self.recorded.get(normalize_query(query)) or synthetic_payload(query)
+        return payload_to_response(payload)
+
+
+def _queries(rng: random.Random, number: int) -> List[str]:
+    # A random suffix keeps queries distinct so they are not deduplicated or cached
+    return [
+        f"{' '.join(rng.sample(WORDS, 4))} {rng.getrandbits(32):08x}"
+        for _ in range(number)
+    ]
+
+
+class FakeChatModel(BaseChatModel):
+    """Stand-in for `ChatGoogleGenerativeAI`.
+
+    Free-text calls answer with a few sentences citing short urls found in the
+    prompt, so the citation pipeline is exercised. Structured-output calls fill the
+    schema synthetically; reflection never reports sufficiency, so a run performs
+    exactly `max_research_loops` loops.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: str = "fake-gemini"
+    latency: LatencyModel = LatencyModel()
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _answer(self, prompt: str) -> str:
+        rng = random.Random(f"{self.seed}:{len(prompt)}")
+        short_urls = re.findall(re.escape(SHORT_URL_PREFIX) + r"\d+-\d+", prompt)
+        sentences = []
+        for idx in range(8):
+            sentence = _sentence(rng, "research")
+            if short_urls:
+                short_url = short_urls[idx * 7 % len(short_urls)]
+                sentence += f" [{rng.choice(WORDS)}]({short_url})"
+            sentences.append(sentence)
+        return " ".join(sentences)
+
+    def _prompt(self, messages) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _usage(self, prompt: str, text: str) -> Dict[str, int]:
+        # Roughly four characters per token
+        input_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency.sample())
+        prompt = self._prompt(messages)
+        text = self._answer(prompt)
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        prompt = self._prompt(messages)
+        text = self._answer(prompt)
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, prompt: str, text: str) -> List[AIMessageChunk]:
+        pieces = [text[i : i + 16] for i in range(0, len(text), 16)]
+        chunks = [AIMessageChunk(content=piece) for piece in pieces]
+        # Usage is reported once, on the last chunk
+        chunks[-1].usage_metadata = self._usage(prompt, text)
+        return chunks
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator:
+        prompt = self._prompt(messages)
+        chunks = self._chunks(prompt, self._answer(prompt))
+        time.sleep(self.latency.sample())
+        for chunk in chunks:
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt(messages)
+        chunks = self._chunks(prompt, self._answer(prompt))
+        await asyncio.sleep(self.latency.sample())
+        for chunk in chunks:
+            yield ChatGenerationChunk(message=chunk)
+
+    def _structured(self, schema: type[BaseModel], prompt: Any) -> BaseModel:
+        prompt = str(getattr(prompt, "text", prompt))
+        rng = random.Random(f"{self.seed}:{prompt}")
+        values: Dict[str, Any] = {}
+        for name, field in schema.model_fields.items():
+            if name == "query":
+                count = re.search(r"Don't produce more than (\d+) queries", prompt)
+                number = int(count.group(1)) if count else 1
+                values[name] = _queries(rng, number)
+            elif name == "follow_up_queries":
+                values[name] = _queries(rng, 1)
+            elif name == "is_sufficient":
+                values[name] = False
+            elif name == "confidence":
+                values[name] = round(rng.random(), 2)
+            elif field.annotation is str:
+                values[name] = _sentence(rng, name.replace("_", " "))
+        return schema(**values)
+
+    def with_structured_output(self, schema, **kwargs):
+        """Return a runnable that produces synthetic `schema` instances."""
+
+        def invoke(prompt):
+            time.sleep(self.latency.sample())
+            return self._structured(schema, prompt)
+
+        async def ainvoke(prompt):
+            await asyncio.sleep(self.latency.sample())
+            return self._structured(schema, prompt)
+
+        return RunnableLambda(invoke, afunc=ainvoke, name=f"{schema.__name__}Fake")
+
+
+def install(
+    graph_module,
+    search_latency: Optional[LatencyModel] = None,
+    llm_latency: Optional[LatencyModel] = None,
+    recording: Optional[str] = None,
+) -> FakeGenaiClient:
+    """Swap the Gemini clients of `agent.graph` for local fakes and return the genai fake."""
+    if recording:
+        client = FakeGenaiClient.from_recording(recording, search_latency)
+    else:
+        client = FakeGenaiClient(search_latency)
+    set_genai_client(client)
+    graph_module.llm_registry.factory = lambda model, temperature, _: FakeChatModel(
+        model=model, latency=llm_latency or LatencyModel()
+    )
+    graph_module.llm_registry.clear()
+    return client
@@ -0,0 +1,261 @@
+"""Local HTTP stand-in for the Gemini API, for load tests without network access.
+
+Serves `generateContent` and `streamGenerateContent` (SSE) on the REST paths used
+by the google genai client, so a real API server can run the unmodified graph
+against it by setting `GEMINI_BASE_URL`. Requests with the Google Search tool
+get grounded responses with grounding chunks and supports (synthesized, or
+replayed from a recording), structured-output requests get JSON filled from
+their response schema, and other requests get an answer citing the short urls
+of the prompt. Responses are delayed according to configurable latency
+distributions, and a share of requests can be failed to exercise retries.
+
+Example:
+    python benchmarks/gemini_stub.py --port 8300 \
+        --search-latency lognormal:0.8:0.4 --llm-latency fixed:0.3
+    GEMINI_BASE_URL=http://127.0.0.1:8300 GEMINI_API_KEY=stub langgraph dev --no-browser
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import fake_gemini
+
+
+def _prompt(body: Dict[str, Any]) -> str:
+    parts = [
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    ]
+    return "\n".join(parts)
+
+
+def _is_search(body: Dict[str, Any]) -> bool:
+    return any(
+        "googleSearch" in tool or "google_search" in tool
+        for tool in body.get("tools", [])
+    )
+
+
+def fill_schema(
+    schema: Dict[str, Any], prompt: str, rng: random.Random, name: str = "", defs=None
+) -> Any:
+    """Return a synthetic value for a JSON schema, following `fake_gemini.FakeChatModel`.
+
+    Reflection never reports sufficiency, so a run performs exactly
+    `max_research_loops` loops.
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fill_schema(
+            defs[schema["$ref"].rsplit("/", 1)[-1]], prompt, rng, name, defs
+        )
+    if "anyOf" in schema:
+        return fill_schema(schema["anyOf"][0], prompt, rng, name, defs)
+    kind = str(schema.get("type", "object")).lower()
+    if kind == "object":
+        return {
+            key: fill_schema(value, prompt, rng, key, defs)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if name == "query":
+        count = re.search(r"Don't produce more than (\d+) queries", prompt)
+        return fake_gemini._queries(rng, int(count.group(1)) if count else 1)
+    if kind == "array":
+        if name == "follow_up_queries":
+            return fake_gemini._queries(rng, 1)
+        return [fill_schema(schema.get("items", {}), prompt, rng, name, defs)]
+    if kind == "boolean":
+        return False
+    if kind in ("number", "integer"):
+        return round(rng.random(), 2) if kind == "number" else rng.randrange(10)
+    return fake_gemini._sentence(rng, name.replace("_", " ") or "research")
+
+
+class GeminiStub:
+    """Builds Gemini REST responses and counts the requests served."""
+
+    def __init__(
+        self,
+        search_latency: fake_gemini.LatencyModel,
+        llm_latency: fake_gemini.LatencyModel,
+        recording: Optional[str] = None,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.search_latency = search_latency
+        self.llm_latency = llm_latency
+        self.error_rate = error_rate
+        self.search = (
+            fake_gemini.FakeGenaiClient.from_recording(recording)
+            if recording
+            else fake_gemini.FakeGenaiClient()
+        )
+        self.chat = fake_gemini.FakeChatModel(seed=seed)
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.requests: Counter = Counter()
+
+    def respond(self, body: Dict[str, Any]):
+        """Return the request kind, its latency and the full response payload."""
+        prompt = _prompt(body)
+        config = body.get("generationConfig", {})
+        schema = config.get("responseJsonSchema") or config.get("responseSchema")
+        if _is_search(body):
+            kind, latency = "search", self.search_latency.sample()
+            response = self.search.response_for(prompt).model_dump(
+                mode="json", by_alias=True, exclude_none=True
+            )
+        else:
+            kind, latency = (
+                "structured" if schema else "text",
+                self.llm_latency.sample(),
+            )
+            if schema:
+                rng = random.Random(f"{self.seed}:{prompt}")
+                text = json.dumps(fill_schema(schema, prompt, rng))
+            else:
+                text = self.chat._answer(prompt)
+            response = {
+                "candidates": [
+                    {"content": {"role": "model", "parts": [{"text": text}]}}
+                ]
+            }
+        candidate = response["candidates"][0]
+        candidate["finishReason"] = "STOP"
+        text = candidate["content"]["parts"][0]["text"]
+        # Roughly four characters per token
+        response["usageMetadata"] = {
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": (len(prompt) + len(text)) // 4,
+        }
+        response["modelVersion"] = body.get("model", "gemini-stub")
+        self.requests[kind] += 1
+        return kind, latency, response
+
+    def should_fail(self) -> bool:
+        """Return whether to fail the current request with a 503."""
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+
+def stream_chunks(response: Dict[str, Any], size: int = 64) -> List[Dict[str, Any]]:
+    """Split a response into streamed chunks, with grounding and usage on the last one."""
+    candidate = response["candidates"][0]
+    text = candidate["content"]["parts"][0]["text"]
+    pieces = [text[i : i + size] for i in range(0, len(text), size)] or [""]
+    chunks = [
+        {
+            "candidates": [
+                {"content": {"role": "model", "parts": [{"text": piece}]}, "index": 0}
+            ]
+        }
+        for piece in pieces
+    ]
+    last = chunks[-1]
+    last["candidates"][0].update(
+        {key: value for key, value in candidate.items() if key != "content"}
+    )
+    last["usageMetadata"] = response["usageMetadata"]
+    return chunks
+
+
+def create_app(stub: GeminiStub) -> Starlette:
+    """Return the ASGI app serving the Gemini REST endpoints from `stub`."""
+
+    async def generate(request: Request):
+        model, _, method = request.path_params["target"].partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse(
+                {"error": {"code": 404, "message": f"Unknown method {method}"}}, 404
+            )
+        if stub.should_fail():
+            stub.requests["failed"] += 1
+            return JSONResponse(
+                {
+                    "error": {
+                        "code": 503,
+                        "message": "Injected failure",
+                        "status": "UNAVAILABLE",
+                    }
+                },
+                503,
+            )
+        body = await request.json()
+        body.setdefault("model", model)
+        _, latency, response = stub.respond(body)
+        if method == "generateContent":
+            await asyncio.sleep(latency)
+            return JSONResponse(response)
+
+        chunks = stream_chunks(response)
+
+        async def events():
+            # The sampled latency is spread evenly over the chunks
+            for chunk in chunks:
+                await asyncio.sleep(latency / len(chunks))
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def stats(request: Request):
+        return JSONResponse(dict(stub.requests))
+
+    return Starlette(
+        routes=[
+            Route("/{version}/models/{target:path}", generate, methods=["POST"]),
+            Route("/stats", stats),
+        ]
+    )
+
+
+def main() -> None:
+    """Serve the stub until interrupted."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument(
+        "--search-latency",
+        default="lognormal:0.8:0.4",
+        help="Grounded search latency distribution",
+    )
+    parser.add_argument(
+        "--llm-latency", default="fixed:0.3", help="Chat model latency distribution"
+    )
+    parser.add_argument(
+        "--recording", help="JSONL of recorded search payloads to replay"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests failed with a 503",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stub = GeminiStub(
+        fake_gemini.LatencyModel(args.search_latency, seed=args.seed + 1),
+        fake_gemini.LatencyModel(args.llm_latency, seed=args.seed + 2),
+        recording=args.recording,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
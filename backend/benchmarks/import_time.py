@@ -0,0 +1,117 @@
+"""Import-time budget check for `agent.graph`.
+
+Imports `agent.graph` in fresh interpreters under `python -X importtime` and
+fails (exit code 1) when the best cumulative import time exceeds the budget, or
+when the import pulls in modules that must only be loaded on first use (provider
+SDKs) or builds the graph.
+
+Example:
+    python benchmarks/import_time.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+MODULE = "agent.graph"
+BUDGET_MS = 1500.0
+
+# Loaded lazily by agent.clients / agent.search_cache, never by the import itself
+LAZY_MODULES = (
+    "google.genai",
+    "langchain_google_genai",
+)
+
+_PROBE = """
+import json, sys
+import agent.graph
+print(json.dumps({
+    "lazy_loaded": [m for m in %r if m in sys.modules],
+    "graph_built": agent.graph.build_graph.cache_info().currsize > 0,
+}))
+"""
+
+
+def import_time_ms(module: str = MODULE) -> float:
+    """Return the cumulative import time of `module` in a fresh interpreter, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    # Lines look like "import time:  self [us] | cumulative | name", children first
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def probe() -> Dict[str, object]:
+    """Return which lazy modules are loaded and whether the graph is built after the import."""
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE % (LAZY_MODULES,)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    return json.loads(result.stdout)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "import-time")
+    return env
+
+
+def main() -> None:
+    """Measure the import and exit non-zero when the budget is exceeded."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="Fresh interpreters to measure; the fastest counts",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=BUDGET_MS,
+        help="Maximum cumulative import time",
+    )
+    args = parser.parse_args()
+
+    timings: List[float] = [import_time_ms() for _ in range(args.runs)]
+    report = {
+        "module": MODULE,
+        "timings_ms": timings,
+        "best_ms": min(timings),
+        "budget_ms": args.budget_ms,
+        **probe(),
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report["best_ms"] > args.budget_ms:
+        failures.append(
+            f"import took {report['best_ms']:.0f} ms, budget is {args.budget_ms:.0f} ms"
+        )
+    if report["lazy_loaded"]:
+        failures.append(f"imported eagerly: {', '.join(report['lazy_loaded'])}")
+    if report["graph_built"]:
+        failures.append("the graph was compiled at import time")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
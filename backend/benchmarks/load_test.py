@@ -0,0 +1,304 @@
+"""Load test of the LangGraph HTTP API at a fixed arrival rate.
+
+Starts runs as an open-loop Poisson process: every arrival creates a thread and
+streams a research run on it, whether or not earlier runs have finished, so
+queueing in the API shows up as latency instead of a lower offered load. Each
+rate in `--rate` is run for `--duration` seconds in turn; the report has, per
+rate, the achieved run throughput, time to the first streamed event,
+end-to-end latency percentiles, the error rate and the resident memory of the
+API worker processes (read from /proc, so Linux only).
+
+Run it against the Gemini stand-in in `gemini_stub.py` to measure the server
+without network access or API quota:
+    python benchmarks/gemini_stub.py --port 8300 &
+    GEMINI_BASE_URL=http://127.0.0.1:8300 GEMINI_API_KEY=stub langgraph dev --no-browser &
+    python benchmarks/load_test.py --url http://127.0.0.1:2024 --rate 1 2 4 8 \
+        --duration 60 --stub-url http://127.0.0.1:8300 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from langgraph_sdk import get_client
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Return count, mean, p50, p90, p99 and max of latencies in milliseconds."""
+    if not values:
+        return {"count": 0}
+    cuts = (
+        statistics.quantiles(values, n=100, method="inclusive")
+        if len(values) > 1
+        else values * 99
+    )
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p90_ms": cuts[89] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def find_workers(pattern: str) -> List[int]:
+    """Return the pids of processes whose command line matches `pattern`."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            continue
+        if re.search(pattern, cmdline):
+            pids.append(int(entry))
+    return pids
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Return the resident set size of `pid`, or None once it has exited."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler:
+    """Samples the total resident memory of the worker processes in the background."""
+
+    def __init__(self, pids: List[int], interval: float):
+        self.pids = pids
+        self.interval = interval
+        self.samples: List[int] = []
+
+    def sample(self) -> int:
+        """Return and record the total RSS of the workers still running."""
+        total = sum(rss or 0 for rss in map(rss_bytes, self.pids))
+        self.samples.append(total)
+        return total
+
+    async def run(self) -> None:
+        """Sample until cancelled."""
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def report(self) -> Dict[str, Any]:
+        """Return the start, peak and end RSS in MiB since the last report."""
+        samples, self.samples = self.samples or [self.sample()], []
+        mib = 1024 * 1024
+        return {
+            "pids": self.pids,
+            "start_mib": samples[0] / mib,
+            "peak_mib": max(samples) / mib,
+            "end_mib": samples[-1] / mib,
+        }
+
+
+def run_input(idx: int, args) -> Dict[str, Any]:
+    """Return the input of run `idx`, shaped like the frontend's submissions."""
+    return {
+        "messages": [
+            {
+                "type": "human",
+                "content": f"Load test question {idx}: what changed in energy storage?",
+            }
+        ],
+        "initial_search_query_count": args.queries,
+        "max_research_loops": args.loops,
+        "reasoning_model": args.reasoning_model,
+    }
+
+
+async def one_run(client, idx: int, args, stage: Dict[str, Any]) -> None:
+    """Create a thread, stream a run on it and record its timings or error."""
+    start = time.perf_counter()
+    stage["in_flight"] += 1
+    stage["max_in_flight"] = max(stage["max_in_flight"], stage["in_flight"])
+    first_event = None
+    try:
+        async with asyncio.timeout(args.timeout):
+            thread = await client.threads.create()
+            async for part in client.runs.stream(
+                thread["thread_id"],
+                args.assistant,
+                input=run_input(idx, args),
+                stream_mode=["updates", "custom"],
+            ):
+                if part.event == "error":
+                    raise RuntimeError(json.dumps(part.data)[:200])
+                # The metadata event is sent when the run is created, before any work
+                if first_event is None and part.event != "metadata":
+                    first_event = time.perf_counter() - start
+        stage["first_event"].append(
+            first_event if first_event is not None else time.perf_counter() - start
+        )
+        stage["end_to_end"].append(time.perf_counter() - start)
+    except Exception as e:
+        stage["errors"][type(e).__name__] = stage["errors"].get(type(e).__name__, 0) + 1
+    finally:
+        stage["in_flight"] -= 1
+
+
+async def run_stage(
+    client, rate: float, args, sampler: MemorySampler, rng: random.Random, offset: int
+):
+    """Offer `rate` runs per second for `args.duration` seconds and report the results."""
+    stage: Dict[str, Any] = {
+        "first_event": [],
+        "end_to_end": [],
+        "errors": {},
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+    tasks = []
+    start = time.perf_counter()
+    arrival = 0.0
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival >= args.duration:
+            break
+        await asyncio.sleep(max(0.0, start + arrival - time.perf_counter()))
+        tasks.append(
+            asyncio.create_task(one_run(client, offset + len(tasks), args, stage))
+        )
+    if tasks:
+        await asyncio.wait(tasks)
+    elapsed = time.perf_counter() - start
+    completed = len(stage["end_to_end"])
+    failed = sum(stage["errors"].values())
+    return {
+        "offered_rate": rate,
+        "runs": len(tasks),
+        "completed": completed,
+        "elapsed_s": elapsed,
+        "throughput_runs_per_s": completed / elapsed,
+        "error_rate": failed / len(tasks) if tasks else 0.0,
+        "errors": stage["errors"],
+        "max_in_flight": stage["max_in_flight"],
+        "first_event": percentiles(stage["first_event"]),
+        "end_to_end": percentiles(stage["end_to_end"]),
+        "worker_memory": sampler.report(),
+    }
+
+
+async def stub_requests(url: Optional[str]) -> Optional[Dict[str, int]]:
+    """Return the request counts of the Gemini stub at `url`, if given."""
+    if not url:
+        return None
+    async with httpx.AsyncClient() as http:
+        return (await http.get(f"{url.rstrip('/')}/stats")).json()
+
+
+async def run(args) -> Dict[str, Any]:
+    """Run every stage and return the report."""
+    client = get_client(url=args.url)
+    pids = args.worker_pid or find_workers(args.worker_match)
+    sampler = MemorySampler(pids, args.memory_interval)
+    sampling = asyncio.create_task(sampler.run())
+    rng = random.Random(args.seed)
+    stages = []
+    try:
+        for rate in args.rate:
+            before = await stub_requests(args.stub_url)
+            stage = await run_stage(
+                client, rate, args, sampler, rng, sum(s["runs"] for s in stages)
+            )
+            after = await stub_requests(args.stub_url)
+            if after is not None:
+                stage["gemini_requests"] = {
+                    k: v - before.get(k, 0) for k, v in after.items()
+                }
+            stages.append(stage)
+            print(
+                f"rate {rate:>6.2f}/s: {stage['throughput_runs_per_s']:6.2f} runs/s, "
+                f"first event p50 {stage['first_event'].get('p50_ms', 0):7.0f} ms, "
+                f"end-to-end p50 {stage['end_to_end'].get('p50_ms', 0):7.0f} ms "
+                f"p99 {stage['end_to_end'].get('p99_ms', 0):7.0f} ms, "
+                f"errors {stage['error_rate']:6.1%}, "
+                f"worker peak {stage['worker_memory']['peak_mib']:7.1f} MiB",
+                flush=True,
+            )
+    finally:
+        sampling.cancel()
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "stages": stages,
+    }
+
+
+def main() -> None:
+    """Run the load test and print (or write) the JSON report."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--url", default="http://127.0.0.1:2024", help="LangGraph API url"
+    )
+    parser.add_argument("--assistant", default="agent", help="Assistant or graph id")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        nargs="+",
+        default=[1.0],
+        help="Arrival rates to test, in runs per second",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds of arrivals per rate"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=300, help="Per-run timeout in seconds"
+    )
+    parser.add_argument(
+        "--queries", type=int, default=3, help="Initial search queries per run"
+    )
+    parser.add_argument("--loops", type=int, default=2, help="Research loops per run")
+    parser.add_argument("--reasoning-model", default="gemini-2.5-flash-preview-04-17")
+    parser.add_argument(
+        "--worker-pid",
+        type=int,
+        action="append",
+        help="API worker pid to sample (repeatable)",
+    )
+    parser.add_argument(
+        "--worker-match",
+        default=r"langgraph|uvicorn",
+        help="Command line regex of the workers, without --worker-pid",
+    )
+    parser.add_argument(
+        "--memory-interval",
+        type=float,
+        default=0.5,
+        help="Seconds between memory samples",
+    )
+    parser.add_argument(
+        "--stub-url", help="Gemini stub url, to report the Gemini requests per stage"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
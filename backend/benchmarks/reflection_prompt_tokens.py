@@ -0,0 +1,101 @@
+"""Compare reflection tokens of the full and incremental reflection modes.
+
+Builds the reflection prompts the graph would send for a synthetic run with
+1-5 research loops and reports the token totals per mode. Incremental mode also
+has reflection write the updated running summary on every loop, so its output
+tokens are counted next to its prompt tokens. The rest of the reflection output
+is the same in both modes and left out. No model is called, so no API key is
+needed.
+"""
+
+import argparse
+import importlib
+import os
+
+from langchain_core.messages import HumanMessage
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from agent.configuration import Configuration  # noqa: E402
+
+graph_module = importlib.import_module("agent.graph")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Gemini tokens as four characters per token."""
+    return len(text) // 4
+
+
+def synthetic_result(loop: int, idx: int, chars: int) -> str:
+    """Return a research result of roughly `chars` characters."""
+    sentence = (
+        f"Finding {loop}.{idx}: the gathered source reports a figure of {loop * 10 + idx}% "
+        f"[source](https://vertexaisearch.cloud.google.com/id/{loop}-{idx}). "
+    )
+    return (sentence * (chars // len(sentence) + 1))[:chars]
+
+
+def run(
+    loops: int, queries: int, result_chars: int, summary_chars: int, incremental: bool
+) -> tuple[int, int]:
+    """Return the reflection prompt and summary output tokens of a run with `loops` research loops."""
+    configurable = Configuration(incremental_reflection=incremental)
+    state = {
+        "messages": [
+            HumanMessage(content="What changed in renewable energy this year?")
+        ],
+        "web_research_result": [],
+        "search_query": [],
+    }
+    prompt_tokens, summary_tokens = 0, 0
+    for loop in range(loops):
+        state["web_research_result"] = state["web_research_result"] + [
+            synthetic_result(loop, idx, result_chars) for idx in range(queries)
+        ]
+        prompt, _ = graph_module._reflection_prompt(state, configurable)
+        prompt_tokens += estimate_tokens(prompt)
+        if incremental:
+            # Stand-in for the updated running summary the model writes
+            state["knowledge_summary"] = "k" * summary_chars
+            state["summarized_result_count"] = len(state["web_research_result"])
+            summary_tokens += estimate_tokens(state["knowledge_summary"])
+    return prompt_tokens, summary_tokens
+
+
+def main() -> None:
+    """Print the reflection token totals for loop counts 1-5."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=3, help="Queries per loop")
+    parser.add_argument(
+        "--result-chars", type=int, default=4000, help="Characters per research result"
+    )
+    parser.add_argument(
+        "--summary-chars",
+        type=int,
+        default=2000,
+        help="Characters of the running summary",
+    )
+    parser.add_argument(
+        "--output-weight",
+        type=float,
+        default=1.0,
+        help="Cost of an output token relative to a prompt token, e.g. its price ratio",
+    )
+    args = parser.parse_args()
+
+    print(f"{'loops':>5} {'full':>10} {'incremental':>12} {'+summary':>9} {'saved':>7}")
+    for loops in range(1, 6):
+        full, _ = run(loops, args.queries, args.result_chars, args.summary_chars, False)
+        prompt, summary = run(
+            loops, args.queries, args.result_chars, args.summary_chars, True
+        )
+        saved = 1 - (prompt + summary * args.output_weight) / full
+        print(f"{loops:>5} {full:>10} {prompt:>12} {summary:>9} {saved:>7.0%}")
+    print(
+        "full and incremental are prompt tokens; +summary is the running summary "
+        "incremental mode adds to the output, weighted by --output-weight in saved."
+    )
+
+
+if __name__ == "__main__":
+    main()
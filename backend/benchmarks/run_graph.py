@@ -0,0 +1,230 @@
+"""Offline benchmark of the research graph against a fake Gemini backend.
+
+Runs `graph.invoke` (threads) or `graph.ainvoke` (asyncio) for a number of
+synthetic questions with the Gemini clients swapped for the local fakes in
+`fake_gemini.py`, then reports per-node latency, end-to-end p50/p95, throughput
+and allocations. Results are written as JSON so runs can be compared over time.
+
+Example:
+    python benchmarks/run_graph.py --runs 50 --concurrency 10 --queries 3 --loops 2 \
+        --search-latency lognormal:0.05:0.5 --output results.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+# Measure the graph itself rather than the search cache or the rate limiter,
+# unless asked otherwise
+os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+os.environ.setdefault("GEMINI_REQUESTS_PER_SECOND", "1000000")
+os.environ.setdefault("GEMINI_REQUEST_BURST", "1000000")
+os.environ.setdefault("GEMINI_INITIAL_CONCURRENCY", "1000")
+os.environ.setdefault("GEMINI_MAX_CONCURRENCY", "1000")
+os.environ.setdefault("GEMINI_TOTAL_CONCURRENCY", "1000")
+
+import fake_gemini  # noqa: E402
+
+graph_module = importlib.import_module("agent.graph")
+
+NODES = ("generate_query", "web_research", "reflection", "finalize_answer")
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler recording the wall time of every node run."""
+
+    def __init__(self):
+        self.starts: Dict[Any, tuple[str, float]] = {}
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        name = kwargs.get("name")
+        # Only the outermost run of a node; the node's own runnable is nested in it
+        if (
+            name in NODES
+            and (metadata or {}).get("langgraph_node") == name
+            and parent_run_id not in self.starts
+        ):
+            self.starts[run_id] = (name, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id):
+        started = self.starts.pop(run_id, None)
+        if started is not None:
+            name, start = started
+            self.durations[name].append(time.perf_counter() - start)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the q-th percentile (0-100) of `values` by linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Return count, mean, p50, p95 and max of a list of latencies in milliseconds."""
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "max_ms": max(values) * 1000 if values else 0.0,
+    }
+
+
+def initial_state(idx: int, args) -> Dict[str, Any]:
+    """Return the input state of benchmark run `idx`."""
+    return {
+        "messages": [
+            HumanMessage(
+                content=f"Benchmark question {idx}: what changed in energy storage?"
+            )
+        ],
+        "initial_search_query_count": args.queries,
+        "max_research_loops": args.loops,
+    }
+
+
+def run_config(args, timer: NodeTimer) -> Dict[str, Any]:
+    """Return the run config: the timer callback and the resilience settings under test."""
+    configurable = {}
+    if args.hedge_percentile is not None:
+        configurable["web_research_hedge_percentile"] = args.hedge_percentile
+    if args.search_timeout is not None:
+        configurable["web_research_timeout_seconds"] = args.search_timeout
+    return {"callbacks": [timer], "configurable": configurable}
+
+
+def run_sync(args, timer: NodeTimer) -> List[float]:
+    """Run the benchmark with `graph.invoke` on a thread pool."""
+
+    def one(idx: int) -> float:
+        start = time.perf_counter()
+        graph_module.graph.invoke(initial_state(idx, args), run_config(args, timer))
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        return list(pool.map(one, range(args.runs)))
+
+
+async def run_async(args, timer: NodeTimer) -> List[float]:
+    """Run the benchmark with `graph.ainvoke` on the event loop."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(idx: int) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await graph_module.graph.ainvoke(
+                initial_state(idx, args), run_config(args, timer)
+            )
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(idx) for idx in range(args.runs)))
+
+
+def main() -> None:
+    """Run the benchmark and write the JSON report."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--mode", choices=["sync", "async"], default="async")
+    parser.add_argument("--runs", type=int, default=20, help="Number of graph runs")
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent runs")
+    parser.add_argument(
+        "--queries", type=int, default=3, help="Initial search queries per run"
+    )
+    parser.add_argument("--loops", type=int, default=2, help="Research loops per run")
+    parser.add_argument(
+        "--search-latency",
+        default="fixed:0",
+        help="Grounded search latency distribution",
+    )
+    parser.add_argument(
+        "--llm-latency", default="fixed:0", help="Chat model latency distribution"
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        help="Hedge searches slower than this percentile",
+    )
+    parser.add_argument(
+        "--search-timeout",
+        type=float,
+        help="Per-branch web research timeout in seconds",
+    )
+    parser.add_argument(
+        "--recording", help="JSONL of recorded search payloads to replay"
+    )
+    parser.add_argument(
+        "--trace-allocations",
+        action="store_true",
+        help="Track allocations with tracemalloc (slows the run)",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    search_client = fake_gemini.install(
+        graph_module,
+        search_latency=fake_gemini.LatencyModel(args.search_latency, seed=1),
+        llm_latency=fake_gemini.LatencyModel(args.llm_latency, seed=2),
+        recording=args.recording,
+    )
+    timer = NodeTimer()
+    if args.trace_allocations:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    if args.mode == "sync":
+        latencies = run_sync(args, timer)
+    else:
+        latencies = asyncio.run(run_async(args, timer))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "python": platform.python_version(),
+        "elapsed_s": elapsed,
+        "throughput_runs_per_s": args.runs / elapsed,
+        "end_to_end": summarize(latencies),
+        "nodes": {name: summarize(timer.durations[name]) for name in NODES},
+        "search_calls": search_client.calls,
+    }
+    if args.trace_allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["allocations"] = {"current_bytes": current, "peak_bytes": peak}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
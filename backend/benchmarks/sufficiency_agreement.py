@@ -0,0 +1,131 @@
+"""Measure how often the local sufficiency pre-check agrees with the reflection model.
+
+Replays every reflection decision made by the model in recorded runs through
+`agent.sufficiency.precheck` and reports, per threshold setting, how many
+decisions the pre-check would have taken locally and how many of those match
+the model. A local "sufficient" where the model asked for more research is the
+costly mistake (an answer on too little research) and is reported separately.
+
+Record runs with the batch runner, with the pre-check off so the model decides:
+    python examples/batch_research.py questions.jsonl runs.jsonl --record-research
+
+Example:
+    python benchmarks/sufficiency_agreement.py runs.jsonl
+"""
+
+import argparse
+import itertools
+import json
+from typing import Any, Dict, List
+
+from agent.configuration import Configuration
+from agent.sufficiency import precheck
+
+
+def read_decisions(path: str) -> List[Dict[str, Any]]:
+    """Return the model's reflection decisions with the research each one saw."""
+    decisions = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            results = record.get("web_research_result")
+            if results is None or record.get("error"):
+                continue
+            for decision in record.get("reflection_decisions", []):
+                if decision["decided_by"] != "model":
+                    continue
+                decisions.append(
+                    {
+                        "question": record["question"],
+                        "results": results[
+                            decision.get("result_offset", 0) : decision["result_count"]
+                        ],
+                        "source_count": decision["source_count"],
+                        "is_sufficient": decision["is_sufficient"],
+                    }
+                )
+    return decisions
+
+
+def agreement(
+    decisions: List[Dict[str, Any]],
+    sufficient_coverage: float,
+    sufficient_sources: int,
+    insufficient_coverage: float,
+) -> Dict[str, float]:
+    """Replay `decisions` through the pre-check with the given thresholds."""
+    local = agreed = false_sufficient = 0
+    for decision in decisions:
+        verdict = precheck(
+            decision["question"],
+            decision["results"],
+            decision["source_count"],
+            sufficient_coverage,
+            sufficient_sources,
+            insufficient_coverage,
+        )["is_sufficient"]
+        if verdict is None:
+            continue
+        local += 1
+        agreed += verdict == decision["is_sufficient"]
+        false_sufficient += verdict and not decision["is_sufficient"]
+    return {
+        "local": local,
+        "local_rate": local / len(decisions) if decisions else 0.0,
+        "agreement": agreed / local if local else 0.0,
+        "false_sufficient": false_sufficient,
+    }
+
+
+def main() -> None:
+    """Print the agreement of the configured thresholds and of a threshold sweep."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "runs", help="JSONL output of batch_research.py --record-research"
+    )
+    parser.add_argument(
+        "--sweep", action="store_true", help="Also evaluate a grid of thresholds"
+    )
+    args = parser.parse_args()
+
+    decisions = read_decisions(args.runs)
+    if not decisions:
+        parser.error(
+            "no model reflection decisions found; record runs with --record-research"
+        )
+    sufficient = sum(d["is_sufficient"] for d in decisions)
+    print(
+        f"Model decisions: {len(decisions)} ({sufficient} sufficient, {len(decisions) - sufficient} insufficient)"
+    )
+    print()
+
+    defaults = Configuration()
+    settings = [
+        (
+            defaults.precheck_sufficient_coverage,
+            defaults.precheck_sufficient_sources,
+            defaults.precheck_insufficient_coverage,
+        )
+    ]
+    if args.sweep:
+        settings += list(itertools.product((0.7, 0.8, 0.9, 1.0), (3, 6, 9), (0.2, 0.4)))
+
+    print(
+        f"{'coverage':>8} {'sources':>7} {'insuff.':>7} {'local':>7} {'agree':>7} {'false suff.':>11}"
+    )
+    for sufficient_coverage, sufficient_sources, insufficient_coverage in settings:
+        result = agreement(
+            decisions, sufficient_coverage, sufficient_sources, insufficient_coverage
+        )
+        print(
+            f"{sufficient_coverage:>8.2f} {sufficient_sources:>7d} {insufficient_coverage:>7.2f} "
+            f"{result['local_rate']:>7.1%} {result['agreement']:>7.1%} {result['false_sufficient']:>11d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from typing import Any, Dict, List, Set
+
+from langchain_core.messages import HumanMessage
+from agent.graph import graph
+
+
+def read_questions(path: str) -> List[Dict[str, str]]:
+    """Read `{"id", "question"}` records from a JSONL file.
+
+    Each line needs an `id` (or `request_id`) and a `question`; lines in the
+    `requests.jsonl` format use their `title` and `body` as the question instead.
+    """
+    questions = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("question") or "\n\n".join(
+                part for part in (record.get("title"), record.get("body")) if part
+            )
+            questions.append(
+                {
+                    "id": str(
+                        record.get("id") or record.get("request_id") or line_number
+                    ),
+                    "question": question,
+                }
+            )
+    return questions
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Return the ids that already have a successful result in the output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash
+                continue
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+
+async def research(question: Dict[str, str], args) -> Dict[str, Any]:
+    """Answer one question and return its output record."""
+    state = {
+        "messages": [HumanMessage(content=question["question"])],
+        "initial_search_query_count": args.initial_queries,
+        "max_research_loops": args.max_loops,
+        "reasoning_model": args.reasoning_model,
+    }
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"id": question["id"], "question": question["question"]}
+    try:
+        result = await graph.ainvoke(state)
+        messages = result.get("messages", [])
+        record["answer"] = messages[-1].content if messages else ""
+        record["sources"] = result.get("sources_gathered", [])
+        record["web_research_errors"] = result.get("web_research_errors", [])
+        record["degradations"] = result.get("degradations", [])
+        if args.record_research:
+            # What reflection saw, for replaying its decisions offline
+            record["web_research_result"] = result.get("web_research_result", [])
+            record["reflection_decisions"] = result.get("reflection_decisions", [])
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_s"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+async def run_batch(questions: List[Dict[str, str]], args) -> List[Dict[str, Any]]:
+    """Answer `questions` with `args.concurrency` workers, appending each record to the output as it finishes."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for question in questions:
+        queue.put_nowait(question)
+    records = []
+
+    with open(args.output, "a") as out:
+
+        async def worker():
+            while not queue.empty():
+                question = queue.get_nowait()
+                record = await research(question, args)
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                records.append(record)
+                status = "error" if "error" in record else "done"
+                print(
+                    f"[{len(records)}/{len(questions)}] {record['id']} {status} ({record['latency_s']}s)"
+                )
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return records
+
+
+def print_summary(records: List[Dict[str, Any]], skipped: int, elapsed: float) -> None:
+    """Print throughput, latency and error counts of a batch."""
+    latencies = sorted(
+        record["latency_s"] for record in records if "error" not in record
+    )
+    errors = Counter(
+        record["error"].split(":")[0] for record in records if "error" in record
+    )
+    print()
+    print(f"Questions:  {len(records)} run, {skipped} skipped (already done)")
+    print(f"Succeeded:  {len(latencies)}")
+    print(f"Failed:     {sum(errors.values())}")
+    print(f"Elapsed:    {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"Throughput: {len(records) / elapsed * 60:.1f} questions/min")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"Latency:    mean {statistics.fmean(latencies):.1f}s, "
+            f"p50 {statistics.median(latencies):.1f}s, p95 {p95:.1f}s, max {latencies[-1]:.1f}s"
+        )
+    for error, count in errors.most_common():
+        print(f"  {error}: {count}")
+
+
+def main() -> None:
+    """Run the research agent over a JSONL batch of questions."""
+    parser = argparse.ArgumentParser(
+        description="Run the LangGraph research agent over a batch of questions"
+    )
+    parser.add_argument("input", help="JSONL file of questions")
+    parser.add_argument("output", help="JSONL file the answers are appended to")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Number of questions researched at the same time",
+    )
+    parser.add_argument(
+        "--initial-queries",
+        type=int,
+        default=3,
+        help="Number of initial search queries",
+    )
+    parser.add_argument(
+        "--max-loops",
+        type=int,
+        default=2,
+        help="Maximum number of research loops",
+    )
+    parser.add_argument(
+        "--reasoning-model",
+        default="gemini-2.5-pro-preview-05-06",
+        help="Model for the final answer",
+    )
+    parser.add_argument(
+        "--record-research",
+        action="store_true",
+        help="Also store the research results and reflection decisions of each question",
+    )
+    args = parser.parse_args()
+
+    # Resume: questions with a successful record in the output are not run again
+    questions = read_questions(args.input)
+    done = completed_ids(args.output)
+    pending = [question for question in questions if question["id"] not in done]
+
+    start = time.perf_counter()
+    records = asyncio.run(run_batch(pending, args))
+    print_summary(records, len(questions) - len(pending), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
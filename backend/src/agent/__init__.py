@@ -1,3 +1,2 @@
-from agent.graph import graph
-
-__all__ = ["graph"]
+# The compiled graph is `agent.graph.graph`, built on first access; the package
+# does not re-export it, so `agent.graph` always names the submodule.
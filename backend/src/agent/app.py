@@ -1,15 +1,24 @@
 # mypy: disable - error - code = "no-untyped-def,misc"
 import pathlib
 from fastapi import FastAPI, Response
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import pathlib
+
+from agent import metrics
+from agent.static import PrecompressedStaticFiles
+
 load_dotenv(dotenv_path=pathlib.Path(__file__).parent.parent / ".env")
 
 # Define the FastAPI app
 app = FastAPI()
 
 
+@app.get("/agent/metrics")
+def prometheus_metrics():
+    """Exposes the per-node agent metrics in the Prometheus text format."""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 def create_frontend_router(build_dir="../frontend/dist"):
     """Creates a router to serve the React frontend.
 
@@ -17,7 +26,7 @@ def create_frontend_router(build_dir="../frontend/dist"):
         build_dir: Path to the React build directory relative to this file.
 
     Returns:
-        A Starlette application serving the frontend.
+        An ASGI application serving the frontend (see `PrecompressedStaticFiles`).
     """
     build_path = pathlib.Path(__file__).parent.parent.parent / build_dir
 
@@ -37,7 +46,9 @@ def create_frontend_router(build_dir="../frontend/dist"):
 
         return Route("/{path:path}", endpoint=dummy_frontend)
 
-    return StaticFiles(directory=build_path, html=True)
+    # Served from memory with precompressed variants, so frontend requests don't
+    # do file I/O or compression on the event loop shared with agent runs
+    return PrecompressedStaticFiles(build_path)
 
 
 # Mount the frontend under /app to not conflict with the LangGraph API routes
@@ -0,0 +1,62 @@
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+
+from agent.metrics import record_cascade
+
+# Structured output the fast tier failed to produce is retried on the full tier
+VALIDATION_ERRORS = (OutputParserException, ValidationError)
+
+
+def escalation(result: Any, min_confidence: float) -> Optional[str]:
+    """Return why a fast-tier result must be escalated, or None to accept it."""
+    if result is None:
+        return "invalid"
+    confidence = getattr(result, "confidence", None)
+    if confidence is None or confidence < min_confidence:
+        return "low_confidence"
+    return None
+
+
+def cascade(
+    stage: str,
+    fast: Callable[[], Any],
+    full: Callable[[], Any],
+    min_confidence: float,
+):
+    """Return the result of `fast`, or of `full` when the fast tier fails or is unsure.
+
+    The outcome ('fast', 'low_confidence', 'invalid' output or any other 'error',
+    such as a retired fast model or throttling the governor gave up on) is counted
+    per stage in the metrics registry, giving the hit rate of the fast tier.
+    """
+    try:
+        result = fast()
+    except VALIDATION_ERRORS:
+        result, reason = None, "invalid"
+    except Exception:
+        result, reason = None, "error"
+    else:
+        reason = escalation(result, min_confidence)
+    record_cascade(stage, reason or "fast")
+    return result if reason is None else full()
+
+
+async def acascade(
+    stage: str,
+    fast: Callable[[], Awaitable[Any]],
+    full: Callable[[], Awaitable[Any]],
+    min_confidence: float,
+):
+    """Async variant of `cascade`; `fast` and `full` return the awaitables to run."""
+    try:
+        result = await fast()
+    except VALIDATION_ERRORS:
+        result, reason = None, "invalid"
+    except Exception:
+        result, reason = None, "error"
+    else:
+        reason = escalation(result, min_confidence)
+    record_cascade(stage, reason or "fast")
+    return result if reason is None else await full()
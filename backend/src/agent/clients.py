@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+# google.genai, httpx and langchain_google_genai are imported on first use, so
+# importing the graph stays cheap for API workers, the CLI and tooling.
+if TYPE_CHECKING:
+    from google.genai import Client
+
+# Keep-alive pool shared by every Gemini call made from this process.
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
+_genai_client: Optional["Client"] = None
+_genai_client_lock = threading.Lock()
+
+
+def create_genai_client(api_key: Optional[str] = None) -> "Client":
+    """Create a google genai client with a pooled keep-alive transport.
+
+    Passing explicit httpx transports also pins the async path to httpx, so sync
+    and async calls share the same pooling behaviour whether or not aiohttp is installed.
+    `GEMINI_BASE_URL` points the client at another endpoint, e.g. a local stand-in
+    for load tests.
+    """
+    import httpx
+    from google.genai import Client
+    from google.genai.types import HttpOptions
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    )
+    return Client(
+        api_key=api_key or os.getenv("GEMINI_API_KEY"),
+        http_options=HttpOptions(
+            base_url=os.getenv("GEMINI_BASE_URL") or None,
+            client_args={"transport": httpx.HTTPTransport(limits=limits)},
+            async_client_args={"transport": httpx.AsyncHTTPTransport(limits=limits)},
+        ),
+    )
+
+
+def get_genai_client() -> "Client":
+    """Return the process-wide genai client, creating it on first use.
+
+    Raises:
+        ValueError: If `GEMINI_API_KEY` is not set.
+    """
+    global _genai_client
+    if _genai_client is None:
+        with _genai_client_lock:
+            if _genai_client is None:
+                if os.getenv("GEMINI_API_KEY") is None:
+                    raise ValueError("GEMINI_API_KEY is not set")
+                _genai_client = create_genai_client()
+    return _genai_client
+
+
+def set_genai_client(client: Any) -> None:
+    """Replace the process-wide genai client, e.g. with a local stand-in."""
+    global _genai_client
+    with _genai_client_lock:
+        _genai_client = client
+
+
+def _create_chat_model(model: str, temperature: float, client: "Client"):
+    from google.genai import Client
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    llm = ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        # A single attempt: retries with backoff are handled by the governor
+        max_retries=1,
+        api_key=os.getenv("GEMINI_API_KEY"),
+    )
+    # Route the chat model through the shared genai client so it reuses the
+    # same pooled connections instead of opening its own.
+    if isinstance(getattr(llm, "client", None), Client):
+        llm.client = client
+    return llm
+
+
+class LLMRegistry:
+    """Process-wide registry of chat models keyed by (model, temperature, output schema).
+
+    Chat models are stateless between calls, so one instance per key can be shared
+    by every thread, event loop and graph run. The first lookup of a key builds the
+    model (and converts the output schema); later lookups return the cached runnable.
+    `callbacks` are attached to every runnable handed out. Models are built on the
+    process-wide genai client unless a `client` is given.
+    """
+
+    def __init__(
+        self,
+        client: Optional["Client"] = None,
+        factory: Callable[[str, float, "Client"], Any] = _create_chat_model,
+        callbacks: Optional[List[Any]] = None,
+    ):
+        self.client = client
+        self.factory = factory
+        self.callbacks = callbacks or []
+        self._models: Dict[Tuple[str, float, Optional[Type[BaseModel]]], Any] = {}
+        self._bases: Dict[Tuple[str, float], Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+
+    def get(
+        self,
+        model: str,
+        temperature: float,
+        schema: Optional[Type[BaseModel]] = None,
+    ):
+        """Return the shared chat model, wrapped with `schema` structured output if given."""
+        key = (model, temperature, schema)
+        with self._lock:
+            llm = self._models.get(key)
+            if llm is not None:
+                self.hits += 1
+                return llm
+            start = time.perf_counter()
+            base = self._bases.get((model, temperature))
+            if base is None:
+                client = self.client if self.client is not None else get_genai_client()
+                base = self.factory(model, temperature, client)
+                self._bases[(model, temperature)] = base
+            llm = base if schema is None else base.with_structured_output(schema)
+            if self.callbacks:
+                llm = llm.with_config(callbacks=self.callbacks)
+            self._models[key] = llm
+            self.build_seconds += time.perf_counter() - start
+            self.misses += 1
+        return llm
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache hit/miss counters and the estimated construction time saved."""
+        with self._lock:
+            avg_build = self.build_seconds / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "build_seconds": self.build_seconds,
+                "saved_seconds_estimate": self.hits * avg_build,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached chat models and reset the counters."""
+        with self._lock:
+            self._models.clear()
+            self._bases.clear()
+            self.hits = self.misses = 0
+            self.build_seconds = 0.0
@@ -0,0 +1,128 @@
+import random
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+
+from agent.dedup import jaccard
+from agent.history import estimate_tokens
+
+# A sentence with the citation markers that follow it, and the whitespace after it
+# (a line break also ends a sentence, for lists and headings)
+_SENTENCE_RE = re.compile(
+    r"(\S.*?(?:[.!?](?:\s*\[[^\]]*\]\([^)\s]*\))*(?=\s|$)|(?=\n)|$))(\s*)", re.S
+)
+_MARKER_RE = re.compile(r"\s*\[[^\]]*\]\(([^)\s]*)\)")
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class MinHasher:
+    """MinHash signatures of shingle sets, banded for locality-sensitive hashing."""
+
+    def __init__(self, num_perm: int = 32, bands: int = 8, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles: Set[str]) -> List[int]:
+        """Return the MinHash signature of `shingles`."""
+        hashes = [zlib.crc32(shingle.encode()) for shingle in shingles] or [0]
+        return [
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.params
+        ]
+
+    def band_keys(self, signature: List[int]) -> List[Tuple[int, ...]]:
+        """Return the LSH bucket key of each band of `signature`."""
+        return [
+            (band, *signature[band * self.rows : (band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+
+def word_shingles(text: str, k: int = 3) -> Set[str]:
+    """Return the word k-gram shingles of `text`, ignoring case, punctuation and citations."""
+    words = _WORD_RE.findall(_MARKER_RE.sub(" ", text).lower())
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)}
+
+
+class _Sentence:
+    __slots__ = ("text", "tail", "markers", "shingles")
+
+    def __init__(self, text: str, tail: str):
+        self.text = text
+        self.tail = tail
+        self.markers = _MARKER_RE.findall(text)
+        self.shingles = word_shingles(text)
+
+
+def compact_research(
+    results: Sequence[str], threshold: float = 0.8
+) -> Tuple[List[str], Dict[str, int]]:
+    """Collapse near-duplicate sentences across web research results.
+
+    Sentences are compared by the Jaccard similarity of their word shingles;
+    candidates come from MinHash LSH, so similar sentences are found without
+    comparing every pair. Of each group of near-duplicates the first sentence is
+    kept and receives the citation markers of the ones dropped, so every short
+    url stays cited. Results left without sentences are dropped.
+
+    Returns:
+        The compacted results and a report with the sentence counts and the
+        estimated tokens before and after.
+    """
+    hasher = MinHasher()
+    buckets: Dict[Tuple[int, ...], List[_Sentence]] = defaultdict(list)
+    compacted, total, dropped = [], 0, 0
+    for result in results:
+        kept: List[_Sentence] = []
+        for match in _SENTENCE_RE.finditer(result):
+            sentence = _Sentence(match.group(1), match.group(2))
+            if not sentence.text:
+                continue
+            total += 1
+            keys = hasher.band_keys(hasher.signature(sentence.shingles))
+            original = _find_duplicate(sentence, keys, buckets, threshold)
+            if original is None:
+                for key in keys:
+                    buckets[key].append(sentence)
+                kept.append(sentence)
+                continue
+            dropped += 1
+            for marker in _MARKER_RE.finditer(sentence.text):
+                if marker.group(1) not in original.markers:
+                    original.text += marker.group(0)
+                    original.markers.append(marker.group(1))
+        if kept:
+            compacted.append(kept)
+    # Rendered at the end, as later duplicates add markers to earlier sentences
+    texts = [
+        "".join(s.text + s.tail for s in sentences).rstrip() for sentences in compacted
+    ]
+    report = {
+        "sentences": total,
+        "dropped_sentences": dropped,
+        "tokens_before": sum(estimate_tokens(result) for result in results),
+        "tokens_after": sum(estimate_tokens(text) for text in texts),
+    }
+    return texts, report
+
+
+def _find_duplicate(sentence, keys, buckets, threshold):
+    checked = set()
+    for key in keys:
+        for candidate in buckets.get(key, ()):
+            if id(candidate) in checked:
+                continue
+            checked.add(id(candidate))
+            if jaccard(sentence.shingles, candidate.shingles) >= threshold:
+                return candidate
+    return None
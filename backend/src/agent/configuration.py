@@ -1,12 +1,21 @@
 import os
-from pydantic import BaseModel, Field
-from typing import Any, Optional
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, Optional, Tuple
 
 from langchain_core.runnables import RunnableConfig
 
+from agent.history import HistoryStrategy
+
 
 class Configuration(BaseModel):
-    """The configuration for the agent."""
+    """The configuration for the agent.
+
+    Instances are frozen: resolved configurations are cached and shared by every
+    node of every run with the same configurable values.
+    """
+
+    model_config = ConfigDict(frozen=True)
 
     query_generator_model: str = Field(
         default="gemini-2.0-flash",
@@ -29,6 +38,55 @@ class Configuration(BaseModel):
         },
     )
 
+    model_cascade: bool = Field(
+        default=False,
+        metadata={
+            "description": "Let the cascade model make the first pass of query generation and reflection, escalating to the configured model only when it fails, its output is invalid or its confidence is below cascade_min_confidence."
+        },
+    )
+
+    cascade_model: str = Field(
+        default="gemini-2.0-flash-lite",
+        metadata={
+            "description": "The fast, cheap language model of the first tier of the model cascade."
+        },
+    )
+
+    cascade_min_confidence: float = Field(
+        default=0.7,
+        metadata={
+            "description": "Self-rated confidence (0-1) at or above which the cascade accepts the first tier's output."
+        },
+    )
+
+    sufficiency_precheck: bool = Field(
+        default=False,
+        metadata={
+            "description": "Score the research locally before reflection and skip the reflection model when it is confidently sufficient or insufficient."
+        },
+    )
+
+    precheck_sufficient_coverage: float = Field(
+        default=0.9,
+        metadata={
+            "description": "Share (0-1) of the question's key terms the research must cover to be confidently sufficient."
+        },
+    )
+
+    precheck_sufficient_sources: int = Field(
+        default=6,
+        metadata={
+            "description": "Distinct sources the research must cite to be confidently sufficient."
+        },
+    )
+
+    precheck_insufficient_coverage: float = Field(
+        default=0.4,
+        metadata={
+            "description": "Share (0-1) of the question's key terms at or below which the research is confidently insufficient; follow-up queries are then built from the missing terms."
+        },
+    )
+
     number_of_initial_queries: int = Field(
         default=3,
         metadata={"description": "The number of initial search queries to generate."},
@@ -39,19 +97,218 @@ class Configuration(BaseModel):
         metadata={"description": "The maximum number of research loops to perform."},
     )
 
+    incremental_reflection: bool = Field(
+        default=False,
+        metadata={
+            "description": "Keep a running knowledge summary and only send reflection the research results that are new since the last loop."
+        },
+    )
+
+    history_strategy: HistoryStrategy = Field(
+        default="full",
+        metadata={
+            "description": "How much of the conversation is sent to the models: 'full', 'last_n' (the last history_max_turns turns), 'token_budget' (the recent turns that fit history_max_tokens) or 'summarize' (the last history_max_turns turns plus a summary of the older ones)."
+        },
+    )
+
+    history_max_turns: int = Field(
+        default=3,
+        metadata={
+            "description": "The number of recent conversation turns kept by the 'last_n' and 'summarize' history strategies."
+        },
+    )
+
+    history_max_tokens: int = Field(
+        default=4000,
+        metadata={
+            "description": "The estimated number of tokens of recent conversation kept by the 'token_budget' history strategy."
+        },
+    )
+
+    query_dedup_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Shingle similarity (0-1) at or above which a search query is dropped as a near-duplicate of one already planned or searched."
+        },
+    )
+
+    compact_research: bool = Field(
+        default=False,
+        metadata={
+            "description": "Collapse near-duplicate sentences across the web research results before the answer, merging their citations."
+        },
+    )
+
+    compaction_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Word shingle similarity (0-1) at or above which two research sentences count as duplicates."
+        },
+    )
+
+    search_cache_backend: str = Field(
+        default="none",
+        metadata={
+            "description": "Backend for caching web search results: 'memory', 'sqlite' or 'none' (off, the default)."
+        },
+    )
+
+    search_cache_path: str = Field(
+        default=".cache/web_search.sqlite3",
+        metadata={
+            "description": "Path of the SQLite database used by the 'sqlite' search cache backend."
+        },
+    )
+
+    search_cache_ttl_seconds: int = Field(
+        default=3600,
+        metadata={
+            "description": "How long a cached web search result stays valid, in seconds."
+        },
+    )
+
+    search_cache_max_size: int = Field(
+        default=1024,
+        metadata={
+            "description": "The maximum number of web search results kept in the cache."
+        },
+    )
+
+    research_memory_backend: str = Field(
+        default="none",
+        metadata={
+            "description": "Backend for the local research memory that answers repeat searches without a web search: 'memory', 'sqlite' or 'none'."
+        },
+    )
+
+    research_memory_path: str = Field(
+        default=".cache/research_memory.sqlite3",
+        metadata={
+            "description": "Path of the SQLite database used by the 'sqlite' research memory backend."
+        },
+    )
+
+    research_memory_max_age_seconds: int = Field(
+        default=86400,
+        metadata={
+            "description": "How old a remembered research result may be to replace a web search, in seconds."
+        },
+    )
+
+    research_memory_min_similarity: float = Field(
+        default=0.75,
+        metadata={
+            "description": "Shingle similarity (0-1) a remembered search query must have with a new one for its result to be reused."
+        },
+    )
+
+    research_memory_max_entries: int = Field(
+        default=5000,
+        metadata={
+            "description": "The maximum number of research results kept in the memory; the least recently used are evicted."
+        },
+    )
+
+    web_research_timeout_seconds: Optional[float] = Field(
+        default=None,
+        metadata={
+            "description": "Seconds after which a web research branch stops waiting for its search. Unset waits indefinitely."
+        },
+    )
+
+    web_research_error_policy: str = Field(
+        default="continue",
+        metadata={
+            "description": "What a web research branch does when its search fails or times out: 'continue' with an empty result and an entry in web_research_errors, or 'raise' to fail the run."
+        },
+    )
+
+    web_research_hedge_percentile: Optional[float] = Field(
+        default=None,
+        metadata={
+            "description": "Percentile (0-100) of recent search latencies after which a duplicate search is fired; the first answer wins. Unset disables hedging."
+        },
+    )
+
+    stream_web_research: bool = Field(
+        default=False,
+        metadata={
+            "description": "Stream grounded searches and emit their partial text and sources as custom 'web_research' stream events while the branch runs. Streamed searches are not hedged."
+        },
+    )
+
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        metadata={
+            "description": "Wall-clock budget of a research run in seconds. When set, the run shrinks fan-out, skips reflection loops or answers with the fast answer model to finish in time."
+        },
+    )
+
+    fast_answer_model: str = Field(
+        default="gemini-2.5-flash",
+        metadata={
+            "description": "The language model used for the answer when the deadline leaves too little time for the answer model."
+        },
+    )
+
+    enable_metrics: bool = Field(
+        default=True,
+        metadata={
+            "description": "Record per-node timings, token usage and retries for the /agent/metrics endpoint and the run's trace summary."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
+        """Create a Configuration instance from a RunnableConfig.
+
+        Environment variables (the field name in upper case) take precedence over the
+        configurable values. They are read once, on first use; call `refresh_env`
+        after changing them.
+        """
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
+        key = tuple(map(configurable.get, cls._field_names()))
+        try:
+            return cls._resolve(key)
+        except TypeError:
+            # Unhashable configurable values can't be cached
+            return cls._build(key)
+
+    @classmethod
+    def refresh_env(cls) -> None:
+        """Re-read environment overrides and drop cached configurations."""
+        cls._env_overrides.cache_clear()
+        cls._resolve.cache_clear()
 
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _field_names(cls) -> Tuple[str, ...]:
+        return tuple(cls.model_fields)
+
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _env_overrides(cls) -> Dict[str, str]:
+        return {
+            name: os.environ[name.upper()]
+            for name in cls.model_fields
+            if name.upper() in os.environ
+        }
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _resolve(cls, key: Tuple[Any, ...]) -> "Configuration":
+        return cls._build(key)
+
+    @classmethod
+    def _build(cls, key: Tuple[Any, ...]) -> "Configuration":
+        env = cls._env_overrides()
         # Get raw values from environment or config
         raw_values: dict[str, Any] = {
-            name: os.environ.get(name.upper(), configurable.get(name))
-            for name in cls.model_fields.keys()
+            name: env.get(name, value) for name, value in zip(cls._field_names(), key)
         }
 
         # Filter out None values
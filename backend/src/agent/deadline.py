@@ -0,0 +1,60 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Call latency assumed for a stage before any call to its model has been observed
+DEFAULT_CALL_SECONDS = {
+    "query": 3.0,
+    "search": 8.0,
+    "reflection": 6.0,
+    "answer": 20.0,
+}
+
+
+class Deadline:
+    """Wall-clock budget of a research run, measured from the start of `generate_query`."""
+
+    def __init__(self, started_at: float, budget_seconds: float):
+        self.started_at = started_at
+        self.budget_seconds = budget_seconds
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], configurable) -> Optional["Deadline"]:
+        """Return the run's deadline, or None when the run has no budget.
+
+        A `deadline_seconds` in the state takes precedence over the configuration.
+        """
+        budget = state.get("deadline_seconds")
+        if budget is None:
+            budget = configurable.deadline_seconds
+        if not budget or state.get("started_at") is None:
+            return None
+        return cls(state["started_at"], budget)
+
+    def remaining(self) -> float:
+        """Return the seconds left in the budget (negative once it is exceeded)."""
+        return self.budget_seconds - (time.time() - self.started_at)
+
+    def fit(self, estimate: Callable[[int], float], calls: int, reserve: float) -> int:
+        """Return how many of `calls` parallel calls fit in the budget.
+
+        Args:
+            estimate: Estimated seconds to complete a given number of parallel calls.
+            calls: The number of calls wanted.
+            reserve: Seconds that must stay available for the steps after the calls.
+        """
+        available = self.remaining() - reserve
+        while calls > 0 and estimate(calls) > available:
+            calls -= 1
+        return calls
+
+    def degradation(
+        self, node: str, action: str, estimated: float, **details
+    ) -> Dict[str, Any]:
+        """Build the state record of a degradation applied to stay within the budget."""
+        return {
+            "node": node,
+            "action": action,
+            "remaining_seconds": round(self.remaining(), 2),
+            "estimated_seconds": round(estimated, 2),
+            **details,
+        }
@@ -0,0 +1,61 @@
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def query_shingles(query: str, k: int = 3) -> Set[str]:
+    """Return the character k-gram shingles of each token of a normalized query.
+
+    Shingling per token keeps the set insensitive to word order, so
+    "iphone sales 2024" and "2024 iphone sales" are treated as the same query.
+    """
+    tokens = re.findall(r"\w+", query.lower())
+    shingles = set()
+    for token in tokens:
+        padded = f" {token} "
+        if len(padded) <= k:
+            shingles.add(padded)
+        else:
+            shingles.update(padded[i : i + k] for i in range(len(padded) - k + 1))
+    return shingles
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Return the Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def dedupe_queries(
+    queries: Iterable[str], seen: Iterable[str], threshold: float
+) -> Tuple[List[str], List[Dict[str, str]]]:
+    """Drop queries that nearly repeat an already seen query or an earlier candidate.
+
+    Args:
+        queries: The candidate queries, in priority order.
+        seen: Queries that have already been searched.
+        threshold: Jaccard similarity of the query shingles at or above which a
+            candidate counts as a duplicate.
+
+    Returns:
+        The kept queries, and a record for each dropped query naming the query it
+        duplicated.
+    """
+    reference = [(query, query_shingles(query)) for query in seen]
+    kept, dropped = [], []
+    for query in queries:
+        shingles = query_shingles(query)
+        duplicate_of = next(
+            (
+                other
+                for other, other_shingles in reference
+                if jaccard(shingles, other_shingles) >= threshold
+            ),
+            None,
+        )
+        if duplicate_of is None:
+            kept.append(query)
+            reference.append((query, shingles))
+        else:
+            dropped.append({"query": query, "duplicate_of": duplicate_of})
+    return kept, dropped
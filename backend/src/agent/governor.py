@@ -0,0 +1,364 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agent.metrics import record_queue_wait, record_retry
+
+# Lower values are served first when calls queue, across all models
+PRIORITY_FINALIZE = 0
+PRIORITY_REFLECTION = 1
+PRIORITY_QUERY = 1
+PRIORITY_SEARCH = 2
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """Return whether an exception signals provider throttling or overload.
+
+    Checks the HTTP status of the error and of the errors it was raised from, and
+    the `RESOURCE_EXHAUSTED` status of wrapped gRPC/genai errors; numbers elsewhere
+    in the message (urls, ids) don't count.
+    """
+    while error is not None:
+        code = getattr(error, "code", None) or getattr(error, "status_code", None)
+        if code in (429, 503) or "RESOURCE_EXHAUSTED" in str(error):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _env_settings() -> Dict[str, Any]:
+    settings: Dict[str, Any] = {}
+    for name, env, cast in (
+        ("rate", "GEMINI_REQUESTS_PER_SECOND", float),
+        ("burst", "GEMINI_REQUEST_BURST", float),
+        ("initial_concurrency", "GEMINI_INITIAL_CONCURRENCY", int),
+        ("max_concurrency", "GEMINI_MAX_CONCURRENCY", int),
+        ("total_concurrency", "GEMINI_TOTAL_CONCURRENCY", int),
+        ("max_attempts", "GEMINI_MAX_ATTEMPTS", int),
+    ):
+        if os.environ.get(env):
+            settings[name] = cast(os.environ[env])
+    return settings
+
+
+class TokenBucket:
+    """Token bucket that hands out start times instead of blocking."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+        self.cancelled = False
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _ModelState:
+    """Rate, concurrency limit and latency averages of a single model."""
+
+    def __init__(self, governor: "ModelGovernor"):
+        self.bucket = TokenBucket(governor.rate, governor.burst)
+        self.limit = float(governor.initial_concurrency)
+        self.in_flight = 0
+        # Per stage, as e.g. grounded searches and query generation share a model
+        # but take very different times
+        self.latency: Dict[str, float] = {}
+        self.throttled = 0
+
+
+class ModelGovernor:
+    """Process-wide governor for Gemini calls.
+
+    Every call acquires a concurrency slot for its model and one of the
+    `total_concurrency` slots shared by all models, waits for a token from the
+    model's token bucket and is retried with jittered exponential backoff when the
+    provider throttles. The per-model limit adapts with AIMD: it grows additively
+    while calls succeed at normal latency and shrinks multiplicatively on throttling
+    (sharply) or on latency spikes (gently). Latency is averaged per model and stage,
+    so a spike is judged against calls of the same kind.
+
+    Waiting calls of all models share one queue: lower priority values are served
+    first, so e.g. `finalize_answer` overtakes new `web_research` fan-out even when
+    they use different models. A call whose model is at its limit does not hold up
+    calls to other models.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: float = 20.0,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        total_concurrency: int = 32,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        latency_spike: float = 3.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.total_concurrency = total_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_spike = latency_spike
+        self._models: Dict[str, _ModelState] = {}
+        self._waiters: List[tuple] = []
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "ModelGovernor":
+        """Create a governor, reading rate and concurrency settings from the environment."""
+        return cls(**_env_settings())
+
+    def refresh_env(self) -> None:
+        """Re-read the environment settings, e.g. after `.env` has been loaded."""
+        with self._lock:
+            for name, value in _env_settings().items():
+                setattr(self, name, value)
+            for state in self._models.values():
+                state.bucket.rate, state.bucket.burst = self.rate, self.burst
+
+    def call(
+        self,
+        model: str,
+        fn: Callable[[], Any],
+        priority: int = PRIORITY_SEARCH,
+        stage: str = "search",
+    ):
+        """Run `fn` under the governor for `model`, blocking the calling thread while queued.
+
+        `stage` names the kind of call (e.g. "search" or "answer") its latency is
+        averaged with.
+        """
+        for attempt in range(self.max_attempts):
+            queued = time.monotonic()
+            state = self._acquire(model, priority)
+            try:
+                time.sleep(state.bucket.reserve())
+                start = time.monotonic()
+                record_queue_wait(start - queued)
+                result = fn()
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                self._release(state, stage, time.monotonic() - start, throttled)
+                if not throttled or attempt == self.max_attempts - 1:
+                    raise
+                record_retry()
+                time.sleep(self._backoff(attempt))
+                continue
+            except BaseException:
+                # e.g. KeyboardInterrupt; the slot is returned without a latency sample
+                self._release(state, stage, None, False)
+                raise
+            self._release(state, stage, time.monotonic() - start, False)
+            return result
+
+    async def acall(
+        self,
+        model: str,
+        fn: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_SEARCH,
+        stage: str = "search",
+    ):
+        """Async variant of `call`; `fn` returns the awaitable to run."""
+        for attempt in range(self.max_attempts):
+            queued = time.monotonic()
+            state = await self._aacquire(model, priority)
+            try:
+                await asyncio.sleep(state.bucket.reserve())
+                start = time.monotonic()
+                record_queue_wait(start - queued)
+                result = await fn()
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                self._release(state, stage, time.monotonic() - start, throttled)
+                if not throttled or attempt == self.max_attempts - 1:
+                    raise
+                record_retry()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except BaseException:
+                # Cancellation; the slot is returned without a latency sample
+                self._release(state, stage, None, False)
+                raise
+            self._release(state, stage, time.monotonic() - start, False)
+            return result
+
+    def estimate(
+        self, model: str, calls: int = 1, default: float = 0.0, stage: str = "search"
+    ) -> float:
+        """Estimate the seconds `calls` parallel `stage` calls to `model` take from now.
+
+        Uses the latency average of the model's `stage` calls (`default` until one
+        has completed), with calls beyond the current concurrency limits, or queued
+        behind calls waiting for the model, running in further waves.
+        """
+        with self._lock:
+            state = self._models.get(model)
+            if state is None:
+                latency, limit, queued = default, self.initial_concurrency, 0
+            else:
+                latency = state.latency.get(stage, default)
+                limit, queued = int(state.limit), self._queued(state)
+        limit = min(limit, self.total_concurrency)
+        waves = -(-(calls + queued) // max(1, limit))
+        return waves * latency
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the current limit, in-flight and queued calls and throttle count per model."""
+        with self._lock:
+            return {
+                model: {
+                    "limit": state.limit,
+                    "in_flight": state.in_flight,
+                    "queued": self._queued(state),
+                    "throttled": state.throttled,
+                }
+                for model, state in self._models.items()
+            }
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(self)
+        return state
+
+    def _queued(self, state: _ModelState) -> int:
+        return sum(w[3] is state and not w[2].cancelled for w in self._waiters)
+
+    def _enqueue(self, model: str, priority: int, waiter: _Waiter) -> _ModelState:
+        with self._lock:
+            state = self._state(model)
+            heapq.heappush(self._waiters, (priority, next(self._seq), waiter, state))
+            woken = self._dispatch()
+        for other in woken:
+            if other is not waiter:
+                other.wake()
+        return state
+
+    def _dispatch(self) -> List[_Waiter]:
+        # Grant free slots in priority order; calls whose model is at its limit
+        # keep their place without blocking calls to other models
+        woken, blocked = [], []
+        while self._waiters and self._in_flight < self.total_concurrency:
+            entry = heapq.heappop(self._waiters)
+            _, _, waiter, state = entry
+            if waiter.cancelled:
+                continue
+            if state.in_flight >= int(state.limit):
+                blocked.append(entry)
+                continue
+            waiter.granted = True
+            state.in_flight += 1
+            self._in_flight += 1
+            woken.append(waiter)
+        for entry in blocked:
+            heapq.heappush(self._waiters, entry)
+        return woken
+
+    def _acquire(self, model: str, priority: int) -> _ModelState:
+        waiter = _Waiter()
+        state = self._enqueue(model, priority, waiter)
+        if not waiter.granted:
+            try:
+                waiter.event.wait()
+            except BaseException:
+                self._abandon(state, waiter)
+                raise
+        return state
+
+    async def _aacquire(self, model: str, priority: int) -> _ModelState:
+        waiter = _Waiter(asyncio.get_running_loop())
+        state = self._enqueue(model, priority, waiter)
+        if not waiter.granted:
+            try:
+                await waiter.future
+            except BaseException:
+                self._abandon(state, waiter)
+                raise
+        return state
+
+    def _abandon(self, state: _ModelState, waiter: _Waiter) -> None:
+        # A waiter that gave up is skipped by `_dispatch`, or returns the slot it was
+        # granted while it was being interrupted
+        with self._lock:
+            waiter.cancelled = True
+            granted = waiter.granted
+        if granted:
+            self._release(state, None, None, False)
+
+    def _release(
+        self,
+        state: _ModelState,
+        stage: Optional[str],
+        latency: Optional[float],
+        throttled: bool,
+    ):
+        with self._lock:
+            state.in_flight -= 1
+            self._in_flight -= 1
+            if throttled:
+                state.throttled += 1
+                state.limit = max(self.min_concurrency, state.limit / 2)
+            elif latency is not None:
+                average = state.latency.get(stage)
+                if average is not None and latency > self.latency_spike * average:
+                    state.limit = max(self.min_concurrency, state.limit * 0.9)
+                else:
+                    state.limit = min(
+                        self.max_concurrency, state.limit + 1 / state.limit
+                    )
+                state.latency[stage] = (
+                    latency if average is None else 0.8 * average + 0.2 * latency
+                )
+            woken = self._dispatch()
+        for waiter in woken:
+            waiter.wake()
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so throttled callers don't retry in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
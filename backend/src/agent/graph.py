@@ -1,13 +1,26 @@
+import asyncio
 import os
+import time
+from functools import cache
+from typing import Any
 
-from agent.tools_and_schemas import SearchQueryList, Reflection
+from agent.tools_and_schemas import (
+    IncrementalReflection,
+    Reflection,
+    ScoredIncrementalReflection,
+    ScoredReflection,
+    ScoredSearchQueryList,
+    SearchQueryList,
+)
 from dotenv import load_dotenv
 from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.types import Send
 from langgraph.graph import StateGraph
 from langgraph.graph import START, END
 from langchain_core.runnables import RunnableConfig
-from google.genai import Client
 
 from agent.state import (
     OverallState,
@@ -15,29 +28,56 @@ from agent.state import (
     ReflectionState,
     WebSearchState,
 )
+from agent import metrics
+from agent.cascade import acascade, cascade
+from agent.coalesce import SingleFlight
+from agent.compaction import compact_research
 from agent.configuration import Configuration
+from agent.deadline import DEFAULT_CALL_SECONDS, Deadline
+from agent.dedup import dedupe_queries
+from agent.governor import (
+    PRIORITY_FINALIZE,
+    PRIORITY_QUERY,
+    PRIORITY_REFLECTION,
+    PRIORITY_SEARCH,
+    ModelGovernor,
+)
+from agent.history import build_research_topic, format_messages, split_history
+from agent.memory import ResearchMemory, get_research_memory, renumber_short_urls
+from agent.resilience import LatencyWindow, ahedged, call_with_timeout, hedged
+from agent.search_cache import get_search_cache, search_cache_key
+from agent.search_stream import GroundedStream
+from agent.sources import build_source_table, count_cited_urls, expand_source_table
+from agent.sufficiency import latest_question, precheck
 from agent.prompts import (
     get_current_date,
     query_writer_instructions,
     web_searcher_instructions,
     reflection_instructions,
+    incremental_reflection_instructions,
+    history_summary_instructions,
     answer_instructions,
 )
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agent.clients import LLMRegistry, get_genai_client
 from agent.utils import (
     get_citations,
     get_research_topic,
     insert_citation_markers,
     resolve_urls,
+    ShortUrlRewriter,
 )
 
-load_dotenv()
-
-if os.getenv("GEMINI_API_KEY") is None:
-    raise ValueError("GEMINI_API_KEY is not set")
-
-# Used for Google Search API
-genai_client = Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Shared chat models for the LLM nodes, built on first use on the same transport
+# as the genai client used for the Google Search API
+llm_registry = LLMRegistry(callbacks=[metrics.usage_handler])
+# Concurrent identical searches in this process share one upstream call
+search_flight = SingleFlight()
+metrics.registry.register_stats("llm_registry", llm_registry.stats)
+metrics.registry.register_stats("search_flight", search_flight.stats)
+# Every Gemini call below goes through the governor for rate limiting and retries
+governor = ModelGovernor.from_env()
+# Recent grounded search latencies, for hedging slow searches
+search_latencies = LatencyWindow()
 
 
 # Nodes
@@ -55,40 +95,235 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
         Dictionary with state update, including search_query key containing the generated queries
     """
     configurable = Configuration.from_runnable_config(config)
+    pending = _pending_history(state, configurable)
+    if pending is not None:
+        summary_prompt, count = pending
+        summary = governor.call(
+            configurable.query_generator_model,
+            lambda: _history_llm(configurable).invoke(summary_prompt),
+            PRIORITY_QUERY,
+            "history",
+        )
+        state["history_summary"], state["history_summary_count"] = (
+            summary.content,
+            count,
+        )
+    formatted_prompt = _query_writer_prompt(state, configurable)
+
+    # Generate the search queries
+    def generate(model, llm):
+        return governor.call(
+            model, lambda: llm.invoke(formatted_prompt), PRIORITY_QUERY, "query"
+        )
+
+    result = _cascade(
+        "generate_query",
+        configurable,
+        configurable.query_generator_model,
+        generate,
+        SearchQueryList,
+        ScoredSearchQueryList,
+    )
+    return _query_generation_update(state, result, configurable)
+
+
+async def agenerate_query(
+    state: OverallState, config: RunnableConfig
+) -> QueryGenerationState:
+    """Async variant of `generate_query`, used when the graph runs under `ainvoke`/`astream`."""
+    configurable = Configuration.from_runnable_config(config)
+    pending = _pending_history(state, configurable)
+    if pending is not None:
+        summary_prompt, count = pending
+        summary = await governor.acall(
+            configurable.query_generator_model,
+            lambda: _history_llm(configurable).ainvoke(summary_prompt),
+            PRIORITY_QUERY,
+            "history",
+        )
+        state["history_summary"], state["history_summary_count"] = (
+            summary.content,
+            count,
+        )
+    formatted_prompt = _query_writer_prompt(state, configurable)
+
+    def generate(model, llm):
+        return governor.acall(
+            model, lambda: llm.ainvoke(formatted_prompt), PRIORITY_QUERY, "query"
+        )
+
+    result = await _acascade(
+        "generate_query",
+        configurable,
+        configurable.query_generator_model,
+        generate,
+        SearchQueryList,
+        ScoredSearchQueryList,
+    )
+    return _query_generation_update(state, result, configurable)
+
+
+def _cascade(stage, configurable, model, generate, schema, scored_schema):
+    # With the cascade on, the fast model answers first and `model` only when the
+    # fast answer is invalid or not confident enough
+    llm = llm_registry.get(model, 1.0, schema)
+    fast_model = configurable.cascade_model
+    if not configurable.model_cascade or fast_model == model:
+        return generate(model, llm)
+    fast_llm = llm_registry.get(fast_model, 1.0, scored_schema)
+    return cascade(
+        stage,
+        lambda: generate(fast_model, fast_llm),
+        lambda: generate(model, llm),
+        configurable.cascade_min_confidence,
+    )
+
+
+async def _acascade(stage, configurable, model, generate, schema, scored_schema):
+    llm = llm_registry.get(model, 1.0, schema)
+    fast_model = configurable.cascade_model
+    if not configurable.model_cascade or fast_model == model:
+        return await generate(model, llm)
+    fast_llm = llm_registry.get(fast_model, 1.0, scored_schema)
+    return await acascade(
+        stage,
+        lambda: generate(fast_model, fast_llm),
+        lambda: generate(model, llm),
+        configurable.cascade_min_confidence,
+    )
+
+
+def _pending_history(
+    state: OverallState, configurable: Configuration
+) -> tuple[str, int] | None:
+    # The history summary is kept in the thread's state, so each turn only folds the
+    # messages that left the window since the last turn into it
+    if configurable.history_strategy != "summarize":
+        return None
+    older, _ = split_history(
+        state["messages"],
+        configurable.history_strategy,
+        configurable.history_max_turns,
+        configurable.history_max_tokens,
+    )
+    summary = state.get("history_summary") or ""
+    summarized = state.get("history_summary_count", 0)
+    if summarized > len(older):
+        # The window grew, so the summary covers messages that are sent in full again
+        summary, summarized = "", 0
+    if summarized == len(older):
+        return None
+    prompt = history_summary_instructions.format(
+        summary=summary or "(empty)",
+        conversation=format_messages(older[summarized:], compact=True),
+    )
+    return prompt, len(older)
+
+
+def _history_llm(configurable: Configuration):
+    # The summary is internal, so its tokens are kept out of the messages stream
+    return llm_registry.get(configurable.query_generator_model, 0).with_config(
+        tags=[TAG_NOSTREAM]
+    )
+
+
+def _query_writer_prompt(state: OverallState, configurable: Configuration) -> str:
+    # The run's deadline, if any, counts from here
+    state["started_at"] = time.time()
+    # Built once per turn and reused by reflection and finalize_answer
+    state["research_topic"] = build_research_topic(
+        state["messages"],
+        configurable.history_strategy,
+        configurable.history_max_turns,
+        configurable.history_max_tokens,
+        state.get("history_summary"),
+    )
 
     # check for custom initial search query count
     if state.get("initial_search_query_count") is None:
         state["initial_search_query_count"] = configurable.number_of_initial_queries
 
-    # init Gemini 2.0 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.query_generator_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-    structured_llm = llm.with_structured_output(SearchQueryList)
-
     # Format the prompt
     current_date = get_current_date()
-    formatted_prompt = query_writer_instructions.format(
+    return query_writer_instructions.format(
         current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
+        research_topic=state["research_topic"],
         number_queries=state["initial_search_query_count"],
     )
-    # Generate the search queries
-    result = structured_llm.invoke(formatted_prompt)
-    return {"search_query": result.query}
+
+
+def _query_generation_update(
+    state: OverallState, result: SearchQueryList, configurable: Configuration
+) -> QueryGenerationState:
+    # Drop near-duplicate queries before they are fanned out to web research
+    queries, dropped = dedupe_queries(
+        result.query, [], configurable.query_dedup_threshold
+    )
+    # Search at least once, even when the deadline is already tight
+    queries, degradations = _fit_search_fanout(
+        state, queries, configurable, "generate_query", minimum=1
+    )
+    return {
+        "search_query": queries,
+        "dropped_queries": dropped,
+        "turn_query_offset": len(state.get("search_query") or []),
+        "turn_result_offset": len(state.get("web_research_result") or []),
+        "started_at": state["started_at"],
+        "research_topic": state["research_topic"],
+        "history_summary": state.get("history_summary", ""),
+        "history_summary_count": state.get("history_summary_count", 0),
+        "degradations": degradations,
+    }
+
+
+def _estimate(model: str, stage: str, calls: int = 1) -> float:
+    # Expected seconds for `calls` parallel calls, from the governor's recent latencies
+    return governor.estimate(model, calls, DEFAULT_CALL_SECONDS[stage], stage)
+
+
+def _fit_search_fanout(
+    state: OverallState,
+    queries: list[str],
+    configurable: Configuration,
+    node: str,
+    minimum: int = 0,
+) -> tuple[list[str], list[dict]]:
+    # Keep as many queries as can be searched, reflected on and answered in time
+    deadline = Deadline.from_state(state, configurable)
+    if deadline is None or not queries:
+        return queries, []
+    reflection_model = state.get("reasoning_model", configurable.reflection_model)
+    answer_model = state.get("reasoning_model") or configurable.answer_model
+    reserve = _estimate(reflection_model, "reflection") + _estimate(
+        answer_model, "answer"
+    )
+    search_model = configurable.query_generator_model
+    keep = deadline.fit(
+        lambda calls: _estimate(search_model, "search", calls), len(queries), reserve
+    )
+    keep = max(keep, minimum)
+    if keep >= len(queries):
+        return queries, []
+    degradation = deadline.degradation(
+        node,
+        "shrink_fanout" if keep else "stop_research",
+        _estimate(search_model, "search", len(queries)) + reserve,
+        dropped_queries=queries[keep:],
+    )
+    return queries[:keep], [degradation]
 
 
 def continue_to_web_research(state: QueryGenerationState):
     """LangGraph node that sends the search queries to the web research node.
 
-    This is used to spawn n number of web research nodes, one for each search query.
+    This is used to spawn n number of web research nodes, one for each search query
+    generated this turn; `search_query` also holds the queries of earlier turns,
+    which are neither searched again nor reuse their ids.
     """
+    offset = state.get("turn_query_offset", 0)
     return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
-        for idx, search_query in enumerate(state["search_query"])
+        Send("web_research", {"search_query": search_query, "id": offset + idx})
+        for idx, search_query in enumerate(state["search_query"][offset:])
     ]
 
 
@@ -96,46 +331,280 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """LangGraph node that performs web research using the native Google Search API tool.
 
     Executes a web search using the native Google Search API tool in combination with Gemini 2.0 Flash.
+    A search that fails, exceeds `web_research_timeout_seconds` or returns a response
+    without grounding metadata yields an empty result and an entry in
+    `web_research_errors`, unless `web_research_error_policy` is 'raise'.
+    With a research memory configured, a fresh remembered result for a near-identical
+    query is reused instead of searching, and new results are added to the memory.
 
     Args:
         state: Current graph state containing the search query and research loop count
         config: Configuration for the runnable, including search API settings
 
     Returns:
-        Dictionary with state update, including sources_gathered, research_loop_count, and web_research_results
+        Dictionary with state update, including source_table, search_query, and web_research_results
     """
     # Configure
     configurable = Configuration.from_runnable_config(config)
+    memory = _research_memory(configurable)
+    remembered = _recall(state, memory, configurable)
+    if remembered is not None:
+        return remembered
+    try:
+        response = call_with_timeout(
+            lambda: _search(state, configurable),
+            configurable.web_research_timeout_seconds,
+        )
+        # Branches that shared a response still number their short urls with their
+        # own id; a response without grounding metadata fails the branch too
+        update = _web_research_update(state, response)
+    except Exception as e:
+        if configurable.web_research_error_policy == "raise":
+            raise
+        return _failed_web_research_update(state, e)
+    if memory is not None:
+        memory.add(*_memory_entry(state, update))
+    return update
+
+
+async def aweb_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+    """Async variant of `web_research`, using the non-blocking async genai API."""
+    configurable = Configuration.from_runnable_config(config)
+    memory = _research_memory(configurable)
+    remembered = _recall(state, memory, configurable)
+    if remembered is not None:
+        return remembered
+    try:
+        response = await asyncio.wait_for(
+            _asearch(state, configurable),
+            configurable.web_research_timeout_seconds,
+        )
+        update = _web_research_update(state, response)
+    except Exception as e:
+        if configurable.web_research_error_policy == "raise":
+            raise
+        return _failed_web_research_update(state, e)
+    if memory is not None:
+        await memory.aadd(*_memory_entry(state, update))
+    return update
+
+
+def _research_memory(configurable: Configuration) -> ResearchMemory | None:
+    return get_research_memory(
+        configurable.research_memory_backend,
+        configurable.research_memory_path,
+        configurable.research_memory_max_entries,
+    )
+
+
+def _recall(
+    state: WebSearchState, memory: ResearchMemory | None, configurable: Configuration
+) -> OverallState | None:
+    # A fresh result for a (nearly) identical query replaces the web search
+    if memory is None:
+        return None
+    hit = memory.search(
+        state["search_query"],
+        configurable.research_memory_max_age_seconds,
+        configurable.research_memory_min_similarity,
+    )
+    if hit is None:
+        return None
+    sources = [
+        {**source, "short_url": renumber_short_urls(source["short_url"], state["id"])}
+        for source in hit["sources"]
+    ]
+    return {
+        "source_table": build_source_table(sources),
+        "search_query": [state["search_query"]],
+        "web_research_result": [renumber_short_urls(hit["text"], state["id"])],
+        "memory_hits": [
+            {
+                "search_query": state["search_query"],
+                "matched_query": hit["query"],
+                "similarity": round(hit["similarity"], 3),
+                "age_seconds": round(hit["age_seconds"], 1),
+            }
+        ],
+    }
+
+
+def _memory_entry(state: WebSearchState, update: OverallState) -> tuple:
+    return (
+        state["search_query"],
+        update["web_research_result"][0],
+        expand_source_table(update["source_table"]),
+    )
+
+
+def _search(state: WebSearchState, configurable: Configuration):
+    writer = get_stream_writer()
+    cache, cache_key = _search_cache(state, configurable)
+    response = cache.get(cache_key) if cache is not None else None
+    if response is not None:
+        return response
+
+    def search():
+        # Uses the google genai client as the langchain client doesn't return grounding metadata
+        def generate():
+            return governor.call(
+                configurable.query_generator_model,
+                lambda: _generate_search(state, configurable, writer),
+                PRIORITY_SEARCH,
+                "search",
+            )
+
+        start = time.monotonic()
+        response = hedged(generate, _hedge_delay(configurable))
+        search_latencies.add(time.monotonic() - start)
+        metrics.record_genai_usage(response)
+        if cache is not None:
+            cache.set(cache_key, response)
+        return response
+
+    return search_flight.do(cache_key, search)
+
+
+async def _asearch(state: WebSearchState, configurable: Configuration):
+    writer = get_stream_writer()
+    cache, cache_key = _search_cache(state, configurable)
+    response = await cache.aget(cache_key) if cache is not None else None
+    if response is not None:
+        return response
+
+    async def search():
+        def generate():
+            return governor.acall(
+                configurable.query_generator_model,
+                lambda: _agenerate_search(state, configurable, writer),
+                PRIORITY_SEARCH,
+                "search",
+            )
+
+        start = time.monotonic()
+        response = await ahedged(generate, _hedge_delay(configurable))
+        search_latencies.add(time.monotonic() - start)
+        metrics.record_genai_usage(response)
+        if cache is not None:
+            await cache.aset(cache_key, response)
+        return response
+
+    return await search_flight.ado(cache_key, search)
+
+
+def _generate_search(state: WebSearchState, configurable: Configuration, writer):
+    request = _web_search_request(state, configurable)
+    if not configurable.stream_web_research:
+        return get_genai_client().models.generate_content(**request)
+    stream = GroundedStream(_search_events(state, writer))
+    for chunk in get_genai_client().models.generate_content_stream(**request):
+        stream.feed(chunk)
+    return stream.response()
+
+
+async def _agenerate_search(state: WebSearchState, configurable: Configuration, writer):
+    request = _web_search_request(state, configurable)
+    if not configurable.stream_web_research:
+        return await get_genai_client().aio.models.generate_content(**request)
+    stream = GroundedStream(_search_events(state, writer))
+    async for chunk in await get_genai_client().aio.models.generate_content_stream(
+        **request
+    ):
+        stream.feed(chunk)
+    return stream.response()
+
+
+def _search_events(state: WebSearchState, writer):
+    # Partial research of a streaming branch, as custom stream events
+    def emit(event: dict) -> None:
+        writer(
+            {
+                "node": "web_research",
+                "id": state["id"],
+                "search_query": state["search_query"],
+                **event,
+            }
+        )
+
+    return emit
+
+
+def _hedge_delay(configurable: Configuration) -> float | None:
+    # None (no hedging) until enough searches have been observed. Streamed searches
+    # are not hedged, as two streams would interleave their events.
+    if (
+        configurable.web_research_hedge_percentile is None
+        or configurable.stream_web_research
+    ):
+        return None
+    return search_latencies.percentile(configurable.web_research_hedge_percentile)
+
+
+def _search_cache(state: WebSearchState, configurable: Configuration):
+    cache = get_search_cache(
+        configurable.search_cache_backend,
+        configurable.search_cache_path,
+        configurable.search_cache_ttl_seconds,
+        configurable.search_cache_max_size,
+    )
+    return cache, search_cache_key(
+        state["search_query"], configurable.query_generator_model
+    )
+
+
+def _web_search_request(
+    state: WebSearchState, configurable: Configuration
+) -> dict[str, Any]:
     formatted_prompt = web_searcher_instructions.format(
         current_date=get_current_date(),
         research_topic=state["search_query"],
     )
-
-    # Uses the google genai client as the langchain client doesn't return grounding metadata
-    response = genai_client.models.generate_content(
-        model=configurable.query_generator_model,
-        contents=formatted_prompt,
-        config={
+    return {
+        "model": configurable.query_generator_model,
+        "contents": formatted_prompt,
+        "config": {
             "tools": [{"google_search": {}}],
             "temperature": 0,
         },
-    )
+    }
+
+
+def _web_research_update(state: WebSearchState, response) -> OverallState:
     # resolve the urls to short urls for saving tokens and time
-    resolved_urls = resolve_urls(
-        response.candidates[0].grounding_metadata.grounding_chunks, state["id"]
-    )
+    grounding_chunks = response.candidates[0].grounding_metadata.grounding_chunks
+    metrics.record_grounding_chunks(len(grounding_chunks))
+    resolved_urls = resolve_urls(grounding_chunks, state["id"])
     # Gets the citations and adds them to the generated text
     citations = get_citations(response, resolved_urls)
     modified_text = insert_citation_markers(response.text, citations)
-    sources_gathered = [item for citation in citations for item in citation["segments"]]
+    source_table = build_source_table(
+        item for citation in citations for item in citation["segments"]
+    )
 
     return {
-        "sources_gathered": sources_gathered,
+        "source_table": source_table,
         "search_query": [state["search_query"]],
         "web_research_result": [modified_text],
     }
 
 
+def _failed_web_research_update(
+    state: WebSearchState, error: Exception
+) -> OverallState:
+    # The branch contributes no result, so the run continues with the branches that completed
+    return {
+        "search_query": [state["search_query"]],
+        "web_research_result": [],
+        "web_research_errors": [
+            {
+                "id": state["id"],
+                "search_query": state["search_query"],
+                "error": f"{type(error).__name__}: {error}".rstrip(": "),
+            }
+        ],
+    }
+
+
 def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     """LangGraph node that identifies knowledge gaps and generates potential follow-up queries.
 
@@ -151,33 +620,214 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
         Dictionary with state update, including search_query key containing the generated follow-up query
     """
     configurable = Configuration.from_runnable_config(config)
+    skipped = _skip_reflection(state, configurable)
+    if skipped is not None:
+        return skipped
+    prechecked = _precheck_reflection(state, configurable)
+    if prechecked is not None:
+        return prechecked
+    formatted_prompt, reasoning_model = _reflection_prompt(state, configurable)
+
+    def generate(model, llm):
+        return governor.call(
+            model,
+            lambda: llm.invoke(formatted_prompt),
+            PRIORITY_REFLECTION,
+            "reflection",
+        )
+
+    result = _cascade(
+        "reflection",
+        configurable,
+        reasoning_model,
+        generate,
+        *_reflection_schemas(configurable),
+    )
+    return _reflection_update(state, result, configurable)
+
+
+async def areflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+    """Async variant of `reflection`."""
+    configurable = Configuration.from_runnable_config(config)
+    skipped = _skip_reflection(state, configurable)
+    if skipped is not None:
+        return skipped
+    prechecked = _precheck_reflection(state, configurable)
+    if prechecked is not None:
+        return prechecked
+    formatted_prompt, reasoning_model = _reflection_prompt(state, configurable)
+
+    def generate(model, llm):
+        return governor.acall(
+            model,
+            lambda: llm.ainvoke(formatted_prompt),
+            PRIORITY_REFLECTION,
+            "reflection",
+        )
+
+    result = await _acascade(
+        "reflection",
+        configurable,
+        reasoning_model,
+        generate,
+        *_reflection_schemas(configurable),
+    )
+    return _reflection_update(state, result, configurable)
+
+
+def _skip_reflection(
+    state: OverallState, configurable: Configuration
+) -> ReflectionState | None:
+    # Go straight to the answer when a reflection would not leave time for it
+    deadline = Deadline.from_state(state, configurable)
+    if deadline is None:
+        return None
+    reasoning_model = state.get("reasoning_model", configurable.reflection_model)
+    answer_model = state.get("reasoning_model") or configurable.answer_model
+    estimated = _estimate(reasoning_model, "reflection") + _estimate(
+        answer_model, "answer"
+    )
+    if deadline.remaining() >= estimated:
+        return None
+    return {
+        "is_sufficient": False,
+        "knowledge_gap": "",
+        "follow_up_queries": [],
+        "research_loop_count": state.get("research_loop_count", 0) + 1,
+        "number_of_ran_queries": len(state["search_query"]),
+        "degradations": [
+            deadline.degradation("reflection", "skip_reflection", estimated)
+        ],
+    }
+
+
+def _precheck_reflection(
+    state: OverallState, configurable: Configuration
+) -> ReflectionState | None:
+    # Decide without the model when the research clearly does or doesn't cover the question
+    if not configurable.sufficiency_precheck:
+        return None
+    question = latest_question(state["messages"])
+    if question is None:
+        return None
+    # Only this turn's research counts; the thread's earlier turns answered other questions
+    decision = precheck(
+        question,
+        _turn_results(state),
+        _source_count(state),
+        configurable.precheck_sufficient_coverage,
+        configurable.precheck_sufficient_sources,
+        configurable.precheck_insufficient_coverage,
+        state.get("initial_search_query_count")
+        or configurable.number_of_initial_queries,
+    )
+    outcome = {True: "sufficient", False: "insufficient", None: "undecided"}
+    metrics.record_cascade("reflection_precheck", outcome[decision["is_sufficient"]])
+    if decision["is_sufficient"] is None:
+        return None
+    state["research_loop_count"] = state.get("research_loop_count", 0) + 1
+    result = Reflection(
+        is_sufficient=decision["is_sufficient"],
+        knowledge_gap=decision.get("knowledge_gap", ""),
+        follow_up_queries=decision.get("follow_up_queries", []),
+    )
+    return _reflection_update(state, result, configurable, "precheck")
+
+
+def _turn_results(state: OverallState) -> list[str]:
+    return state["web_research_result"][state.get("turn_result_offset", 0) :]
+
+
+def _source_count(state: OverallState) -> int:
+    # Distinct sources cited by this turn's research
+    return count_cited_urls(state.get("source_table"), _turn_results(state))
+
+
+def _reflection_prompt(
+    state: OverallState, configurable: Configuration
+) -> tuple[str, str]:
     # Increment the research loop count and get the reasoning model
     state["research_loop_count"] = state.get("research_loop_count", 0) + 1
     reasoning_model = state.get("reasoning_model", configurable.reflection_model)
 
     # Format the prompt
     current_date = get_current_date()
-    formatted_prompt = reflection_instructions.format(
-        current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
-    )
-    # init Reasoning Model
-    llm = ChatGoogleGenerativeAI(
-        model=reasoning_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-    result = llm.with_structured_output(Reflection).invoke(formatted_prompt)
+    if configurable.incremental_reflection:
+        # Only send the results gathered since the last loop, on top of the running summary
+        new_results = state["web_research_result"][
+            state.get("summarized_result_count", 0) :
+        ]
+        formatted_prompt = incremental_reflection_instructions.format(
+            current_date=current_date,
+            research_topic=_research_topic(state),
+            knowledge_summary=state.get("knowledge_summary") or "(empty)",
+            summaries="\n\n---\n\n".join(new_results),
+        )
+    else:
+        formatted_prompt = reflection_instructions.format(
+            current_date=current_date,
+            research_topic=_research_topic(state),
+            summaries="\n\n---\n\n".join(state["web_research_result"]),
+        )
+    return formatted_prompt, reasoning_model
 
-    return {
+
+def _research_topic(state: OverallState) -> str:
+    # Runs that did not start at generate_query have no prebuilt topic
+    return state.get("research_topic") or get_research_topic(state["messages"])
+
+
+def _reflection_schemas(configurable: Configuration) -> tuple[type, type]:
+    # The schema of the reflection model and of the cascade's fast tier
+    if configurable.incremental_reflection:
+        return IncrementalReflection, ScoredIncrementalReflection
+    return Reflection, ScoredReflection
+
+
+def _reflection_update(
+    state: OverallState,
+    result: Reflection,
+    configurable: Configuration,
+    decided_by: str = "model",
+) -> ReflectionState:
+    # Drop follow-up queries that nearly repeat a query that was already searched
+    follow_up_queries, dropped = dedupe_queries(
+        result.follow_up_queries,
+        state["search_query"],
+        configurable.query_dedup_threshold,
+    )
+    degradations = []
+    if not result.is_sufficient and state["research_loop_count"] < _max_research_loops(
+        state, configurable
+    ):
+        # Only fan out the follow-up searches that still fit in the deadline
+        follow_up_queries, degradations = _fit_search_fanout(
+            state, follow_up_queries, configurable, "reflection"
+        )
+    update = {
         "is_sufficient": result.is_sufficient,
         "knowledge_gap": result.knowledge_gap,
-        "follow_up_queries": result.follow_up_queries,
+        "follow_up_queries": follow_up_queries,
+        "dropped_queries": dropped,
         "research_loop_count": state["research_loop_count"],
         "number_of_ran_queries": len(state["search_query"]),
+        "degradations": degradations,
+        # Enough to replay the decision offline (see benchmarks/sufficiency_agreement.py)
+        "reflection_decisions": [
+            {
+                "loop": state["research_loop_count"],
+                "is_sufficient": result.is_sufficient,
+                "decided_by": decided_by,
+                "result_offset": state.get("turn_result_offset", 0),
+                "result_count": len(state["web_research_result"]),
+                "source_count": _source_count(state),
+            }
+        ],
     }
+    if isinstance(result, IncrementalReflection):
+        update["knowledge_summary"] = result.knowledge_summary
+        update["summarized_result_count"] = len(state["web_research_result"])
+    return update
 
 
 def evaluate_research(
@@ -197,12 +847,13 @@ def evaluate_research(
         String literal indicating the next node to visit ("web_research" or "finalize_summary")
     """
     configurable = Configuration.from_runnable_config(config)
-    max_research_loops = (
-        state.get("max_research_loops")
-        if state.get("max_research_loops") is not None
-        else configurable.max_research_loops
-    )
-    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
+    max_research_loops = _max_research_loops(state, configurable)
+    if (
+        state["is_sufficient"]
+        or state["research_loop_count"] >= max_research_loops
+        # every follow-up query was a near-duplicate of one already searched
+        or not state["follow_up_queries"]
+    ):
         return "finalize_answer"
     else:
         return [
@@ -217,6 +868,14 @@ def evaluate_research(
         ]
 
 
+def _max_research_loops(state: OverallState, configurable: Configuration) -> int:
+    return (
+        state.get("max_research_loops")
+        if state.get("max_research_loops") is not None
+        else configurable.max_research_loops
+    )
+
+
 def finalize_answer(state: OverallState, config: RunnableConfig):
     """LangGraph node that finalizes the research summary.
 
@@ -231,63 +890,234 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
         Dictionary with state update, including running_summary key containing the formatted final summary with sources
     """
     configurable = Configuration.from_runnable_config(config)
+    formatted_prompt, reasoning_model, compaction = _answer_prompt(state, configurable)
+    reasoning_model, degradations = _answer_model_within_deadline(
+        state, configurable, reasoning_model
+    )
+
+    llm = _answer_llm(reasoning_model)
+    writer = get_stream_writer()
+    sources = expand_source_table(state.get("source_table"))
+
+    answer = _AnswerStream(writer)
+
+    def stream_answer():
+        # Stream the answer, expanding short urls as they complete; a retry after
+        # throttling starts over, so the deltas already sent are reset first
+        rewriter = ShortUrlRewriter(sources)
+        answer.restart()
+        for chunk in llm.stream(formatted_prompt):
+            answer.write(rewriter.feed(chunk.content))
+        answer.write(rewriter.flush())
+        return answer.text(), rewriter
+
+    text, rewriter = governor.call(
+        reasoning_model, stream_answer, PRIORITY_FINALIZE, "answer"
+    )
+    return _finalize_update(sources, text, rewriter, degradations, compaction)
+
+
+async def afinalize_answer(state: OverallState, config: RunnableConfig):
+    """Async variant of `finalize_answer`."""
+    configurable = Configuration.from_runnable_config(config)
+    formatted_prompt, reasoning_model, compaction = _answer_prompt(state, configurable)
+    reasoning_model, degradations = _answer_model_within_deadline(
+        state, configurable, reasoning_model
+    )
+
+    llm = _answer_llm(reasoning_model)
+    writer = get_stream_writer()
+    sources = expand_source_table(state.get("source_table"))
+
+    answer = _AnswerStream(writer)
+
+    async def stream_answer():
+        rewriter = ShortUrlRewriter(sources)
+        answer.restart()
+        async for chunk in llm.astream(formatted_prompt):
+            answer.write(rewriter.feed(chunk.content))
+        answer.write(rewriter.flush())
+        return answer.text(), rewriter
+
+    text, rewriter = await governor.acall(
+        reasoning_model, stream_answer, PRIORITY_FINALIZE, "answer"
+    )
+    return _finalize_update(sources, text, rewriter, degradations, compaction)
+
+
+class _AnswerStream:
+    """Collects the final answer and emits each rewritten delta as a custom stream event."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.parts: list[str] = []
+
+    def restart(self) -> None:
+        # Tell the client to discard the deltas of a previous attempt
+        if self.parts:
+            self.parts = []
+            self.writer({"node": "finalize_answer", "answer_reset": True})
+
+    def write(self, delta: str) -> None:
+        if delta:
+            self.parts.append(delta)
+            self.writer({"node": "finalize_answer", "delta": delta})
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _answer_prompt(
+    state: OverallState, configurable: Configuration
+) -> tuple[str, str, dict | None]:
     reasoning_model = state.get("reasoning_model") or configurable.answer_model
 
+    # Collapse sentences repeated across the research results, keeping their citations
+    summaries, compaction = state["web_research_result"], None
+    if configurable.compact_research:
+        summaries, compaction = compact_research(
+            summaries, configurable.compaction_threshold
+        )
+
     # Format the prompt
     current_date = get_current_date()
     formatted_prompt = answer_instructions.format(
         current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n---\n\n".join(state["web_research_result"]),
+        research_topic=_research_topic(state),
+        summaries="\n---\n\n".join(summaries),
     )
+    return formatted_prompt, reasoning_model, compaction
+
 
-    # init Reasoning Model, default to Gemini 2.5 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=reasoning_model,
-        temperature=0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+def _answer_model_within_deadline(
+    state: OverallState, configurable: Configuration, reasoning_model: str
+) -> tuple[str, list[dict]]:
+    # Fall back to the fast answer model when the answer model would miss the deadline
+    deadline = Deadline.from_state(state, configurable)
+    if deadline is None or reasoning_model == configurable.fast_answer_model:
+        return reasoning_model, []
+    estimated = _estimate(reasoning_model, "answer")
+    if deadline.remaining() >= estimated:
+        return reasoning_model, []
+    degradation = deadline.degradation(
+        "finalize_answer",
+        "fast_answer_model",
+        estimated,
+        model=configurable.fast_answer_model,
     )
-    result = llm.invoke(formatted_prompt)
+    return configurable.fast_answer_model, [degradation]
 
-    # Replace the short urls with the original urls and add all used urls to the sources_gathered
-    unique_sources = []
-    for source in state["sources_gathered"]:
-        if source["short_url"] in result.content:
-            result.content = result.content.replace(
-                source["short_url"], source["value"]
-            )
-            unique_sources.append(source)
 
-    return {
-        "messages": [AIMessage(content=result.content)],
+def _answer_llm(reasoning_model: str):
+    # Reasoning Model, default to Gemini 2.5 Pro. The raw tokens still contain short
+    # urls, so they are kept out of the messages stream in favour of the rewritten deltas.
+    return llm_registry.get(reasoning_model, 0).with_config(tags=[TAG_NOSTREAM])
+
+
+def _finalize_update(
+    sources: list,
+    answer: str,
+    rewriter: ShortUrlRewriter,
+    degradations: list[dict],
+    compaction: dict | None,
+):
+    # Add all the urls used in the answer to the sources_gathered; the expanded
+    # source table already holds one entry per short url
+    unique_sources = [
+        source for source in sources if source["short_url"] in rewriter.used
+    ]
+
+    update = {
+        "messages": [AIMessage(content=answer)],
         "sources_gathered": unique_sources,
+        "degradations": degradations,
     }
+    if compaction is not None:
+        update["research_compaction"] = compaction
+    return update
 
 
-# Create our Agent Graph
-builder = StateGraph(OverallState, config_schema=Configuration)
+def _node(func, afunc) -> RunnableLambda:
+    """Pair a node with its async variant.
 
-# Define the nodes we will cycle between
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("reflection", reflection)
-builder.add_node("finalize_answer", finalize_answer)
+    LangGraph runs `func` under `invoke`/`stream` (e.g. the CLI) and `afunc` under
+    `ainvoke`/`astream` (e.g. the LangGraph API server), so concurrent runs and
+    fan-out branches don't block worker threads on provider I/O.
+
+    Unless `enable_metrics` is off, each run is measured and its record is both
+    added to the process metrics and appended to the state's `run_trace`.
+    """
+    name = func.__name__
+
+    def run(state, config: RunnableConfig):
+        if not Configuration.from_runnable_config(config).enable_metrics:
+            return func(state, config)
+        with metrics.track(name) as record:
+            update = func(state, config)
+        return {**update, "run_trace": [record.summary()]}
+
+    async def arun(state, config: RunnableConfig):
+        if not Configuration.from_runnable_config(config).enable_metrics:
+            return await afunc(state, config)
+        with metrics.track(name) as record:
+            update = await afunc(state, config)
+        return {**update, "run_trace": [record.summary()]}
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+@cache
+def build_graph():
+    """Build and compile the agent graph, once per process.
+
+    Compiling is deferred to the first access of `graph`, so importing this module
+    stays cheap; the environment from `.env` is loaded at the same time.
+
+    Raises:
+        ValueError: If `GEMINI_API_KEY` is not set.
+    """
+    load_dotenv()
+    # Pick up configuration and governor overrides from `.env`
+    Configuration.refresh_env()
+    governor.refresh_env()
+
+    if os.getenv("GEMINI_API_KEY") is None:
+        raise ValueError("GEMINI_API_KEY is not set")
+
+    # Create our Agent Graph
+    builder = StateGraph(OverallState, config_schema=Configuration)
+
+    # Define the nodes we will cycle between
+    builder.add_node("generate_query", _node(generate_query, agenerate_query))
+    builder.add_node(
+        "web_research",
+        _node(web_research, aweb_research),
+        input_schema=WebSearchState,
+    )
+    builder.add_node("reflection", _node(reflection, areflection))
+    builder.add_node("finalize_answer", _node(finalize_answer, afinalize_answer))
+
+    # Set the entrypoint as `generate_query`
+    # This means that this node is the first one called
+    builder.add_edge(START, "generate_query")
+    # Add conditional edge to continue with search queries in a parallel branch
+    builder.add_conditional_edges(
+        "generate_query", continue_to_web_research, ["web_research"]
+    )
+    # Reflect on the web research
+    builder.add_edge("web_research", "reflection")
+    # Evaluate the research
+    builder.add_conditional_edges(
+        "reflection", evaluate_research, ["web_research", "finalize_answer"]
+    )
+    # Finalize the answer
+    builder.add_edge("finalize_answer", END)
+
+    return builder.compile(name="pro-search-agent")
 
-# Set the entrypoint as `generate_query`
-# This means that this node is the first one called
-builder.add_edge(START, "generate_query")
-# Add conditional edge to continue with search queries in a parallel branch
-builder.add_conditional_edges(
-    "generate_query", continue_to_web_research, ["web_research"]
-)
-# Reflect on the web research
-builder.add_edge("web_research", "reflection")
-# Evaluate the research
-builder.add_conditional_edges(
-    "reflection", evaluate_research, ["web_research", "finalize_answer"]
-)
-# Finalize the answer
-builder.add_edge("finalize_answer", END)
 
-graph = builder.compile(name="pro-search-agent")
+def __getattr__(name: str):
+    """Compile the graph on first access of `graph`."""
+    if name == "graph":
+        return build_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
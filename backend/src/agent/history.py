@@ -0,0 +1,106 @@
+import re
+from typing import List, Literal, Optional, Tuple, get_args
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+HistoryStrategy = Literal["full", "last_n", "token_budget", "summarize"]
+HISTORY_STRATEGIES = get_args(HistoryStrategy)
+
+_MARKDOWN_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of `text`, at about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def format_messages(messages: List[AnyMessage], compact: bool = False) -> str:
+    """Render the user and assistant messages as `User: ...`/`Assistant: ...` lines.
+
+    Args:
+        messages: The messages to render; other message types are skipped.
+        compact: Drop the urls of markdown links (citations) from assistant messages.
+    """
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}\n")
+        elif isinstance(message, AIMessage):
+            content = message.content
+            if compact and isinstance(content, str):
+                content = _MARKDOWN_LINK_RE.sub(r"[\1]", content)
+            lines.append(f"Assistant: {content}\n")
+    return "".join(lines)
+
+
+def split_turns(messages: List[AnyMessage]) -> List[List[AnyMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: List[List[AnyMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def split_history(
+    messages: List[AnyMessage],
+    strategy: HistoryStrategy,
+    max_turns: int,
+    max_tokens: int,
+) -> Tuple[List[AnyMessage], List[AnyMessage]]:
+    """Split the conversation into older messages and the recent window sent to the models.
+
+    The latest turn is always in the window.
+
+    Args:
+        messages: The conversation, oldest first.
+        strategy: One of HISTORY_STRATEGIES. 'full' keeps everything, 'last_n' and
+            'summarize' keep the last `max_turns` turns and 'token_budget' keeps the
+            most recent turns that fit in `max_tokens`.
+        max_turns: Turns kept by 'last_n' and 'summarize'.
+        max_tokens: Estimated tokens kept by 'token_budget'.
+
+    Returns:
+        The older messages (dropped, or summarized by 'summarize') and the window.
+    """
+    if strategy not in HISTORY_STRATEGIES:
+        raise ValueError(f"Unknown history strategy: {strategy}")
+    turns = split_turns(messages)
+    if strategy == "full" or len(turns) <= 1:
+        return [], list(messages)
+    if strategy == "token_budget":
+        keep, used = 0, 0
+        for turn in reversed(turns):
+            used += estimate_tokens(format_messages(turn, compact=True))
+            if keep and used > max_tokens:
+                break
+            keep += 1
+    else:
+        keep = max(1, max_turns)
+    older = [message for turn in turns[:-keep] for message in turn]
+    return older, messages[len(older) :]
+
+
+def build_research_topic(
+    messages: List[AnyMessage],
+    strategy: HistoryStrategy = "full",
+    max_turns: int = 3,
+    max_tokens: int = 4000,
+    summary: Optional[str] = None,
+) -> str:
+    """Build the research topic sent to the models from the conversation.
+
+    With the 'full' strategy this is the whole conversation, as before. The other
+    strategies only send the recent window, with the citation urls of earlier
+    answers dropped, preceded by `summary` of the older turns for 'summarize'.
+    """
+    older, window = split_history(messages, strategy, max_turns, max_tokens)
+    if len(messages) == 1:
+        return messages[-1].content
+    if strategy == "full":
+        return format_messages(window)
+    topic = format_messages(window[:-1], compact=True) + format_messages(window[-1:])
+    if strategy == "summarize" and older and summary:
+        topic = f"Summary of the earlier conversation: {summary}\n{topic}"
+    return topic
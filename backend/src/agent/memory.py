@@ -0,0 +1,324 @@
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional
+
+from agent.dedup import jaccard, query_shingles
+from agent.metrics import registry
+from agent.utils import SHORT_URL_PREFIX
+
+# Best BM25 matches whose query similarity is checked
+_CANDIDATES = 10
+
+_MARKDOWN_LINK_RE = re.compile(r"\[[^\]]*\]\([^)]*\)")
+_TOKEN_RE = re.compile(r"\w+")
+_SHORT_ID_RE = re.compile(re.escape(SHORT_URL_PREFIX) + r"\d+-(\d+)")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens of `text`, ignoring citation links."""
+    return _TOKEN_RE.findall(_MARKDOWN_LINK_RE.sub(" ", text).lower())
+
+
+def renumber_short_urls(text: str, branch_id: int) -> str:
+    """Rewrite the short urls in `text` to the numbering of web research branch `branch_id`."""
+    return _SHORT_ID_RE.sub(
+        lambda m: f"{SHORT_URL_PREFIX}{branch_id}-{m.group(1)}", text
+    )
+
+
+class _Entry:
+    __slots__ = (
+        "query",
+        "text",
+        "sources",
+        "created_at",
+        "terms",
+        "length",
+        "shingles",
+    )
+
+    def __init__(
+        self, query: str, text: str, sources: List[Dict[str, str]], created_at: float
+    ):
+        self.query = query
+        self.text = text
+        self.sources = sources
+        self.created_at = created_at
+        # The query is weighted like a title: it describes what the text answers
+        self.terms = Counter(tokenize(query) * 3 + tokenize(text))
+        self.length = sum(self.terms.values())
+        self.shingles = query_shingles(query)
+
+
+class ResearchMemory:
+    """BM25 index of past web research results, for answering repeat searches locally.
+
+    Each entry is the research text of one `web_research` branch (with its citation
+    markers) and the sources it cites. The inverted index is updated incrementally
+    as entries are added or evicted, and the least recently used entries are
+    evicted beyond `max_entries`.
+
+    With a `path`, entries are also kept in a SQLite database and loaded into the
+    index on start, so the memory survives restarts. Entries written by other
+    processes become visible on their next start. Storage failures are counted in
+    `stats()` rather than raised: the index keeps serving the entries it has.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 5000,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.k1 = k1
+        self.b = b
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.storage_errors = 0
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._by_query: Dict[str, int] = {}
+        # Index entry id -> SQLite row id, assigned by SQLite so processes sharing
+        # the database never collide
+        self._rowids: Dict[int, int] = {}
+        self._total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def add(
+        self,
+        query: str,
+        text: str,
+        sources: List[Dict[str, str]],
+        created_at: Optional[float] = None,
+    ) -> None:
+        """Index the research `text` found for `query` and the `sources` it cites."""
+        if not text.strip():
+            return
+        created_at = created_at or time.time()
+        with self._lock:
+            # A new result for a query replaces the old one
+            replaced = self._by_query.get(query)
+            if replaced is not None:
+                self._remove(replaced)
+            entry_id = self._index(_Entry(query, text, sources, created_at))
+            evicted = self._evict()
+        if replaced is not None:
+            evicted.append(replaced)
+        if self.path:
+            self._persist(
+                entry_id, (query, text, json.dumps(sources), created_at), evicted
+            )
+
+    def search(
+        self, query: str, max_age_seconds: float, min_similarity: float
+    ) -> Optional[Dict[str, Any]]:
+        """Return the best fresh entry for `query` at or above `min_similarity`, or None.
+
+        Candidates are ranked with BM25 over the stored queries and texts; a candidate
+        matches when the shingle similarity of its query to `query` (as used for query
+        deduplication, 0-1) reaches `min_similarity`.
+
+        Returns:
+            A dict with the entry's `query`, `text`, `sources`, `similarity` and
+            `age_seconds`.
+        """
+        now = time.time()
+        shingles = query_shingles(query)
+        with self._lock:
+            scores = self._bm25(set(tokenize(query)))
+            candidates = sorted(scores, key=scores.get, reverse=True)
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates[:_CANDIDATES]:
+                entry = self._entries[entry_id]
+                if now - entry.created_at > max_age_seconds:
+                    continue
+                similarity = jaccard(shingles, entry.shingles)
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None or best_similarity < min_similarity:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return {
+                "query": entry.query,
+                "text": entry.text,
+                "sources": entry.sources,
+                "similarity": best_similarity,
+                "age_seconds": now - entry.created_at,
+            }
+
+    def _bm25(self, terms) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        count = len(self._entries)
+        if not count:
+            return scores
+        average_length = self._total_length / count
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for entry_id, tf in postings.items():
+                length = self._entries[entry_id].length
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[entry_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    async def aadd(
+        self,
+        query: str,
+        text: str,
+        sources: List[Dict[str, str]],
+        created_at: Optional[float] = None,
+    ) -> None:
+        """Async variant of `add`, run off the event loop when entries are persisted."""
+        if self.path:
+            await asyncio.to_thread(self.add, query, text, sources, created_at)
+        else:
+            self.add(query, text, sources, created_at)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters, the hit rate, evictions and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "storage_errors": self.storage_errors,
+            "size": len(self),
+        }
+
+    def _persist(self, entry_id: int, row: tuple, evicted: List[int]) -> None:
+        with self._lock:
+            stale = [self._rowids.pop(i) for i in evicted if i in self._rowids]
+        try:
+            with self._connection() as conn:
+                rowid = conn.execute(
+                    "INSERT INTO research_memory (query, text, sources, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    row,
+                ).lastrowid
+                with self._lock:
+                    if entry_id in self._entries:
+                        self._rowids[entry_id] = rowid
+                    else:
+                        # Evicted or replaced while it was being written
+                        stale.append(rowid)
+                conn.executemany(
+                    "DELETE FROM research_memory WHERE id = ?", [(i,) for i in stale]
+                )
+        except sqlite3.Error:
+            with self._lock:
+                self.storage_errors += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _index(self, entry: _Entry) -> int:
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        self._by_query[entry.query] = entry_id
+        for term, tf in entry.terms.items():
+            self._postings[term][entry_id] = tf
+        self._total_length += entry.length
+        return entry_id
+
+    def _evict(self) -> List[int]:
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            entry_id = next(iter(self._entries))
+            self._remove(entry_id)
+            self.evictions += 1
+            evicted.append(entry_id)
+        return evicted
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        del self._by_query[entry.query]
+        for term in entry.terms:
+            postings = self._postings[term]
+            del postings[entry_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= entry.length
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self) -> None:
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS research_memory ("
+                    "id INTEGER PRIMARY KEY, query TEXT NOT NULL, text TEXT NOT NULL, "
+                    "sources TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                rows = conn.execute(
+                    "SELECT id, query, text, sources, created_at FROM research_memory "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (self.max_entries,),
+                ).fetchall()
+        except sqlite3.Error:
+            self.storage_errors += 1
+            return
+        for rowid, query, text, sources, created_at in reversed(rows):
+            if query in self._by_query:
+                # Another process stored a newer result for the query
+                replaced = self._by_query[query]
+                self._remove(replaced)
+                del self._rowids[replaced]
+            entry_id = self._index(_Entry(query, text, json.loads(sources), created_at))
+            self._rowids[entry_id] = rowid
+
+
+_memories: Dict[tuple, ResearchMemory] = {}
+_memories_lock = threading.Lock()
+
+
+def get_research_memory(
+    backend: str, path: str, max_entries: int
+) -> Optional[ResearchMemory]:
+    """Return the process-wide research memory for the given settings, or None if it is off."""
+    if backend == "none" or max_entries <= 0:
+        return None
+    key = (backend, path, max_entries)
+    with _memories_lock:
+        memory = _memories.get(key)
+        if memory is None:
+            if backend == "memory":
+                memory = ResearchMemory(max_entries=max_entries)
+            elif backend == "sqlite":
+                memory = ResearchMemory(path, max_entries)
+            else:
+                raise ValueError(f"Unknown research memory backend: {backend}")
+            _memories[key] = memory
+            registry.register_stats("research_memory", memory.stats, backend)
+    return memory
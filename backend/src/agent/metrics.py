@@ -0,0 +1,293 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# Upper bounds (seconds) of the node duration histogram buckets
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+# Cascade outcomes that passed the call on to the next tier
+CASCADE_ESCALATIONS = ("low_confidence", "invalid", "error", "undecided")
+
+
+class NodeRecord:
+    """Measurements of a single node run."""
+
+    __slots__ = (
+        "node",
+        "start",
+        "wall_seconds",
+        "queue_seconds",
+        "input_tokens",
+        "output_tokens",
+        "retries",
+        "grounding_chunks",
+    )
+
+    def __init__(self, node: str):
+        self.node = node
+        self.start = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.queue_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.retries = 0
+        self.grounding_chunks = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the compact trace entry stored in the run state."""
+        return {
+            "node": self.node,
+            "wall_ms": round(self.wall_seconds * 1000, 1),
+            "queue_ms": round(self.queue_seconds * 1000, 1),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "retries": self.retries,
+            "grounding_chunks": self.grounding_chunks,
+        }
+
+
+_current: contextvars.ContextVar[Optional[NodeRecord]] = contextvars.ContextVar(
+    "agent_node_record", default=None
+)
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of node records, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.buckets: Dict[str, List[int]] = defaultdict(
+            lambda: [0] * (len(DURATION_BUCKETS) + 1)
+        )
+        self.duration_sum: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        # (stage, outcome) -> calls answered by the fast tier or escalated
+        self.cascade: Dict[Tuple[str, str], int] = defaultdict(int)
+        # (component, backend) -> the component's stats(), read on every render
+        self.collectors: Dict[Tuple[str, str], Callable[[], Dict[str, float]]] = {}
+
+    def observe(self, record: NodeRecord, error: bool = False) -> None:
+        """Add a finished node record to the aggregates."""
+        with self._lock:
+            node = record.node
+            self.runs[node] += 1
+            if error:
+                self.errors[node] += 1
+            self.buckets[node][bisect_left(DURATION_BUCKETS, record.wall_seconds)] += 1
+            self.duration_sum[node] += record.wall_seconds
+            counters = self.counters[node]
+            counters["queue_wait_seconds"] += record.queue_seconds
+            counters["input_tokens"] += record.input_tokens
+            counters["output_tokens"] += record.output_tokens
+            counters["retries"] += record.retries
+            counters["grounding_chunks"] += record.grounding_chunks
+
+    def observe_cascade(self, stage: str, outcome: str) -> None:
+        """Count the outcome of a model cascade at `stage`."""
+        with self._lock:
+            self.cascade[(stage, outcome)] += 1
+
+    def register_stats(
+        self,
+        component: str,
+        stats: Callable[[], Dict[str, float]],
+        backend: str = "",
+    ) -> None:
+        """Export the `stats()` of a process-wide component, such as a cache, as gauges."""
+        with self._lock:
+            self.collectors[(component, backend)] = stats
+
+    def cascade_hit_rates(self) -> Dict[str, float]:
+        """Return the share of each stage's cascaded calls answered by the first tier."""
+        with self._lock:
+            return self._cascade_hit_rates()
+
+    def _cascade_hit_rates(self) -> Dict[str, float]:
+        totals: Dict[str, int] = defaultdict(int)
+        hits: Dict[str, int] = defaultdict(int)
+        for (stage, outcome), count in self.cascade.items():
+            totals[stage] += count
+            if outcome not in CASCADE_ESCALATIONS:
+                hits[stage] += count
+        return {stage: hits[stage] / total for stage, total in totals.items()}
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP agent_node_runs_total Node runs.",
+                "# TYPE agent_node_runs_total counter",
+            ]
+            lines += [
+                f'agent_node_runs_total{{node="{_escape(n)}"}} {v}'
+                for n, v in self.runs.items()
+            ]
+            lines += [
+                "# HELP agent_node_errors_total Node runs that raised.",
+                "# TYPE agent_node_errors_total counter",
+            ]
+            lines += [
+                f'agent_node_errors_total{{node="{_escape(n)}"}} {v}'
+                for n, v in self.errors.items()
+            ]
+            lines += [
+                "# HELP agent_node_duration_seconds Node wall time.",
+                "# TYPE agent_node_duration_seconds histogram",
+            ]
+            for node, counts in self.buckets.items():
+                label = _escape(node)
+                cumulative = 0
+                for bound, count in zip((*DURATION_BUCKETS, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(
+                        f'agent_node_duration_seconds_bucket{{node="{label}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'agent_node_duration_seconds_sum{{node="{label}"}} {self.duration_sum[node]}'
+                )
+                lines.append(
+                    f'agent_node_duration_seconds_count{{node="{label}"}} {cumulative}'
+                )
+            for name, help_text in (
+                (
+                    "queue_wait_seconds",
+                    "Time spent waiting for the model call governor.",
+                ),
+                ("input_tokens", "Model input tokens."),
+                ("output_tokens", "Model output tokens."),
+                ("retries", "Model call retries."),
+                ("grounding_chunks", "Grounding chunks returned by web search."),
+            ):
+                metric = f"agent_node_{name}_total"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                lines += [
+                    f'{metric}{{node="{_escape(node)}"}} {counters[name]}'
+                    for node, counters in self.counters.items()
+                ]
+            lines += [
+                "# HELP agent_cascade_calls_total Cascaded calls by outcome: answered by the first tier (fast, sufficient, insufficient) or escalated (low_confidence, invalid, error, undecided).",
+                "# TYPE agent_cascade_calls_total counter",
+            ]
+            lines += [
+                f'agent_cascade_calls_total{{stage="{_escape(stage)}",outcome="{_escape(outcome)}"}} {v}'
+                for (stage, outcome), v in self.cascade.items()
+            ]
+            lines += [
+                "# HELP agent_cascade_hit_rate Share of cascaded calls answered by the first tier.",
+                "# TYPE agent_cascade_hit_rate gauge",
+            ]
+            lines += [
+                f'agent_cascade_hit_rate{{stage="{_escape(stage)}"}} {rate}'
+                for stage, rate in self._cascade_hit_rates().items()
+            ]
+            collectors = list(self.collectors.items())
+        # Collected outside the lock, as components take their own locks
+        lines += [
+            "# HELP agent_component_stat Counters and sizes of the caches, registries and coalescers, from their stats().",
+            "# TYPE agent_component_stat gauge",
+        ]
+        for (component, backend), stats in collectors:
+            labels = f'component="{_escape(component)}"' + (
+                f',backend="{_escape(backend)}"' if backend else ""
+            )
+            lines += [
+                f'agent_component_stat{{{labels},stat="{_escape(name)}"}} {value}'
+                for name, value in stats().items()
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: Any) -> str:
+    # Label values as per the text format: backslash, double quote and line feed escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def track(node: str) -> Iterator[NodeRecord]:
+    """Measure a node run; model calls made inside it are attributed to its record."""
+    record = NodeRecord(node)
+    token = _current.set(record)
+    error = False
+    try:
+        yield record
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _current.reset(token)
+        record.wall_seconds = time.perf_counter() - record.start
+        registry.observe(record, error)
+
+
+def record_queue_wait(seconds: float) -> None:
+    """Attribute time spent queued for a model call to the current node."""
+    record = _current.get()
+    if record is not None:
+        record.queue_seconds += seconds
+
+
+def record_retry() -> None:
+    """Count a model call retry against the current node."""
+    record = _current.get()
+    if record is not None:
+        record.retries += 1
+
+
+def record_tokens(input_tokens: int, output_tokens: int) -> None:
+    """Attribute model token usage to the current node."""
+    record = _current.get()
+    if record is not None:
+        record.input_tokens += input_tokens or 0
+        record.output_tokens += output_tokens or 0
+
+
+def record_grounding_chunks(count: int) -> None:
+    """Count the grounding chunks returned to the current node."""
+    record = _current.get()
+    if record is not None:
+        record.grounding_chunks += count
+
+
+def record_cascade(stage: str, outcome: str) -> None:
+    """Count the outcome of a model cascade at `stage`."""
+    registry.observe_cascade(stage, outcome)
+
+
+def record_genai_usage(response) -> None:
+    """Attribute the token usage of a google genai response to the current node."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_tokens(usage.prompt_token_count, usage.candidates_token_count)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Records chat model token usage against the node the model was called from."""
+
+    # Run in the caller's context, where the current node record is set
+    run_inline = True
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    record_tokens(usage.get("input_tokens"), usage.get("output_tokens"))
+
+
+usage_handler = UsageCallbackHandler()
@@ -79,6 +79,57 @@ Summaries:
 {summaries}
 """
 
+incremental_reflection_instructions = """You are an expert research assistant analyzing research about "{research_topic}".
+
+Instructions:
+- You are given a running summary of the knowledge gathered in previous research loops and the summaries produced by the latest searches.
+- Update the running summary so it also covers the new summaries. Keep it compact: key facts, figures and dates only, no citations.
+- Identify knowledge gaps or areas that need deeper exploration and generate a follow-up query. (1 or multiple).
+- If the updated knowledge is sufficient to answer the user's question, don't generate a follow-up query.
+- If there is a knowledge gap, generate a follow-up query that would help expand your understanding.
+- Focus on technical details, implementation specifics, or emerging trends that weren't fully covered.
+
+Requirements:
+- Ensure the follow-up query is self-contained and includes necessary context for web search.
+
+Output Format:
+- Format your response as a JSON object with these exact keys:
+   - "knowledge_summary": The updated running summary
+   - "is_sufficient": true or false
+   - "knowledge_gap": Describe what information is missing or needs clarification
+   - "follow_up_queries": Write a specific question to address this gap
+
+Example:
+```json
+{{
+    "knowledge_summary": "[specific technology] was released in 2024 and is used by ...",
+    "is_sufficient": true, // or false
+    "knowledge_gap": "The summary lacks information about performance metrics and benchmarks", // "" if is_sufficient is true
+    "follow_up_queries": ["What are typical performance benchmarks and metrics used to evaluate [specific technology]?"] // [] if is_sufficient is true
+}}
+```
+
+Running Summary:
+{knowledge_summary}
+
+New Summaries:
+{summaries}
+"""
+
+history_summary_instructions = """Summarize the earlier part of a conversation between a user and a research assistant, so that it can stand in for the conversation in later research.
+
+Instructions:
+- Extend the existing summary with the new messages; keep what is still relevant.
+- Keep the user's questions, constraints and preferences, and the key facts and conclusions of the assistant's answers.
+- Leave out citations, urls and formatting.
+- Be concise: a few sentences to one short paragraph.
+
+Existing Summary:
+{summary}
+
+New Messages:
+{conversation}"""
+
 answer_instructions = """Generate a high-quality answer to the user's question based on the provided summaries.
 
 Instructions:
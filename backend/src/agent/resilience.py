@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+# Sync branches with a timeout run their search here so the branch can stop
+# waiting; hedged duplicates get their own pool so they can't starve it.
+_branch_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="web-research")
+_hedge_pool = ThreadPoolExecutor(
+    max_workers=32, thread_name_prefix="web-research-hedge"
+)
+
+
+class LatencyWindow:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        """Record the latency of a completed call."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile (0-100) of the window, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def _submit(pool: ThreadPoolExecutor, fn: Callable[[], Any]):
+    # Run in a copy of the caller's context so config, stream writer and metrics follow
+    return pool.submit(contextvars.copy_context().run, fn)
+
+
+def call_with_timeout(fn: Callable[[], Any], timeout: Optional[float]):
+    """Run `fn`, raising `TimeoutError` if it takes longer than `timeout` seconds.
+
+    The call itself is not interrupted; its late result is discarded.
+    """
+    if timeout is None:
+        return fn()
+    return _submit(_branch_pool, fn).result(timeout=timeout)
+
+
+def hedged(fn: Callable[[], Any], delay: Optional[float]):
+    """Run `fn`, firing a duplicate call if it hasn't finished after `delay` seconds.
+
+    The first successful result wins; an error is only raised when both calls fail.
+    """
+    if delay is None:
+        return fn()
+    first = _submit(_hedge_pool, fn)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+    pending = {first, _submit(_hedge_pool, fn)}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def ahedged(fn: Callable[[], Awaitable[Any]], delay: Optional[float]):
+    """Async variant of `hedged`; `fn` returns the awaitable to run."""
+    if delay is None:
+        return await fn()
+    first = asyncio.ensure_future(fn())
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+        pending.add(asyncio.ensure_future(fn()))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
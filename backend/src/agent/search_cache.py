@@ -0,0 +1,296 @@
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from agent.metrics import registry
+
+if TYPE_CHECKING:
+    from google.genai.types import GenerateContentResponse
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry."""
+    return re.sub(r"\s+", " ", query).strip().strip("?!.").lower()
+
+
+def search_cache_key(query: str, model: str, day: Optional[date] = None) -> str:
+    """Build the cache key for a grounded search.
+
+    The key combines the normalized query, the model and a date bucket, since the
+    search prompt embeds the current date and results are expected to move daily.
+    """
+    bucket = (day or date.today()).isoformat()
+    raw = f"{normalize_query(query)}\x00{model}\x00{bucket}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def response_to_payload(response) -> Dict[str, Any]:
+    """Extract the parts of a grounded response that `web_research` needs.
+
+    Keeps the response text, the grounding chunks and the grounding supports so that
+    `resolve_urls`, `get_citations` and `insert_citation_markers` work on cache hits.
+    """
+    candidate = response.candidates[0] if response.candidates else None
+    metadata = getattr(candidate, "grounding_metadata", None)
+    # Only web chunks are kept, so support indices are remapped to their positions
+    chunks, kept = [], {}
+    for idx, chunk in enumerate(getattr(metadata, "grounding_chunks", None) or []):
+        if chunk.web is not None:
+            kept[idx] = len(chunks)
+            chunks.append({"uri": chunk.web.uri, "title": chunk.web.title})
+    supports = [
+        {
+            "start_index": support.segment.start_index,
+            "end_index": support.segment.end_index,
+            "grounding_chunk_indices": [
+                kept[idx]
+                for idx in support.grounding_chunk_indices or []
+                if idx in kept
+            ],
+        }
+        for support in (getattr(metadata, "grounding_supports", None) or [])
+        if support.segment is not None
+    ]
+    return {"text": response.text or "", "chunks": chunks, "supports": supports}
+
+
+def payload_to_response(payload: Dict[str, Any]) -> "GenerateContentResponse":
+    """Rebuild a `GenerateContentResponse` from a cached payload."""
+    # Imported here to keep the heavy genai types off the import path of the graph
+    from google.genai.types import GenerateContentResponse
+
+    return GenerateContentResponse.model_validate(
+        {
+            "candidates": [
+                {
+                    "content": {"role": "model", "parts": [{"text": payload["text"]}]},
+                    "grounding_metadata": {
+                        "grounding_chunks": [
+                            {"web": chunk} for chunk in payload["chunks"]
+                        ],
+                        "grounding_supports": [
+                            {
+                                "segment": {
+                                    "start_index": support["start_index"],
+                                    "end_index": support["end_index"],
+                                },
+                                "grounding_chunk_indices": support[
+                                    "grounding_chunk_indices"
+                                ],
+                            }
+                            for support in payload["supports"]
+                        ],
+                    },
+                }
+            ]
+        }
+    )
+
+
+class SearchCache(abc.ABC):
+    """Base class for web search result caches.
+
+    Subclasses implement `_load`, `_store` and `__len__`; this class handles
+    (de)serialization of responses and hit-rate stats.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Lookups run concurrently in threads, so the counters are updated under a lock
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional["GenerateContentResponse"]:
+        """Return the cached response for `key`, or None on a miss or expired entry."""
+        payload = self._load(key)
+        with self._stats_lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if payload is None else payload_to_response(payload)
+
+    def set(self, key: str, response) -> None:
+        """Store a grounded response under `key`."""
+        self._store(key, response_to_payload(response))
+
+    async def aget(self, key: str) -> Optional["GenerateContentResponse"]:
+        """Async variant of `get`."""
+        return self.get(key)
+
+    async def aset(self, key: str, response) -> None:
+        """Async variant of `set`."""
+        self.set(key, response)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters, the hit rate, evictions and the current size."""
+        with self._stats_lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+            "size": len(self),
+        }
+
+    @abc.abstractmethod
+    def _load(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    @abc.abstractmethod
+    def _store(self, key: str, payload: Dict[str, Any]) -> None: ...
+
+    @abc.abstractmethod
+    def __len__(self) -> int: ...
+
+
+class InMemorySearchCache(SearchCache):
+    """Process-local LRU cache with a TTL."""
+
+    def __init__(self, ttl_seconds: float = 3600, max_size: int = 1024):
+        super().__init__(ttl_seconds, max_size)
+        self._entries: OrderedDict[str, tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, payload = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def _store(self, key: str, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), payload)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                evicted += 1
+        with self._stats_lock:
+            self.evictions += evicted
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteSearchCache(SearchCache):
+    """SQLite-backed cache that several worker processes can share.
+
+    Uses WAL mode so readers in other processes are not blocked by a writer, and
+    evicts the least recently used rows once `max_size` is exceeded.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600, max_size: int = 10_000):
+        super().__init__(ttl_seconds, max_size)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS search_cache_accessed_at "
+                "ON search_cache (accessed_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def _store(self, key: str, payload: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload), now, now),
+            )
+            evicted = conn.execute(
+                "DELETE FROM search_cache WHERE key IN ("
+                "SELECT key FROM search_cache ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            ).rowcount
+        with self._stats_lock:
+            self.evictions += max(evicted, 0)
+
+    async def aget(self, key: str) -> Optional["GenerateContentResponse"]:
+        """Async variant of `get`, run off the event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, response) -> None:
+        """Async variant of `set`, run off the event loop."""
+        await asyncio.to_thread(self.set, key, response)
+
+    def __len__(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+
+_caches: Dict[tuple, SearchCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache(
+    backend: str, path: str, ttl_seconds: float, max_size: int
+) -> Optional[SearchCache]:
+    """Return the process-wide cache for the given settings, or None if caching is off."""
+    if backend == "none" or ttl_seconds <= 0 or max_size <= 0:
+        return None
+    key = (backend, path, ttl_seconds, max_size)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            if backend == "memory":
+                cache = InMemorySearchCache(ttl_seconds, max_size)
+            elif backend == "sqlite":
+                cache = SQLiteSearchCache(path, ttl_seconds, max_size)
+            else:
+                raise ValueError(f"Unknown search cache backend: {backend}")
+            _caches[key] = cache
+            registry.register_stats("search_cache", cache.stats, backend)
+    return cache
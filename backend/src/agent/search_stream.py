@@ -0,0 +1,77 @@
+from typing import Any, Callable, Dict, List
+
+from agent.search_cache import payload_to_response
+
+
+class GroundedStream:
+    """Assembles a streamed grounded search response, emitting its progress as it arrives.
+
+    Each text delta is emitted as `{"delta": ...}` and the grounding sources are
+    emitted as `{"sources": [{"label", "value"}, ...]}` when they first appear. The
+    grounding chunks of all stream chunks are merged (a source sent twice is kept
+    once) and the grounding supports are remapped onto the merged chunks; their
+    segment indices refer to the complete text, as in a non-streamed response.
+    """
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], None]):
+        self.emit = emit
+        self.parts: List[str] = []
+        self.chunks: List[Dict[str, str]] = []
+        self.supports: List[Dict[str, Any]] = []
+        self.usage_metadata = None
+        self._chunk_index: Dict[str, int] = {}
+
+    def feed(self, chunk) -> None:
+        """Add one chunk of the stream."""
+        text = chunk.text
+        if text:
+            self.parts.append(text)
+            self.emit({"delta": text})
+        # Usage is reported on the last chunk
+        self.usage_metadata = chunk.usage_metadata or self.usage_metadata
+        candidate = chunk.candidates[0] if chunk.candidates else None
+        metadata = getattr(candidate, "grounding_metadata", None)
+        if metadata is None:
+            return
+
+        # Indices of this chunk's grounding chunks in the merged list
+        local_to_merged: Dict[int, int] = {}
+        new_sources = []
+        for idx, grounding_chunk in enumerate(metadata.grounding_chunks or []):
+            web = grounding_chunk.web
+            if web is None:
+                continue
+            merged = self._chunk_index.get(web.uri)
+            if merged is None:
+                merged = self._chunk_index[web.uri] = len(self.chunks)
+                self.chunks.append({"uri": web.uri, "title": web.title})
+                new_sources.append({"label": web.title, "value": web.uri})
+            local_to_merged[idx] = merged
+        if new_sources:
+            self.emit({"sources": new_sources})
+
+        for support in metadata.grounding_supports or []:
+            if support.segment is None:
+                continue
+            self.supports.append(
+                {
+                    "start_index": support.segment.start_index,
+                    "end_index": support.segment.end_index,
+                    "grounding_chunk_indices": [
+                        local_to_merged[idx]
+                        for idx in support.grounding_chunk_indices or []
+                        if idx in local_to_merged
+                    ],
+                }
+            )
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def response(self):
+        """Return the assembled stream as a single `GenerateContentResponse`."""
+        response = payload_to_response(
+            {"text": self.text(), "chunks": self.chunks, "supports": self.supports}
+        )
+        response.usage_metadata = self.usage_metadata
+        return response
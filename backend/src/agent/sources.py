@@ -0,0 +1,86 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from agent.utils import SHORT_URL_PREFIX
+
+_SHORT_ID_RE = re.compile(re.escape(SHORT_URL_PREFIX) + r"(\d+-\d+)")
+
+# A source table interns the long grounding urls once and stores each source as
+# `short id -> [label, url index]`, where the short id is the short url without
+# SHORT_URL_PREFIX:
+#
+#     {"urls": ["https://vertexaisearch.../AbF3...", ...],
+#      "sources": {"0-0": ["wikipedia", 0], "0-1": ["reuters", 1], ...}}
+#
+# Citations repeat the same source many times and branches that share a search
+# response repeat the same urls, so the table is much smaller than the list of
+# per-citation source dicts it replaces in the state and its checkpoints.
+SourceTable = Dict[str, Any]
+
+
+def build_source_table(sources: Iterable[Dict[str, str]]) -> SourceTable:
+    """Intern a list of `{"label", "short_url", "value"}` source dicts into a source table."""
+    urls: List[str] = []
+    url_index: Dict[str, int] = {}
+    table: Dict[str, list] = {}
+    for source in sources:
+        if not source.get("short_url"):
+            continue
+        url = source["value"]
+        idx = url_index.get(url)
+        if idx is None:
+            idx = url_index[url] = len(urls)
+            urls.append(url)
+        table[source["short_url"][len(SHORT_URL_PREFIX) :]] = [source["label"], idx]
+    return {"urls": urls, "sources": table}
+
+
+def merge_source_tables(
+    left: Optional[SourceTable], right: Optional[SourceTable]
+) -> SourceTable:
+    """Reducer merging two source tables, deduplicating urls and sources.
+
+    A short id present in both tables takes the entry of `right`, so the latest
+    research of a thread wins when short ids repeat across turns.
+    """
+    if not left:
+        return right or {"urls": [], "sources": {}}
+    if not right:
+        return left
+    urls = list(left["urls"])
+    url_index = {url: idx for idx, url in enumerate(urls)}
+    sources = dict(left["sources"])
+    for short_id, (label, idx) in right["sources"].items():
+        url = right["urls"][idx]
+        merged_idx = url_index.get(url)
+        if merged_idx is None:
+            merged_idx = url_index[url] = len(urls)
+            urls.append(url)
+        sources[short_id] = [label, merged_idx]
+    return {"urls": urls, "sources": sources}
+
+
+def expand_source_table(table: Optional[SourceTable]) -> List[Dict[str, str]]:
+    """Expand a source table back to `{"label", "short_url", "value"}` dicts, one per source."""
+    if not table:
+        return []
+    urls = table["urls"]
+    return [
+        {"label": label, "short_url": SHORT_URL_PREFIX + short_id, "value": urls[idx]}
+        for short_id, (label, idx) in table["sources"].items()
+    ]
+
+
+def count_cited_urls(table: Optional[SourceTable], texts: Iterable[str]) -> int:
+    """Return the number of distinct urls cited by the short urls in `texts`."""
+    if not table:
+        return 0
+    sources = table["sources"]
+    return len(
+        {
+            sources[short_id][1]
+            for text in texts
+            for short_id in _SHORT_ID_RE.findall(text)
+            if short_id in sources
+        }
+    )
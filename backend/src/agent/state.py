@@ -6,6 +6,8 @@ from typing import TypedDict
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
+from agent.sources import merge_source_tables
+
 
 import operator
 
@@ -14,17 +16,44 @@ class OverallState(TypedDict):
     messages: Annotated[list, add_messages]
     search_query: Annotated[list, operator.add]
     web_research_result: Annotated[list, operator.add]
+    # Index of the first search query and web research result of the current turn
+    turn_query_offset: int
+    turn_result_offset: int
+    # Sources cited by the research results, interned (see agent.sources)
+    source_table: Annotated[dict, merge_source_tables]
+    # Sources cited by the final answer, as label/short_url/value dicts
     sources_gathered: Annotated[list, operator.add]
+    dropped_queries: Annotated[list, operator.add]
+    web_research_errors: Annotated[list, operator.add]
+    # Searches answered from the research memory instead of the web
+    memory_hits: Annotated[list, operator.add]
+    run_trace: Annotated[list, operator.add]
+    knowledge_summary: str
+    summarized_result_count: int
+    # One entry per reflection: its decision, who made it and the research it saw
+    reflection_decisions: Annotated[list, operator.add]
+    # Sentence and estimated token counts of the research before and after compaction
+    research_compaction: dict
+    # The conversation as sent to the models, built once per turn by generate_query
+    research_topic: str
+    # Summary of the first history_summary_count messages of the thread
+    history_summary: str
+    history_summary_count: int
     initial_search_query_count: int
     max_research_loops: int
     research_loop_count: int
     reasoning_model: str
+    deadline_seconds: float
+    started_at: float
+    degradations: Annotated[list, operator.add]
 
 
 class ReflectionState(TypedDict):
     is_sufficient: bool
     knowledge_gap: str
-    follow_up_queries: Annotated[list, operator.add]
+    follow_up_queries: list
+    knowledge_summary: str
+    summarized_result_count: int
     research_loop_count: int
     number_of_ran_queries: int
 
@@ -0,0 +1,240 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import pathlib
+import re
+from email.utils import formatdate
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+# Vite emits bundle files as `assets/name-<8 character hash>.ext`; their content
+# never changes under a name. Files copied from `public/` keep their own names.
+_FINGERPRINT_RE = re.compile(r"^assets/(?:[^/]+/)*[^/]+-[A-Za-z0-9_-]{8}\.[a-z0-9]+$")
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _brotli_compress(data: bytes) -> Optional[bytes]:
+    # brotli is optional (`pip install agent[static]`); without it only gzip is generated
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def _compress(encoding: str, data: bytes) -> Optional[bytes]:
+    if encoding == "br":
+        return _brotli_compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse an `Accept-Encoding` header into a content coding -> q-value mapping."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class _Asset:
+    """A file of the build with its headers and, if small enough, its bytes per encoding."""
+
+    __slots__ = (
+        "path",
+        "media_type",
+        "etag",
+        "last_modified",
+        "cache_control",
+        "bodies",
+        "files",
+    )
+
+    def __init__(self, path: pathlib.Path, relative: str, max_memory_bytes: int):
+        stat = path.stat()
+        self.path = path
+        self.media_type = (
+            mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        )
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.cache_control = (
+            IMMUTABLE_CACHE_CONTROL
+            if _FINGERPRINT_RE.search(relative)
+            else REVALIDATE_CACHE_CONTROL
+        )
+        # Precompressed variants next to the file (e.g. from a build plugin) are used as is
+        self.files: Dict[str, pathlib.Path] = {}
+        for encoding, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                self.files[encoding] = variant
+        self.bodies: Dict[str, bytes] = {}
+        if stat.st_size <= max_memory_bytes:
+            data = path.read_bytes()
+            self.bodies["identity"] = data
+            self.etag = hashlib.blake2b(data, digest_size=12).hexdigest()
+            if self._compressible() and len(data) > 1024:
+                for encoding, _ in ENCODINGS:
+                    variant = self.files.get(encoding)
+                    body = (
+                        variant.read_bytes() if variant else _compress(encoding, data)
+                    )
+                    if body is not None and len(body) < len(data):
+                        self.bodies[encoding] = body
+        else:
+            self.etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def _compressible(self) -> bool:
+        return self.media_type.startswith(_COMPRESSIBLE_TYPES)
+
+    def encodings(self) -> List[str]:
+        """Return the encodings this asset is available in, preferred first."""
+        available = self.bodies if self.bodies else self.files
+        return [encoding for encoding, _ in ENCODINGS if encoding in available]
+
+
+class PrecompressedStaticFiles:
+    """ASGI app serving a frontend build from memory, with precompressed variants.
+
+    On start every file of `directory` is indexed once. Files up to
+    `max_memory_bytes` are held in memory together with their brotli and gzip
+    variants, which are taken from `.br`/`.gz` files next to them or generated;
+    requests for them do no file system work. Larger files are streamed from disk,
+    using precompressed variants on disk if there are any.
+
+    Responses are negotiated on `Accept-Encoding`, carry an ETag and answer
+    `If-None-Match` with 304. Fingerprinted bundle files under `assets/` are cached as immutable
+    for a year; other files (such as `index.html`) must be revalidated. Like
+    `StaticFiles(html=True)`, directories serve their `index.html` and missing
+    files the build's `404.html`, if present.
+    """
+
+    def __init__(self, directory: os.PathLike, max_memory_bytes: int = 1024 * 1024):
+        self.directory = pathlib.Path(directory)
+        self.max_memory_bytes = max_memory_bytes
+        self.assets: Dict[str, _Asset] = {}
+        variant_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.name.endswith(variant_suffixes):
+                continue
+            relative = path.relative_to(self.directory).as_posix()
+            self.assets[relative] = _Asset(path, relative, max_memory_bytes)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of files and the bytes held in memory."""
+        return {
+            "files": len(self.assets),
+            "memory_bytes": sum(
+                len(body)
+                for asset in self.assets.values()
+                for body in asset.bodies.values()
+            ),
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response("Method Not Allowed", status_code=405)
+        else:
+            response = self.response(_path(scope), Headers(scope=scope))
+        await response(scope, receive, send)
+
+    def response(self, path: str, headers: Headers) -> Response:
+        """Build the response for the request path `path` (relative to the mount)."""
+        asset, status_code = self._lookup(path)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+
+        encoding = self._negotiate(asset, headers.get("accept-encoding", ""))
+        etag = (
+            f'"{asset.etag}"'
+            if encoding == "identity"
+            else f'"{asset.etag}-{encoding}"'
+        )
+        response_headers = {
+            "etag": etag,
+            "last-modified": asset.last_modified,
+            "cache-control": asset.cache_control,
+        }
+        if asset.encodings():
+            response_headers["vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            response_headers["content-encoding"] = encoding
+
+        if status_code == 200 and etag in _etags(headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=response_headers)
+
+        body = asset.bodies.get(encoding)
+        if body is not None:
+            return Response(
+                body,
+                status_code=status_code,
+                headers=response_headers,
+                media_type=asset.media_type,
+            )
+        return FileResponse(
+            asset.files.get(encoding, asset.path),
+            status_code=status_code,
+            headers=response_headers,
+            media_type=asset.media_type,
+        )
+
+    def _lookup(self, path: str) -> Tuple[Optional[_Asset], int]:
+        path = path.strip("/")
+        candidates = [path, f"{path}/index.html" if path else "index.html"]
+        for candidate in candidates:
+            asset = self.assets.get(candidate)
+            if asset is not None:
+                return asset, 200
+        return self.assets.get("404.html"), 404
+
+    def _negotiate(self, asset: _Asset, accept_encoding: str) -> str:
+        available = asset.encodings()
+        if not available:
+            return "identity"
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in available:
+            # A coding refused with q=0 is not matched by the wildcard
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return "identity"
+
+
+def _path(scope: Scope) -> str:
+    # The request path below the mount point
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path) :]
+    return path
+
+
+def _etags(if_none_match: str) -> List[str]:
+    return [
+        tag.strip().removeprefix("W/")
+        for tag in if_none_match.split(",")
+        if tag.strip()
+    ]
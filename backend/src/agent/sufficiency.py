@@ -0,0 +1,107 @@
+import re
+from typing import Dict, List, Optional, Sequence, Set
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_MARKDOWN_LINK_RE = re.compile(r"\[[^\]]*\]\([^)]*\)")
+
+# Words that carry no topic of their own
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because
+    been before being below between both but by can could did do does doing down
+    during each explain few for from further give had has have having he her here
+    how i if in into is it its just latest me more most my new no nor not now of
+    off on once only or other our out over own please same she should so some such
+    tell than that the their them then there these they this those through to too
+    under until up very was we were what when where which while who whom why will
+    with would you your
+    """.split()
+)
+
+
+def key_terms(question: str) -> List[str]:
+    """Return the distinct content words of `question`, in order of appearance."""
+    terms = []
+    for token in _TOKEN_RE.findall(question.lower()):
+        if len(token) > 2 and token not in STOPWORDS and token not in terms:
+            terms.append(token)
+    return terms
+
+
+def result_tokens(results: Sequence[str]) -> Set[str]:
+    """Return the set of words in the research `results`, ignoring citation links."""
+    tokens: Set[str] = set()
+    for result in results:
+        tokens.update(_TOKEN_RE.findall(_MARKDOWN_LINK_RE.sub(" ", result).lower()))
+    return tokens
+
+
+def term_coverage(terms: Sequence[str], tokens: Set[str]) -> float:
+    """Return the share of `terms` found in `tokens` (1.0 without terms)."""
+    if not terms:
+        return 1.0
+    return sum(term in tokens for term in terms) / len(terms)
+
+
+def precheck(
+    question: str,
+    results: Sequence[str],
+    source_count: int,
+    sufficient_coverage: float,
+    sufficient_sources: int,
+    insufficient_coverage: float,
+    max_queries: int = 3,
+) -> Dict[str, object]:
+    """Decide locally whether the research clearly answers the question.
+
+    The research is confidently sufficient when at least `sufficient_coverage` of
+    the question's key terms occur in the results and they cite at least
+    `sufficient_sources` distinct sources, and confidently insufficient at or
+    below `insufficient_coverage`. Anything in between is left to the model.
+
+    Returns:
+        A dict with the `coverage`, the `source_count`, the decision `is_sufficient`
+        (True, False or None when undecided) and, when insufficient, the
+        `knowledge_gap` and deterministic `follow_up_queries` for the missing terms.
+    """
+    terms = key_terms(question)
+    tokens = result_tokens(results)
+    coverage = term_coverage(terms, tokens)
+    decision: Dict[str, object] = {
+        "coverage": round(coverage, 3),
+        "source_count": source_count,
+        "is_sufficient": None,
+    }
+    if coverage >= sufficient_coverage and source_count >= sufficient_sources:
+        decision["is_sufficient"] = True
+    elif coverage <= insufficient_coverage:
+        decision["is_sufficient"] = False
+        decision["knowledge_gap"], decision["follow_up_queries"] = _follow_ups(
+            terms, tokens, max_queries
+        )
+    return decision
+
+
+def _follow_ups(terms: Sequence[str], tokens: Set[str], max_queries: int):
+    # Search the missing terms in the context of the ones that were found
+    missing = [term for term in terms if term not in tokens]
+    found = [term for term in terms if term in tokens]
+    gap = f"The research does not cover: {', '.join(missing)}." if missing else ""
+    if not found:
+        # Nothing of the question was found, so search it as a whole again
+        return gap, [" ".join(terms[:8])] if terms else []
+    context = " ".join(found[:3])
+    queries: List[str] = []
+    for start in range(0, len(missing), 3):
+        if len(queries) == max_queries:
+            break
+        queries.append(" ".join((context, *missing[start : start + 3])))
+    return gap, queries
+
+
+def latest_question(messages: Sequence) -> Optional[str]:
+    """Return the content of the latest user message."""
+    for message in reversed(messages):
+        if getattr(message, "type", None) == "human":
+            return message.content if isinstance(message.content, str) else None
+    return None
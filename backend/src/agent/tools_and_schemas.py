@@ -21,3 +21,28 @@ class Reflection(BaseModel):
     follow_up_queries: List[str] = Field(
         description="A list of follow-up queries to address the knowledge gap."
     )
+
+
+class IncrementalReflection(Reflection):
+    knowledge_summary: str = Field(
+        description="A compact running summary of all the knowledge gathered so far, updated with the new summaries."
+    )
+
+
+# Schemas of the fast tier of the model cascade, which also rates its confidence
+class Confidence(BaseModel):
+    confidence: float = Field(
+        description="How confident you are that this output is correct and complete, from 0 (a guess) to 1 (certain)."
+    )
+
+
+class ScoredSearchQueryList(SearchQueryList, Confidence):
+    pass
+
+
+class ScoredReflection(Reflection, Confidence):
+    pass
+
+
+class ScoredIncrementalReflection(IncrementalReflection, Confidence):
+    pass
@@ -1,5 +1,13 @@
+import re
 from typing import Any, Dict, List
-from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
+from langchain_core.messages import AnyMessage
+
+from agent.history import format_messages
+
+SHORT_URL_PREFIX = "https://vertexaisearch.cloud.google.com/id/"
+_SHORT_URL_RE = re.compile(re.escape(SHORT_URL_PREFIX) + r"\d+-\d+")
+# A short url at the very end of the text may still be missing digits
+_OPEN_SHORT_URL_RE = re.compile(re.escape(SHORT_URL_PREFIX) + r"[\d-]*\Z")
 
 
 def get_research_topic(messages: List[AnyMessage]) -> str:
@@ -8,15 +16,8 @@ def get_research_topic(messages: List[AnyMessage]) -> str:
     """
     # check if request has a history and combine the messages into a single string
     if len(messages) == 1:
-        research_topic = messages[-1].content
-    else:
-        research_topic = ""
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                research_topic += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                research_topic += f"Assistant: {message.content}\n"
-    return research_topic
+        return messages[-1].content
+    return format_messages(messages)
 
 
 def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
@@ -24,7 +25,7 @@ def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
     Create a map of the vertex ai search urls (very long) to a short url with a unique id for each url.
     Ensures each original URL gets a consistent shortened form while maintaining uniqueness.
     """
-    prefix = f"https://vertexaisearch.cloud.google.com/id/"
+    prefix = SHORT_URL_PREFIX
     urls = [site.web.uri for site in urls_to_resolve]
 
     # Create a dictionary that maps each unique URL to its first occurrence index
@@ -50,29 +51,43 @@ def insert_citation_markers(text, citations_list):
     Returns:
         str: The text with citation markers inserted.
     """
-    # Sort citations by end_index in descending order.
-    # If end_index is the same, secondary sort by start_index descending.
-    # This ensures that insertions at the end of the string don't affect
-    # the indices of earlier parts of the string that still need to be processed.
-    sorted_citations = sorted(
-        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    # Sort citations by end_index in ascending order, then build the text in a single
+    # pass from the sorted offsets instead of re-slicing the whole string per citation.
+    # Citations sharing an end_index are ordered by start_index, and exact ties in
+    # reverse input order, which matches inserting them one by one from the end.
+    order = sorted(
+        range(len(citations_list)),
+        key=lambda i: (
+            citations_list[i]["end_index"],
+            citations_list[i]["start_index"],
+            -i,
+        ),
     )
 
-    modified_text = text
-    for citation_info in sorted_citations:
-        # These indices refer to positions in the *original* text,
-        # but since we iterate from the end, they remain valid for insertion
-        # relative to the parts of the string already processed.
+    parts = []
+    position = 0
+    for i in order:
+        citation_info = citations_list[i]
         end_idx = citation_info["end_index"]
-        marker_to_insert = ""
+        parts.append(text[position:end_idx])
+        position = end_idx
         for segment in citation_info["segments"]:
-            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
-        # Insert the citation marker at the original end_idx position
-        modified_text = (
-            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
-        )
+            parts.append(f" [{segment['label']}]({segment['short_url']})")
+    parts.append(text[position:])
+
+    return "".join(parts)
 
-    return modified_text
+
+def expand_short_urls(text: str, sources: List[Dict[str, str]]) -> tuple[str, set[str]]:
+    """
+    Replaces every short url in `text` with its original url in a single scan.
+
+    Returns:
+        tuple: The rewritten text and the set of short urls that were replaced.
+    """
+    rewriter = ShortUrlRewriter(sources)
+    expanded = rewriter.feed(text) + rewriter.flush()
+    return expanded, rewriter.used
 
 
 def get_citations(response, resolved_urls_map):
@@ -164,3 +179,53 @@ def get_citations(response, resolved_urls_map):
                     pass
         citations.append(citation)
     return citations
+
+
+class ShortUrlRewriter:
+    """
+    Incrementally replaces short urls with their original urls in streamed text.
+
+    Text that might be the beginning of a short url that continues in the next chunk
+    is held back until it is complete, so a short url split across chunk boundaries
+    is still rewritten. Short urls that are not in `sources` are left unchanged.
+    """
+
+    def __init__(self, sources: List[Dict[str, str]]):
+        self.urls: Dict[str, str] = {}
+        for source in sources:
+            self.urls.setdefault(source["short_url"], source["value"])
+        self.used: set[str] = set()
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        """Add a chunk of text and return the part of it that is safe to emit."""
+        buffer = self._pending + text
+        cut = self._safe_length(buffer)
+        self._pending = buffer[cut:]
+        return self._rewrite(buffer[:cut])
+
+    def flush(self) -> str:
+        """Return the rewritten remainder of the text at the end of the stream."""
+        text, self._pending = self._pending, ""
+        return self._rewrite(text)
+
+    def _safe_length(self, buffer: str) -> int:
+        match = _OPEN_SHORT_URL_RE.search(buffer)
+        if match:
+            return match.start()
+        # The buffer may end with the beginning of the short url prefix itself
+        for size in range(min(len(SHORT_URL_PREFIX) - 1, len(buffer)), 0, -1):
+            if SHORT_URL_PREFIX.startswith(buffer[-size:]):
+                return len(buffer) - size
+        return len(buffer)
+
+    def _rewrite(self, text: str) -> str:
+        return _SHORT_URL_RE.sub(self._replace, text)
+
+    def _replace(self, match: re.Match) -> str:
+        short_url = match.group(0)
+        value = self.urls.get(short_url)
+        if value is None:
+            return short_url
+        self.used.add(short_url)
+        return value
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+
+from agent import cascade as cascade_module
+from agent.cascade import acascade, cascade, escalation
+from agent.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(cascade_module, "record_cascade", registry.observe_cascade)
+    return registry
+
+
+def _result(confidence):
+    return SimpleNamespace(confidence=confidence, tier="fast")
+
+
+FULL = SimpleNamespace(tier="full")
+
+
+def test_escalation():
+    assert escalation(None, 0.5) == "invalid"
+    assert escalation(SimpleNamespace(), 0.5) == "low_confidence"
+    assert escalation(_result(0.49), 0.5) == "low_confidence"
+    assert escalation(_result(0.5), 0.5) is None
+
+
+def _raise(error):
+    def fast():
+        raise error
+
+    return fast
+
+
+@pytest.mark.parametrize(
+    "fast, outcome",
+    [
+        (lambda: _result(0.9), "fast"),
+        (lambda: _result(0.2), "low_confidence"),
+        (lambda: None, "invalid"),
+        (_raise(OutputParserException("not json")), "invalid"),
+        (_raise(RuntimeError("model retired")), "error"),
+    ],
+)
+def test_cascade_outcomes(registry, fast, outcome):
+    result = cascade("reflection", fast, lambda: FULL, 0.7)
+    assert result.tier == ("fast" if outcome == "fast" else "full")
+    assert dict(registry.cascade) == {("reflection", outcome): 1}
+
+
+def test_full_tier_errors_are_raised(registry):
+    with pytest.raises(ValueError):
+        cascade("query", _raise(RuntimeError()), _raise(ValueError()), 0.7)
+
+
+def test_base_exceptions_are_not_escalated(registry):
+    with pytest.raises(KeyboardInterrupt):
+        cascade("query", _raise(KeyboardInterrupt()), lambda: FULL, 0.7)
+    assert not registry.cascade
+
+
+def test_acascade_outcomes(registry):
+    async def confident():
+        return _result(0.9)
+
+    async def unsure():
+        return _result(0.1)
+
+    async def broken():
+        raise RuntimeError("503 UNAVAILABLE")
+
+    async def full():
+        return FULL
+
+    async def run():
+        return [
+            (await acascade("query", fast, full, 0.7)).tier
+            for fast in (confident, unsure, broken)
+        ]
+
+    assert asyncio.run(run()) == ["fast", "full", "full"]
+    assert dict(registry.cascade) == {
+        ("query", "fast"): 1,
+        ("query", "low_confidence"): 1,
+        ("query", "error"): 1,
+    }
+
+
+def test_hit_rates_are_rendered(registry):
+    for fast in (lambda: _result(0.9), lambda: _result(0.9), lambda: None):
+        cascade("query", fast, lambda: FULL, 0.7)
+    cascade("reflection", _raise(RuntimeError()), lambda: FULL, 0.7)
+    assert registry.cascade_hit_rates() == {"query": 2 / 3, "reflection": 0.0}
+    rendered = registry.render()
+    assert f'agent_cascade_hit_rate{{stage="query"}} {2 / 3}' in rendered
+    assert 'agent_cascade_hit_rate{stage="reflection"} 0.0' in rendered
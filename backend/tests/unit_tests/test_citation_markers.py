@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from agent.utils import insert_citation_markers
+
+
+def baseline_insert_citation_markers(text, citations_list):
+    # The original implementation, inserting markers one by one from the end
+    sorted_citations = sorted(
+        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    )
+    modified_text = text
+    for citation_info in sorted_citations:
+        end_idx = citation_info["end_index"]
+        marker_to_insert = ""
+        for segment in citation_info["segments"]:
+            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
+        modified_text = (
+            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+        )
+    return modified_text
+
+
+def _citations(rng, length, count):
+    citations = []
+    for idx in range(count):
+        # Few distinct offsets, so equal end and start indices are common
+        end = rng.choice([0, length // 2, length, rng.randint(0, length)])
+        start = rng.choice([0, end // 2, end])
+        citations.append(
+            {
+                "start_index": start,
+                "end_index": end,
+                "segments": [
+                    {"label": f"l{idx}-{n}", "short_url": f"s/{idx}-{n}"}
+                    for n in range(rng.randint(0, 2))
+                ],
+            }
+        )
+    return citations
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_baseline(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("ab .é") for _ in range(rng.randint(0, 40)))
+    citations = _citations(rng, len(text), rng.randint(0, 8))
+    assert insert_citation_markers(text, citations) == baseline_insert_citation_markers(
+        text, citations
+    )
+
+
+def test_exact_ties_keep_the_baseline_order():
+    citations = [
+        {
+            "start_index": 0,
+            "end_index": 4,
+            "segments": [{"label": "first", "short_url": "1"}],
+        },
+        {
+            "start_index": 0,
+            "end_index": 4,
+            "segments": [{"label": "second", "short_url": "2"}],
+        },
+        {
+            "start_index": 2,
+            "end_index": 4,
+            "segments": [{"label": "third", "short_url": "3"}],
+        },
+    ]
+    expected = "Text [second](2) [first](1) [third](3) end"
+    assert baseline_insert_citation_markers("Text end", citations) == expected
+    assert insert_citation_markers("Text end", citations) == expected
+
+
+def test_without_citations():
+    assert insert_citation_markers("unchanged", []) == "unchanged"
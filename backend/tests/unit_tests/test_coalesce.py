@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agent.coalesce import SingleFlight
+
+
+def test_concurrent_identical_keys_make_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def search():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "key", search) for _ in range(4)]
+        # Let every caller join the leader's call before it completes
+        while flight.stats()["coalesced"] < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 3}
+
+
+def test_sync_error_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def search():
+        release.wait(5)
+        raise RuntimeError("search failed")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "key", search) for _ in range(3)]
+        while flight.stats()["coalesced"] < 2:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="search failed"):
+                future.result()
+    # The failed call is not remembered
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("a", lambda: 2) == 2
+    assert flight.do("b", lambda: 3) == 3
+    assert flight.stats() == {"calls": 3, "coalesced": 0}
+
+
+def test_async_identical_keys_make_one_call():
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.ado("key", search) for _ in range(5)))
+        return results, flight.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert stats == {"calls": 1, "coalesced": 4}
+
+
+def test_async_error_reaches_every_waiter():
+    async def search():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("search failed")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            *(flight.ado("key", search) for _ in range(3)), return_exceptions=True
+        )
+
+    errors = asyncio.run(run())
+    assert [type(error) for error in errors] == [RuntimeError] * 3
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.ado("key", search))
+        second = asyncio.create_task(flight.ado("key", search))
+        await asyncio.sleep(0)
+        # Cancel the caller that started the shared call
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+    assert len(calls) == 1
@@ -0,0 +1,56 @@
+import re
+
+from agent.compaction import compact_research, word_shingles
+from agent.utils import SHORT_URL_PREFIX
+
+SHORT_URL_RE = re.compile(re.escape(SHORT_URL_PREFIX) + r"\d+-\d+")
+
+
+def _cite(label, short_id):
+    return f" [{label}]({SHORT_URL_PREFIX}{short_id})"
+
+
+RESULTS = [
+    "Solar capacity grew by 30 percent in 2024 across the region."
+    + _cite("a", "0-0")
+    + " Battery prices fell again."
+    + _cite("b", "0-1"),
+    "Solar capacity grew by 30 percent in 2024 across the region!"
+    + _cite("c", "1-0")
+    + _cite("a", "0-0")
+    + " Wind output was flat.",
+    "Solar capacity grew by 30 percent in 2024 across the region." + _cite("d", "2-0"),
+]
+
+
+def test_word_shingles_ignore_citations_and_case():
+    assert word_shingles("Solar grew fast." + _cite("a", "0-0")) == {"solar grew fast"}
+
+
+def test_drops_duplicate_sentences_and_keeps_every_citation():
+    texts, report = compact_research(RESULTS)
+    assert set(SHORT_URL_RE.findall("".join(texts))) == set(
+        SHORT_URL_RE.findall("".join(RESULTS))
+    )
+    assert report["sentences"] == 5
+    assert report["dropped_sentences"] == 2
+    assert report["tokens_after"] < report["tokens_before"]
+    # The kept sentence carries the markers of its duplicates, each once
+    assert texts[0].count(f"{SHORT_URL_PREFIX}0-0") == 1
+    assert f"{SHORT_URL_PREFIX}1-0" in texts[0] and f"{SHORT_URL_PREFIX}2-0" in texts[0]
+
+
+def test_results_without_sentences_left_are_dropped():
+    texts, _ = compact_research(RESULTS)
+    assert len(texts) == 2
+    assert texts[1] == "Wind output was flat."
+
+
+def test_distinct_sentences_are_kept_unchanged():
+    results = [
+        "Solar grew." + _cite("a", "0-0"),
+        "Wind turbines got larger and cheaper.",
+    ]
+    texts, report = compact_research(results)
+    assert texts == results
+    assert report["dropped_sentences"] == 0
@@ -0,0 +1,59 @@
+import pytest
+
+from agent.configuration import Configuration
+
+
+@pytest.fixture(autouse=True)
+def fresh_env():
+    Configuration.refresh_env()
+    yield
+    # Don't leak monkeypatched environment overrides into other tests
+    Configuration.refresh_env()
+
+
+def _config(**configurable):
+    return {"configurable": configurable}
+
+
+def test_same_values_reuse_the_instance():
+    first = Configuration.from_runnable_config(_config(max_research_loops=4))
+    second = Configuration.from_runnable_config(
+        _config(max_research_loops=4, thread_id="other")
+    )
+    assert first is second
+    assert first.max_research_loops == 4
+    assert Configuration.from_runnable_config() is Configuration.from_runnable_config(
+        {}
+    )
+
+
+def test_different_values_do_not_collide():
+    four = Configuration.from_runnable_config(_config(max_research_loops=4))
+    five = Configuration.from_runnable_config(_config(max_research_loops=5))
+    default = Configuration.from_runnable_config(_config())
+    assert (four.max_research_loops, five.max_research_loops) == (4, 5)
+    assert default.max_research_loops == Configuration().max_research_loops
+    # The same value under another field is another key
+    answer = Configuration.from_runnable_config(_config(answer_model="m"))
+    reflection = Configuration.from_runnable_config(_config(reflection_model="m"))
+    assert answer is not reflection
+    assert answer.answer_model == reflection.reflection_model == "m"
+    assert answer.reflection_model == Configuration().reflection_model
+
+
+def test_refresh_env_picks_up_changed_variables(monkeypatch):
+    config = _config(max_research_loops=4)
+    assert Configuration.from_runnable_config(config).max_research_loops == 4
+
+    monkeypatch.setenv("MAX_RESEARCH_LOOPS", "7")
+    # Environment variables are read once, until refreshed
+    assert Configuration.from_runnable_config(config).max_research_loops == 4
+    Configuration.refresh_env()
+    refreshed = Configuration.from_runnable_config(config)
+    # The environment takes precedence over the configurable value
+    assert refreshed.max_research_loops == 7
+    assert Configuration.from_runnable_config(config) is refreshed
+
+    monkeypatch.delenv("MAX_RESEARCH_LOOPS")
+    Configuration.refresh_env()
+    assert Configuration.from_runnable_config(config).max_research_loops == 4
@@ -0,0 +1,35 @@
+from agent.dedup import dedupe_queries, jaccard, query_shingles
+
+
+def test_word_order_and_case_do_not_matter():
+    assert query_shingles("iPhone sales 2024") == query_shingles("2024 iphone SALES?")
+
+
+def test_jaccard():
+    assert jaccard(set(), set()) == 1.0
+    assert jaccard({"a", "b"}, {"b", "c"}) == 1 / 3
+
+
+def test_drops_near_duplicates_of_earlier_candidates():
+    kept, dropped = dedupe_queries(
+        ["iphone sales 2024", "2024 iphone sales", "android market share"], [], 0.8
+    )
+    assert kept == ["iphone sales 2024", "android market share"]
+    assert dropped == [
+        {"query": "2024 iphone sales", "duplicate_of": "iphone sales 2024"}
+    ]
+
+
+def test_drops_queries_already_searched():
+    kept, dropped = dedupe_queries(
+        ["solar capacity growth", "wind turbine costs"], ["Solar capacity growth?"], 0.8
+    )
+    assert kept == ["wind turbine costs"]
+    assert dropped == [
+        {"query": "solar capacity growth", "duplicate_of": "Solar capacity growth?"}
+    ]
+
+
+def test_threshold_above_one_keeps_everything():
+    queries = ["same query", "same query"]
+    assert dedupe_queries(queries, queries, 1.01) == (queries, [])
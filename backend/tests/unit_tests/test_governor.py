@@ -0,0 +1,233 @@
+import asyncio
+import threading
+
+import pytest
+
+from agent import governor as governor_module
+from agent.governor import (
+    PRIORITY_FINALIZE,
+    PRIORITY_SEARCH,
+    ModelGovernor,
+    TokenBucket,
+    is_throttle_error,
+)
+
+
+class Throttled(Exception):
+    code = 429
+
+
+def _governor(**kwargs):
+    kwargs.setdefault("base_delay", 0)
+    return ModelGovernor(**kwargs)
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(Throttled())
+    assert is_throttle_error(RuntimeError("429 RESOURCE_EXHAUSTED. Quota exceeded"))
+    wrapped = RuntimeError("Error calling model")
+    wrapped.__cause__ = Throttled()
+    assert is_throttle_error(wrapped)
+    # Numbers in urls or ids are not status codes
+    assert not is_throttle_error(ValueError("No result for https://x.example/id/4291"))
+    assert not is_throttle_error(ValueError("request 429 failed validation"))
+
+
+def test_token_bucket_hands_out_the_burst_then_waits():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_limit_grows_on_success_and_halves_on_throttle():
+    gov = _governor(initial_concurrency=4)
+    calls = []
+
+    def throttled_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise Throttled()
+        return "ok"
+
+    assert gov.call("m", throttled_once) == "ok"
+    assert len(calls) == 2
+    # Halved to 2 by the throttle, then 2 + 1/2 after the success
+    assert gov.stats()["m"] == {
+        "limit": 2.5,
+        "in_flight": 0,
+        "queued": 0,
+        "throttled": 1,
+    }
+
+
+def test_retries_throttling_up_to_max_attempts(monkeypatch):
+    retries = []
+    monkeypatch.setattr(governor_module, "record_retry", lambda: retries.append(1))
+    gov = _governor(initial_concurrency=8, max_attempts=3)
+    calls = []
+
+    def always_throttled():
+        calls.append(1)
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        gov.call("m", always_throttled)
+    assert len(calls) == 3
+    assert len(retries) == 2
+    assert gov.stats()["m"]["limit"] == 1.0
+    assert gov.stats()["m"]["in_flight"] == 0
+
+
+def test_other_errors_are_not_retried():
+    gov = _governor()
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        gov.call("m", broken)
+    assert len(calls) == 1
+    assert gov.stats()["m"]["in_flight"] == 0
+    assert gov.stats()["m"]["throttled"] == 0
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    gov = _governor(base_delay=1.0, max_delay=5.0)
+    monkeypatch.setattr(
+        governor_module.random, "uniform", lambda low, high: (low, high)
+    )
+    assert gov._backoff(0) == (0, 1.0)
+    assert gov._backoff(2) == (0, 4.0)
+    assert gov._backoff(10) == (0, 5.0)
+
+
+def test_slot_is_released_on_keyboard_interrupt():
+    gov = _governor()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        gov.call("m", interrupted)
+    assert gov.stats()["m"]["in_flight"] == 0
+    assert gov._in_flight == 0
+
+
+def test_waiters_are_served_by_priority_across_models():
+    async def run():
+        gov = _governor(total_concurrency=1)
+        release = asyncio.Event()
+        order = []
+
+        async def hold():
+            await release.wait()
+
+        def record(name):
+            async def fn():
+                order.append(name)
+
+            return fn
+
+        holder = asyncio.create_task(gov.acall("search-model", hold))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(
+                gov.acall("search-model", record("search 1"), PRIORITY_SEARCH)
+            ),
+            asyncio.create_task(
+                gov.acall("search-model", record("search 2"), PRIORITY_SEARCH)
+            ),
+            asyncio.create_task(
+                gov.acall("answer-model", record("answer"), PRIORITY_FINALIZE)
+            ),
+        ]
+        await asyncio.sleep(0)
+        assert gov.stats()["search-model"]["queued"] == 2
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order, gov
+
+    order, gov = asyncio.run(run())
+    assert order == ["answer", "search 1", "search 2"]
+    assert gov._in_flight == 0
+
+
+def test_model_at_its_limit_does_not_block_other_models():
+    async def run():
+        gov = _governor(initial_concurrency=1, total_concurrency=4)
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        async def done():
+            return "done"
+
+        holder = asyncio.create_task(gov.acall("a", hold))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(gov.acall("a", done, PRIORITY_FINALIZE))
+        # Model "a" is at its limit, so its queued call is passed over for "b"
+        assert await gov.acall("b", done) == "done"
+        assert not queued.done()
+        release.set()
+        await asyncio.gather(holder, queued)
+        return gov
+
+    assert asyncio.run(run())._in_flight == 0
+
+
+def test_cancellation_releases_running_and_queued_slots():
+    async def run():
+        gov = _governor(total_concurrency=1)
+        never = asyncio.Event()
+
+        async def hang():
+            await never.wait()
+
+        async def done():
+            return "done"
+
+        running = asyncio.create_task(gov.acall("m", hang))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(gov.acall("m", hang))
+        await asyncio.sleep(0)
+        queued.cancel()
+        running.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        assert gov._in_flight == 0
+        assert gov.stats()["m"]["queued"] == 0
+        # The slot is free again
+        assert await gov.acall("m", done) == "done"
+        return gov
+
+    assert asyncio.run(run())._in_flight == 0
+
+
+def test_sync_calls_share_the_total_limit():
+    gov = _governor(total_concurrency=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+    barrier = threading.Event()
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        barrier.wait(0.05)
+        with lock:
+            running[0] -= 1
+
+    threads = [
+        threading.Thread(target=gov.call, args=(f"m{idx % 3}", work))
+        for idx in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 2
+    assert gov._in_flight == 0
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent import graph
+from agent.configuration import Configuration
+from agent.governor import ModelGovernor
+from agent.tools_and_schemas import SearchQueryList
+
+
+class Throttled(Exception):
+    code = 429
+
+
+class FlakyAnswerLLM:
+    """Streams the answer, throttled after the first chunk of the first attempt."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.attempts = 0
+
+    def _chunks(self):
+        self.attempts += 1
+        for idx, chunk in enumerate(self.chunks):
+            if self.attempts == 1 and idx == 1:
+                raise Throttled("429 Too Many Requests")
+            yield SimpleNamespace(content=chunk)
+
+    def stream(self, prompt):
+        yield from self._chunks()
+
+    async def astream(self, prompt):
+        for chunk in self._chunks():
+            yield chunk
+
+
+@pytest.fixture
+def answer_run(monkeypatch):
+    events = []
+    llm = FlakyAnswerLLM(["Solar ", "grew."])
+    monkeypatch.setattr(graph, "governor", ModelGovernor(base_delay=0))
+    monkeypatch.setattr(graph, "get_stream_writer", lambda: events.append)
+    monkeypatch.setattr(graph, "_answer_llm", lambda model: llm)
+    state = {
+        "messages": [HumanMessage(content="How did solar grow?")],
+        "web_research_result": ["Solar grew."],
+        "source_table": None,
+    }
+    return state, events, llm
+
+
+def _streamed(events):
+    text = ""
+    for event in events:
+        if event.get("answer_reset"):
+            text = ""
+        text += event.get("delta", "")
+    return text
+
+
+def test_finalize_answer_resets_the_stream_on_retry(answer_run):
+    state, events, llm = answer_run
+    update = graph.finalize_answer(state, {})
+    assert llm.attempts == 2
+    assert update["messages"][0].content == "Solar grew."
+    assert events[1] == {"node": "finalize_answer", "answer_reset": True}
+    assert _streamed(events) == "Solar grew."
+
+
+def test_afinalize_answer_resets_the_stream_on_retry(answer_run):
+    state, events, llm = answer_run
+    update = asyncio.run(graph.afinalize_answer(state, {}))
+    assert llm.attempts == 2
+    assert update["messages"][0].content == "Solar grew."
+    assert _streamed(events) == "Solar grew."
+    assert sum(bool(event.get("answer_reset")) for event in events) == 1
+
+
+def _ungrounded_response():
+    candidate = SimpleNamespace(grounding_metadata=None)
+    return SimpleNamespace(text="Solar grew.", candidates=[candidate])
+
+
+SEARCH_STATE = {"search_query": "solar growth", "id": 3}
+
+
+def test_web_research_without_grounding_metadata_fails_the_branch_only(monkeypatch):
+    monkeypatch.setattr(graph, "_search", lambda state, conf: _ungrounded_response())
+    update = graph.web_research(SEARCH_STATE, {})
+    assert update["web_research_result"] == []
+    assert update["search_query"] == ["solar growth"]
+    assert update["web_research_errors"][0]["id"] == 3
+    assert update["web_research_errors"][0]["error"].startswith("AttributeError")
+
+
+def test_aweb_research_without_grounding_metadata_fails_the_branch_only(monkeypatch):
+    async def asearch(state, conf):
+        return _ungrounded_response()
+
+    monkeypatch.setattr(graph, "_asearch", asearch)
+    update = asyncio.run(graph.aweb_research(SEARCH_STATE, {}))
+    assert update["web_research_result"] == []
+    assert len(update["web_research_errors"]) == 1
+
+
+def test_web_research_raise_policy(monkeypatch):
+    monkeypatch.setattr(graph, "_search", lambda state, conf: _ungrounded_response())
+    config = {"configurable": {"web_research_error_policy": "raise"}}
+    with pytest.raises(AttributeError):
+        graph.web_research(SEARCH_STATE, config)
+
+
+def _second_turn_sends(monkeypatch, deadline_seconds):
+    monkeypatch.setattr(graph, "governor", ModelGovernor())
+    # The first turn's queries, each added again by its web_research branch
+    earlier = ["turn one a", "turn one b", "turn one a", "turn one b"]
+    state = {
+        "messages": [HumanMessage(content="And wind?")],
+        "search_query": earlier,
+        "web_research_result": ["Solar grew.", "Solar got cheaper."],
+        "deadline_seconds": deadline_seconds,
+        "started_at": time.time(),
+        "research_topic": "And wind?",
+    }
+    result = SearchQueryList(query=["wind a", "wind b", "wind c"], rationale="")
+    update = graph._query_generation_update(state, result, Configuration())
+    # The state the conditional edge sees once the update is applied
+    merged = {**state, **update, "search_query": earlier + update["search_query"]}
+    return [send.arg for send in graph.continue_to_web_research(merged)], update
+
+
+def test_second_turn_searches_only_its_own_queries(monkeypatch):
+    sends, update = _second_turn_sends(monkeypatch, None)
+    assert sends == [
+        {"search_query": "wind a", "id": 4},
+        {"search_query": "wind b", "id": 5},
+        {"search_query": "wind c", "id": 6},
+    ]
+    assert update["degradations"] == []
+
+
+def test_second_turn_fanout_is_fitted_to_the_deadline(monkeypatch):
+    # 30 seconds leave room for the reflection and answer estimates, not 3 searches
+    sends, update = _second_turn_sends(monkeypatch, 30)
+    assert sends == [{"search_query": "wind a", "id": 4}]
+    assert update["degradations"][0]["dropped_queries"] == ["wind b", "wind c"]
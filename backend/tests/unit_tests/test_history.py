@@ -0,0 +1,107 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pydantic import ValidationError
+
+from agent.configuration import Configuration
+from agent.history import (
+    build_research_topic,
+    estimate_tokens,
+    split_history,
+    split_turns,
+)
+
+
+def _conversation(turns, answer="Answer [source](https://example.com/long-url)."):
+    messages = []
+    for idx in range(turns):
+        messages.append(HumanMessage(content=f"Question {idx}?"))
+        if idx < turns - 1:
+            messages.append(AIMessage(content=f"{answer} {idx}"))
+    return messages
+
+
+def test_split_turns():
+    system = SystemMessage(content="setup")
+    messages = [system, *_conversation(3)]
+    turns = split_turns(messages)
+    # Messages before the first user message form a turn of their own
+    assert [len(turn) for turn in turns] == [1, 2, 2, 1]
+    assert turns[0] == [system]
+    assert [turn[0].content for turn in turns[1:]] == [
+        "Question 0?",
+        "Question 1?",
+        "Question 2?",
+    ]
+    assert split_turns([]) == []
+
+
+def test_full_keeps_everything():
+    messages = _conversation(4)
+    assert split_history(messages, "full", 1, 1) == ([], messages)
+
+
+@pytest.mark.parametrize("strategy", ["last_n", "summarize"])
+def test_last_turns(strategy):
+    messages = _conversation(4)
+    older, window = split_history(messages, strategy, 2, 0)
+    assert older == messages[:4]
+    assert window == messages[4:]
+    assert window[0].content == "Question 2?"
+    # At least the latest turn is kept
+    older, window = split_history(messages, strategy, 0, 0)
+    assert window == messages[-1:]
+    # Fewer turns than the limit keep the whole conversation
+    assert split_history(messages, strategy, 10, 0) == ([], messages)
+
+
+def test_token_budget():
+    messages = _conversation(4)
+    latest = estimate_tokens("User: Question 3?\n")
+    turn = estimate_tokens("User: Question 2?\nAssistant: Answer [source]. 2\n")
+    # Citation urls are not counted against the budget
+    older, window = split_history(messages, "token_budget", 0, latest + turn)
+    assert window[0].content == "Question 2?"
+    assert older == messages[:4]
+    older, window = split_history(messages, "token_budget", 0, latest + turn - 1)
+    assert window == messages[-1:]
+    # The latest turn is kept even when it alone exceeds the budget
+    assert split_history(messages, "token_budget", 0, 0)[1] == messages[-1:]
+
+
+def test_a_single_turn_is_never_split():
+    messages = _conversation(1)
+    for strategy in ("last_n", "token_budget", "summarize"):
+        assert split_history(messages, strategy, 0, 0) == ([], messages)
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError, match="Unknown history strategy"):
+        split_history(_conversation(2), "last-n", 3, 4000)
+    with pytest.raises(ValidationError):
+        Configuration(history_strategy="last-n")
+    assert Configuration(history_strategy="token_budget").history_strategy == (
+        "token_budget"
+    )
+
+
+def test_build_research_topic():
+    messages = _conversation(3)
+    assert build_research_topic(messages[:1], "last_n") == "Question 0?"
+    full = build_research_topic(messages)
+    assert full.startswith("User: Question 0?\nAssistant: Answer [source](https://")
+
+    topic = build_research_topic(messages, "last_n", max_turns=2)
+    assert topic == (
+        "User: Question 1?\nAssistant: Answer [source]. 1\nUser: Question 2?\n"
+    )
+
+    summarized = build_research_topic(
+        messages, "summarize", max_turns=2, summary="Question 0 was answered."
+    )
+    assert summarized == (
+        "Summary of the earlier conversation: Question 0 was answered.\n" + topic
+    )
+    # Without older turns there is nothing to summarize
+    assert build_research_topic(
+        messages, "summarize", max_turns=3, summary="unused"
+    ) == build_research_topic(messages, "last_n", max_turns=3)
@@ -0,0 +1,13 @@
+import importlib.util
+from pathlib import Path
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "benchmarks" / "import_time.py"
+_spec = importlib.util.spec_from_file_location("import_time", _SCRIPT)
+import_time = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(import_time)
+
+
+def test_import_is_lazy():
+    # The wall-clock budget depends on the machine, so it is checked by
+    # `make import_budget` rather than here
+    assert import_time.probe() == {"lazy_loaded": [], "graph_built": False}
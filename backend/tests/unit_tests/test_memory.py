@@ -0,0 +1,120 @@
+import asyncio
+import sqlite3
+
+from agent.memory import (
+    ResearchMemory,
+    get_research_memory,
+    renumber_short_urls,
+    tokenize,
+)
+from agent.utils import SHORT_URL_PREFIX
+
+SOURCES = [{"label": "a", "short_url": f"{SHORT_URL_PREFIX}0-0", "value": "https://a"}]
+SOLAR = f"Solar capacity grew by 30 percent [a]({SHORT_URL_PREFIX}0-0)."
+WIND = "Offshore wind installations stalled because of turbine costs."
+
+
+def _memory(**kwargs):
+    memory = ResearchMemory(**kwargs)
+    memory.add("solar capacity growth 2024", SOLAR, SOURCES)
+    memory.add("offshore wind turbine costs", WIND, [])
+    return memory
+
+
+def test_tokenize_ignores_citation_links():
+    assert tokenize(f"Solar grew [a]({SHORT_URL_PREFIX}0-0).") == ["solar", "grew"]
+
+
+def test_renumber_short_urls():
+    text = f"x [a]({SHORT_URL_PREFIX}0-3) y [b]({SHORT_URL_PREFIX}12-0)"
+    assert renumber_short_urls(text, 7) == (
+        f"x [a]({SHORT_URL_PREFIX}7-3) y [b]({SHORT_URL_PREFIX}7-0)"
+    )
+
+
+def test_recalls_the_matching_entry():
+    memory = _memory()
+    hit = memory.search("2024 solar capacity growth", 60, 0.8)
+    assert hit["query"] == "solar capacity growth 2024"
+    assert hit["text"] == SOLAR
+    assert hit["sources"] == SOURCES
+    assert hit["similarity"] == 1.0
+    assert memory.search("wind turbine costs offshore", 60, 0.8)["text"] == WIND
+
+
+def test_bm25_ranks_the_entry_sharing_rare_terms_first():
+    memory = _memory()
+    memory.add("solar panel prices", "Solar panel prices fell.", [])
+    scores = memory._bm25(set(tokenize("solar capacity")))
+    best = max(scores, key=scores.get)
+    assert memory._entries[best].query == "solar capacity growth 2024"
+    assert len(scores) == 2
+
+
+def test_similarity_threshold_and_age():
+    memory = _memory()
+    assert memory.search("solar capacity growth in europe", 60, 0.8) is None
+    assert memory.search("solar capacity growth in europe", 60, 0.1) is not None
+    assert memory.search("solar capacity growth 2024", -1, 0.8) is None
+    assert memory.search("geothermal", 60, 0.0) is None
+    assert memory.stats()["hits"] == 1
+    assert memory.stats()["misses"] == 3
+
+
+def test_replaces_results_and_evicts_least_recently_used():
+    memory = _memory(max_entries=2)
+    memory.add("solar capacity growth 2024", "Solar grew a lot.", [])
+    assert len(memory) == 2
+    assert memory.search("solar capacity growth 2024", 60, 0.8)["text"] == (
+        "Solar grew a lot."
+    )
+    memory.add("battery prices", "Battery prices fell.", [])
+    assert memory.search("offshore wind turbine costs", 60, 0.8) is None
+    assert memory.stats()["evictions"] == 1
+    assert memory._total_length == sum(e.length for e in memory._entries.values())
+
+
+def test_sqlite_persistence_and_reload(tmp_path):
+    path = str(tmp_path / "memory" / "research.sqlite3")
+    memory = _memory(path=path, max_entries=2)
+    asyncio.run(memory.aadd("battery prices", "Battery prices fell.", []))
+    reloaded = ResearchMemory(path, max_entries=2)
+    assert len(reloaded) == 2
+    assert reloaded.search("battery prices", 60, 0.8)["text"] == "Battery prices fell."
+    assert reloaded.search("offshore wind turbine costs", 60, 0.8)["text"] == WIND
+    # The evicted entry was deleted from the database as well
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM research_memory").fetchone()[0] == 2
+
+
+def test_processes_sharing_a_database_do_not_collide(tmp_path):
+    path = str(tmp_path / "research.sqlite3")
+    first, second = ResearchMemory(path), ResearchMemory(path)
+    first.add("solar capacity growth 2024", SOLAR, SOURCES)
+    second.add("offshore wind turbine costs", WIND, [])
+    reloaded = ResearchMemory(path)
+    assert len(reloaded) == 2
+    assert reloaded.search("solar capacity growth 2024", 60, 0.8)["sources"] == SOURCES
+
+
+def test_storage_errors_are_counted_not_raised(tmp_path):
+    path = str(tmp_path / "research.sqlite3")
+    memory = ResearchMemory(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE research_memory")
+    memory.add("solar capacity growth 2024", SOLAR, SOURCES)
+    assert memory.stats()["storage_errors"] == 1
+    # The index keeps serving the entry
+    assert memory.search("solar capacity growth 2024", 60, 0.8) is not None
+
+    (tmp_path / "directory.sqlite3").mkdir()
+    unreadable = ResearchMemory(str(tmp_path / "directory.sqlite3"))
+    assert unreadable.stats()["storage_errors"] == 1
+    assert len(unreadable) == 0
+
+
+def test_get_research_memory():
+    assert get_research_memory("none", "", 10) is None
+    memory = get_research_memory("memory", "", 11)
+    assert get_research_memory("memory", "", 11) is memory
+    assert memory.path is None
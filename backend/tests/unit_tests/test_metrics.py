@@ -0,0 +1,131 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from agent import graph, metrics
+from agent.metrics import MetricsRegistry, NodeRecord
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+def _record(node, wall_seconds, **counts):
+    record = NodeRecord(node)
+    record.wall_seconds = wall_seconds
+    for name, value in counts.items():
+        setattr(record, name, value)
+    return record
+
+
+def _samples(rendered):
+    # Every non-comment line is "<name>{<labels>} <value>"
+    samples = {}
+    for line in rendered.splitlines():
+        if line and not line.startswith("#"):
+            series, _, value = line.rpartition(" ")
+            samples[series] = float(value)
+    return samples
+
+
+def test_render_text_format(registry):
+    registry.observe(_record("web_research", 0.3, input_tokens=10, retries=1))
+    registry.observe(_record("web_research", 7.0, input_tokens=5), error=True)
+    registry.register_stats("search_cache", lambda: {"hits": 2}, "memory")
+    rendered = registry.render()
+    assert rendered.endswith("\n")
+    assert "# TYPE agent_node_duration_seconds histogram" in rendered
+    samples = _samples(rendered)
+    assert samples['agent_node_runs_total{node="web_research"}'] == 2
+    assert samples['agent_node_errors_total{node="web_research"}'] == 1
+    # Histogram buckets are cumulative
+    assert (
+        samples['agent_node_duration_seconds_bucket{node="web_research",le="0.25"}']
+        == 0
+    )
+    assert (
+        samples['agent_node_duration_seconds_bucket{node="web_research",le="0.5"}'] == 1
+    )
+    assert (
+        samples['agent_node_duration_seconds_bucket{node="web_research",le="+Inf"}']
+        == 2
+    )
+    assert samples['agent_node_duration_seconds_count{node="web_research"}'] == 2
+    assert samples['agent_node_duration_seconds_sum{node="web_research"}'] == 7.3
+    assert samples['agent_node_input_tokens_total{node="web_research"}'] == 15
+    assert samples['agent_node_retries_total{node="web_research"}'] == 1
+    assert (
+        samples[
+            'agent_component_stat{component="search_cache",backend="memory",stat="hits"}'
+        ]
+        == 2
+    )
+    # Every sample has HELP and TYPE lines
+    names = {series.partition("{")[0] for series in samples}
+    for name in names:
+        base = name.removesuffix("_bucket").removesuffix("_sum").removesuffix("_count")
+        assert f"# TYPE {base} " in rendered
+
+
+def test_label_values_are_escaped(registry):
+    registry.observe(_record('say "hi"\\\nnode', 0.1))
+    registry.observe_cascade("stage\n", "fast")
+    rendered = registry.render()
+    assert 'agent_node_runs_total{node="say \\"hi\\"\\\\\\nnode"} 1' in rendered
+    assert 'agent_cascade_calls_total{stage="stage\\n",outcome="fast"} 1' in rendered
+    # Escaped values never break a sample across lines
+    assert all(line.startswith(("#", "agent_")) for line in rendered.splitlines())
+
+
+def test_track_attributes_calls_to_the_node(registry):
+    with metrics.track("reflection") as record:
+        metrics.record_queue_wait(0.5)
+        metrics.record_retry()
+        metrics.record_tokens(100, None)
+        metrics.record_grounding_chunks(3)
+    # Outside a tracked node nothing is recorded
+    metrics.record_retry()
+    summary = record.summary()
+    assert summary["node"] == "reflection"
+    assert summary["queue_ms"] == 500.0
+    assert summary["retries"] == 1
+    assert summary["input_tokens"] == 100
+    assert summary["output_tokens"] == 0
+    assert summary["grounding_chunks"] == 3
+    assert registry.runs["reflection"] == 1
+
+    with pytest.raises(ValueError):
+        with metrics.track("reflection"):
+            raise ValueError
+    assert registry.errors["reflection"] == 1
+
+
+def test_usage_callback_records_chat_model_tokens(registry):
+    message = AIMessage(
+        content="x",
+        usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10},
+    )
+    result = LLMResult(generations=[[ChatGeneration(message=message)]])
+    with metrics.track("generate_query") as record:
+        metrics.usage_handler.on_llm_end(result)
+    assert (record.input_tokens, record.output_tokens) == (7, 3)
+
+
+def test_nodes_append_their_run_trace(registry):
+    def generate_query(state, config):
+        metrics.record_tokens(4, 2)
+        return {"search_query": ["q"]}
+
+    node = graph._node(generate_query, None)
+    update = node.invoke({}, {"configurable": {"enable_metrics": True}})
+    assert update["search_query"] == ["q"]
+    (trace,) = update["run_trace"]
+    assert trace["node"] == "generate_query"
+    assert (trace["input_tokens"], trace["output_tokens"]) == (4, 2)
+    assert registry.runs["generate_query"] == 1
+
+    update = node.invoke({}, {"configurable": {"enable_metrics": False}})
+    assert "run_trace" not in update
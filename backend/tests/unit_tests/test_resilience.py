@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.resilience import LatencyWindow, ahedged, call_with_timeout, hedged
+
+
+def test_latency_window_percentile():
+    window = LatencyWindow(size=100, min_samples=10)
+    for seconds in range(9):
+        window.add(seconds)
+    assert window.percentile(50) is None
+    window.add(9)
+    assert window.percentile(50) == 5
+    assert window.percentile(90) == 9
+    assert window.percentile(100) == 9
+
+
+def test_latency_window_keeps_the_latest_samples():
+    window = LatencyWindow(size=3, min_samples=1)
+    for seconds in (10, 20, 1, 2, 3):
+        window.add(seconds)
+    assert window.percentile(100) == 3
+
+
+def test_call_with_timeout():
+    assert call_with_timeout(lambda: "ok", None) == "ok"
+    assert call_with_timeout(lambda: "ok", 1.0) == "ok"
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        call_with_timeout(lambda: time.sleep(0.5), 0.05)
+    assert time.monotonic() - started < 0.4
+
+
+def test_call_with_timeout_raises_errors_of_the_call():
+    def broken():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        call_with_timeout(broken, 1.0)
+
+
+class SlowFirstCall:
+    """Returns "slow" after `delay` seconds on the first call, "fast" afterwards."""
+
+    def __init__(self, delay=0.5):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            time.sleep(self.delay)
+            return "slow"
+        return "fast"
+
+
+def test_hedge_is_not_fired_for_fast_calls():
+    fn = SlowFirstCall(delay=0)
+    assert hedged(fn, 0.5) == "slow"
+    assert fn.calls == 1
+    assert hedged(fn, None) == "fast"
+
+
+def test_hedge_fires_after_the_delay_and_the_first_result_wins():
+    fn = SlowFirstCall()
+    started = time.monotonic()
+    assert hedged(fn, 0.05) == "fast"
+    assert fn.calls == 2
+    # The slow call is not waited for
+    assert time.monotonic() - started < 0.4
+
+
+def test_hedge_raises_only_when_both_calls_fail():
+    calls = []
+
+    def fails_first():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise RuntimeError("first")
+        time.sleep(0.2)
+        return "second"
+
+    assert hedged(fails_first, 0.05) == "second"
+
+    def always_fails():
+        time.sleep(0.1)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        hedged(always_fails, 0.05)
+
+
+def test_ahedged_cancels_the_loser():
+    cancelled = []
+    calls = []
+
+    async def search():
+        calls.append(1)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+        return "fast"
+
+    async def run():
+        started = time.monotonic()
+        result = await ahedged(search, 0.05)
+        await asyncio.sleep(0)
+        return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "fast"
+    assert elapsed < 1
+    assert len(calls) == 2
+    assert cancelled == [1]
+
+
+def test_ahedged_without_delay_runs_once():
+    calls = []
+
+    async def search():
+        calls.append(1)
+        return "ok"
+
+    assert asyncio.run(ahedged(search, None)) == "ok"
+    assert asyncio.run(ahedged(search, 1.0)) == "ok"
+    assert len(calls) == 2
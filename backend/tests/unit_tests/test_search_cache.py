@@ -0,0 +1,168 @@
+import asyncio
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from agent import search_cache as search_cache_module
+from agent.search_cache import (
+    InMemorySearchCache,
+    SQLiteSearchCache,
+    get_search_cache,
+    payload_to_response,
+    response_to_payload,
+    search_cache_key,
+)
+
+
+def _web(uri, title):
+    return SimpleNamespace(web=SimpleNamespace(uri=uri, title=title))
+
+
+def _support(start, end, indices):
+    segment = SimpleNamespace(start_index=start, end_index=end)
+    return SimpleNamespace(segment=segment, grounding_chunk_indices=indices)
+
+
+def _response(text="Solar grew. Wind too."):
+    # Chunk 1 is not a web chunk, so the indices after it shift down by one
+    metadata = SimpleNamespace(
+        grounding_chunks=[
+            _web("https://a", "a.example"),
+            SimpleNamespace(web=None),
+            _web("https://b", "b.example"),
+        ],
+        grounding_supports=[
+            _support(0, 11, [0, 2]),
+            _support(12, 21, [1, 2]),
+            SimpleNamespace(segment=None, grounding_chunk_indices=[0]),
+        ],
+    )
+    return SimpleNamespace(
+        text=text, candidates=[SimpleNamespace(grounding_metadata=metadata)]
+    )
+
+
+PAYLOAD = {
+    "text": "Solar grew. Wind too.",
+    "chunks": [
+        {"uri": "https://a", "title": "a.example"},
+        {"uri": "https://b", "title": "b.example"},
+    ],
+    "supports": [
+        {"start_index": 0, "end_index": 11, "grounding_chunk_indices": [0, 1]},
+        {"start_index": 12, "end_index": 21, "grounding_chunk_indices": [1]},
+    ],
+}
+
+
+def test_response_to_payload_remaps_support_indices():
+    assert response_to_payload(_response()) == PAYLOAD
+
+
+def test_payload_round_trips_through_a_response():
+    response = payload_to_response(PAYLOAD)
+    assert response.text == PAYLOAD["text"]
+    metadata = response.candidates[0].grounding_metadata
+    assert [chunk.web.uri for chunk in metadata.grounding_chunks] == [
+        "https://a",
+        "https://b",
+    ]
+    assert response_to_payload(response) == PAYLOAD
+
+
+def test_key_normalizes_the_query_and_buckets_by_day():
+    day = date(2025, 1, 2)
+    assert search_cache_key("Solar growth?", "m", day) == search_cache_key(
+        "  solar   GROWTH ", "m", day
+    )
+    assert search_cache_key("solar", "m", day) != search_cache_key("solar", "n", day)
+    assert search_cache_key("solar", "m", day) != search_cache_key(
+        "solar", "m", date(2025, 1, 3)
+    )
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = InMemorySearchCache(ttl_seconds=60, max_size=2)
+    cache.set("a", _response("a"))
+    cache.set("b", _response("b"))
+    assert cache.get("a").text == "a"
+    cache.set("c", _response("c"))
+    assert cache.get("b") is None
+    assert cache.get("a").text == "a"
+    assert cache.get("c").text == "c"
+    assert cache.stats() == {
+        "hits": 3,
+        "misses": 1,
+        "hit_rate": 0.75,
+        "evictions": 1,
+        "size": 2,
+    }
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search_cache_module.time, "time", lambda: now[0])
+    cache = InMemorySearchCache(ttl_seconds=10, max_size=8)
+    cache.set("a", _response())
+    now[0] += 10
+    assert cache.get("a") is not None
+    now[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_concurrent_lookups_count_every_hit():
+    cache = InMemorySearchCache(ttl_seconds=60, max_size=8)
+    cache.set("a", _response())
+
+    def lookups():
+        for _ in range(50):
+            cache.get("a")
+            cache.get("missing")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["hits"] == 400
+    assert cache.stats()["misses"] == 400
+
+
+def test_sqlite_cache_round_trip_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "search.sqlite3")
+    SQLiteSearchCache(path, ttl_seconds=60, max_size=8).set("a", _response())
+    # Another worker process opening the same file
+    cache = SQLiteSearchCache(path, ttl_seconds=60, max_size=8)
+    response = asyncio.run(cache.aget("a"))
+    assert response_to_payload(response) == PAYLOAD
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_cache_evicts_and_expires(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search_cache_module.time, "time", lambda: now[0])
+    cache = SQLiteSearchCache(str(tmp_path / "search.sqlite3"), 10, max_size=2)
+    for key in "abc":
+        now[0] += 1
+        cache.set(key, _response(key))
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+    now[0] += 10
+    assert cache.get("b") is None
+    assert cache.get("c").text == "c"
+
+
+def test_get_search_cache():
+    assert get_search_cache("none", "", 60, 8) is None
+    assert get_search_cache("memory", "", 0, 8) is None
+    cache = get_search_cache("memory", "", 61, 8)
+    assert isinstance(cache, InMemorySearchCache)
+    assert get_search_cache("memory", "", 61, 8) is cache
+    with pytest.raises(ValueError):
+        get_search_cache("redis", "", 60, 8)
@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+from google.genai.types import GenerateContentResponse
+
+from agent import graph
+from agent.configuration import Configuration
+from agent.search_cache import response_to_payload
+from agent.search_stream import GroundedStream
+
+TEXT = "Solar grew 10% in 2024. Wind grew 5%. Storage doubled."
+SOLAR = {"uri": "https://grounding.example/solar", "title": "solar.example"}
+WIND = {"uri": "https://grounding.example/wind", "title": "wind.example"}
+STORAGE = {"uri": "https://grounding.example/storage", "title": "storage.example"}
+USAGE = {"prompt_token_count": 12, "candidates_token_count": 20}
+
+
+def _support(text, chunk_indices):
+    start = TEXT.index(text)
+    return {
+        "segment": {"start_index": start, "end_index": start + len(text)},
+        "grounding_chunk_indices": chunk_indices,
+    }
+
+
+def _response(text, chunks=None, supports=None, usage=None):
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if chunks is not None:
+        candidate["grounding_metadata"] = {
+            "grounding_chunks": chunks,
+            "grounding_supports": supports or [],
+        }
+    return GenerateContentResponse.model_validate(
+        {"candidates": [candidate], "usage_metadata": usage}
+    )
+
+
+# The non-streamed response of the search
+FIXTURE = _response(
+    TEXT,
+    [{"web": SOLAR}, {"web": WIND}, {"web": STORAGE}],
+    [
+        _support("Solar grew 10% in 2024.", [0]),
+        _support("Wind grew 5%.", [1, 0]),
+        _support("Storage doubled.", [2]),
+    ],
+    USAGE,
+)
+
+# The same response streamed: each chunk carries its own grounding chunks, which
+# its supports index, while the segments index the complete text
+STREAM = [
+    _response("Solar grew 10% "),
+    _response(
+        "in 2024. Wind grew",
+        [{"web": SOLAR}],
+        [_support("Solar grew 10% in 2024.", [0])],
+    ),
+    _response(
+        " 5%. Storage doubled.",
+        [
+            {"retrieved_context": {"uri": "gs://bucket/doc", "title": "doc"}},
+            {"web": WIND},
+            {"web": SOLAR},
+            {"web": STORAGE},
+        ],
+        [
+            _support("Wind grew 5%.", [1, 2]),
+            _support("Storage doubled.", [3, 0]),
+        ],
+        USAGE,
+    ),
+]
+
+
+def test_stream_builds_the_non_streamed_response():
+    events = []
+    stream = GroundedStream(events.append)
+    for chunk in STREAM:
+        stream.feed(chunk)
+    response = stream.response()
+    assert response.text == TEXT
+    assert response_to_payload(response) == response_to_payload(FIXTURE)
+    assert response.usage_metadata == FIXTURE.usage_metadata
+    assert events == [
+        {"delta": "Solar grew 10% "},
+        {"delta": "in 2024. Wind grew"},
+        {"sources": [{"label": "solar.example", "value": SOLAR["uri"]}]},
+        {"delta": " 5%. Storage doubled."},
+        {
+            "sources": [
+                {"label": "wind.example", "value": WIND["uri"]},
+                {"label": "storage.example", "value": STORAGE["uri"]},
+            ]
+        },
+    ]
+
+
+class _FakeModels:
+    def generate_content(self, **request):
+        return FIXTURE
+
+    def generate_content_stream(self, **request):
+        return iter(STREAM)
+
+
+def test_streamed_web_research_matches_the_non_streamed_update(monkeypatch):
+    client = SimpleNamespace(models=_FakeModels())
+    monkeypatch.setattr(graph, "get_genai_client", lambda: client)
+    state = {"search_query": "renewables growth 2024", "id": 3}
+    updates, events = [], []
+    for stream_web_research in (False, True):
+        configurable = Configuration(stream_web_research=stream_web_research)
+        response = graph._generate_search(state, configurable, events.append)
+        updates.append(graph._web_research_update(state, response))
+    streamed, non_streamed = updates[1], updates[0]
+    assert streamed == non_streamed
+    assert "[solar](" in streamed["web_research_result"][0]
+    # Only the streamed search emits progress events
+    assert events[0] == {
+        "node": "web_research",
+        "id": 3,
+        "search_query": "renewables growth 2024",
+        "delta": "Solar grew 10% ",
+    }
@@ -0,0 +1,69 @@
+import pytest
+
+from agent.utils import SHORT_URL_PREFIX, ShortUrlRewriter, expand_short_urls
+
+SOURCES = [
+    {
+        "label": "a",
+        "short_url": f"{SHORT_URL_PREFIX}0-1",
+        "value": "https://a.example/1",
+    },
+    {
+        "label": "b",
+        "short_url": f"{SHORT_URL_PREFIX}0-12",
+        "value": "https://b.example/12",
+    },
+    {
+        "label": "c",
+        "short_url": f"{SHORT_URL_PREFIX}3-4",
+        "value": "https://c.example/4",
+    },
+]
+TEXT = (
+    f"Solar grew [a]({SHORT_URL_PREFIX}0-1). Storage too [b]({SHORT_URL_PREFIX}0-12),"
+    f" wind not [x]({SHORT_URL_PREFIX}9-9) and [c]({SHORT_URL_PREFIX}3-4)"
+)
+EXPECTED = (
+    "Solar grew [a](https://a.example/1). Storage too [b](https://b.example/12),"
+    f" wind not [x]({SHORT_URL_PREFIX}9-9) and [c](https://c.example/4)"
+)
+
+
+def _stream(chunks):
+    rewriter = ShortUrlRewriter(SOURCES)
+    text = "".join(rewriter.feed(chunk) for chunk in chunks) + rewriter.flush()
+    return text, rewriter.used
+
+
+def test_expands_known_short_urls_only():
+    text, used = expand_short_urls(TEXT, SOURCES)
+    assert text == EXPECTED
+    assert used == {source["short_url"] for source in SOURCES}
+
+
+@pytest.mark.parametrize("offset", range(len(TEXT) + 1))
+def test_split_at_every_offset(offset):
+    text, used = _stream([TEXT[:offset], TEXT[offset:]])
+    assert text == EXPECTED
+    assert used == {source["short_url"] for source in SOURCES}
+
+
+def test_one_character_chunks():
+    assert _stream(list(TEXT))[0] == EXPECTED
+
+
+def test_does_not_extend_a_shorter_short_url():
+    # "0-1" must not be rewritten while "0-12" may still be arriving
+    text, used = _stream([f"see {SHORT_URL_PREFIX}0-1", "2 end"])
+    assert text == "see https://b.example/12 end"
+    assert used == {f"{SHORT_URL_PREFIX}0-12"}
+
+
+def test_flush_rewrites_a_short_url_at_the_end():
+    assert _stream([f"end {SHORT_URL_PREFIX}0-1"])[0] == "end https://a.example/1"
+
+
+def test_holds_back_a_partial_prefix_only():
+    rewriter = ShortUrlRewriter(SOURCES)
+    assert rewriter.feed("text https://vertex") == "text "
+    assert rewriter.flush() == "https://vertex"
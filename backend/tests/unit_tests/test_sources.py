@@ -0,0 +1,77 @@
+from agent.sources import (
+    build_source_table,
+    count_cited_urls,
+    expand_source_table,
+    merge_source_tables,
+)
+from agent.utils import SHORT_URL_PREFIX
+
+
+def _source(short_id, label, url):
+    return {"label": label, "short_url": SHORT_URL_PREFIX + short_id, "value": url}
+
+
+def test_build_interns_urls_and_round_trips():
+    sources = [
+        _source("0-0", "a", "https://a"),
+        _source("0-1", "a again", "https://a"),
+        _source("1-0", "b", "https://b"),
+    ]
+    table = build_source_table(
+        sources + [{"label": "x", "short_url": "", "value": "https://x"}]
+    )
+    assert table == {
+        "urls": ["https://a", "https://b"],
+        "sources": {"0-0": ["a", 0], "0-1": ["a again", 0], "1-0": ["b", 1]},
+    }
+    assert expand_source_table(table) == sources
+
+
+def test_merge_deduplicates_urls_and_reindexes_right():
+    left = build_source_table(
+        [_source("0-0", "a", "https://a"), _source("0-1", "b", "https://b")]
+    )
+    right = build_source_table(
+        [_source("1-0", "b", "https://b"), _source("1-1", "c", "https://c")]
+    )
+    merged = merge_source_tables(left, right)
+    assert merged["urls"] == ["https://a", "https://b", "https://c"]
+    assert merged["sources"] == {
+        "0-0": ["a", 0],
+        "0-1": ["b", 1],
+        "1-0": ["b", 1],
+        "1-1": ["c", 2],
+    }
+    # The inputs are not modified
+    assert left["urls"] == ["https://a", "https://b"]
+
+
+def test_merge_right_wins_for_repeated_short_ids():
+    left = build_source_table([_source("0-0", "old", "https://old")])
+    right = build_source_table([_source("0-0", "new", "https://new")])
+    merged = merge_source_tables(left, right)
+    assert expand_source_table(merged) == [_source("0-0", "new", "https://new")]
+
+
+def test_merge_with_empty_tables():
+    table = build_source_table([_source("0-0", "a", "https://a")])
+    assert merge_source_tables(None, table) == table
+    assert merge_source_tables(table, None) == table
+    assert merge_source_tables(None, None) == {"urls": [], "sources": {}}
+
+
+def test_count_cited_urls():
+    table = build_source_table(
+        [
+            _source("0-0", "a", "https://a"),
+            _source("0-1", "a", "https://a"),
+            _source("1-0", "b", "https://b"),
+        ]
+    )
+    texts = [
+        f"x [a]({SHORT_URL_PREFIX}0-0) [a]({SHORT_URL_PREFIX}0-1)",
+        f"y [z]({SHORT_URL_PREFIX}7-7)",
+    ]
+    assert count_cited_urls(table, texts) == 1
+    assert count_cited_urls(table, texts + [f"{SHORT_URL_PREFIX}1-0"]) == 2
+    assert count_cited_urls(None, texts) == 0
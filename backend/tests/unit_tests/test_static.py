@@ -0,0 +1,155 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from agent.static import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    PrecompressedStaticFiles,
+    accepted_encodings,
+)
+
+INDEX = b"<!doctype html><title>app</title>" + b" " * 2000
+SCRIPT = b"console.log('bundle');\n" * 200
+
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / "assets" / "fonts").mkdir(parents=True)
+    (tmp_path / "index.html").write_bytes(INDEX)
+    (tmp_path / "404.html").write_bytes(b"not here")
+    (tmp_path / "assets" / "index-BaX1c2_d.js").write_bytes(SCRIPT)
+    # A precompressed variant from the build is used as is
+    (tmp_path / "assets" / "index-BaX1c2_d.js.br").write_bytes(b"brotli bytes")
+    (tmp_path / "assets" / "fonts" / "inter-0a1b2c3d.woff2").write_bytes(b"font")
+    (tmp_path / "assets" / "logo.svg").write_bytes(b"<svg/>")
+    (tmp_path / "favicon-12345678.ico").write_bytes(b"icon")
+    return tmp_path
+
+
+@pytest.fixture
+def client(build):
+    app = Starlette(routes=[Mount("/app", PrecompressedStaticFiles(build))])
+    return TestClient(app)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, br;q=0.5, *;q=0, deflate;q=x") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "*": 0.0,
+        "deflate": 0.0,
+    }
+
+
+def test_gzip_negotiation(client):
+    response = client.get("/app/", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    # Decoded by the client
+    assert response.content == INDEX
+
+
+def test_identity_when_compression_is_refused(client):
+    for accept in ("identity", "gzip;q=0, br;q=0", "*;q=0"):
+        response = client.get("/app/index.html", headers={"accept-encoding": accept})
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == INDEX
+
+
+def test_brotli_is_preferred(build):
+    static = PrecompressedStaticFiles(build)
+    headers = Headers({"accept-encoding": "gzip, br"})
+    response = static.response("/assets/index-BaX1c2_d.js", headers)
+    assert response.headers["content-encoding"] == "br"
+    assert response.body == b"brotli bytes"
+    response = static.response(
+        "/assets/index-BaX1c2_d.js", Headers({"accept-encoding": "*"})
+    )
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_etag_and_not_modified(client):
+    headers = {"accept-encoding": "gzip"}
+    response = client.get("/app/assets/index-BaX1c2_d.js", headers=headers)
+    etag = response.headers["etag"]
+    assert etag.endswith('-gzip"')
+    assert response.content == SCRIPT
+
+    cached = client.get(
+        "/app/assets/index-BaX1c2_d.js",
+        headers={**headers, "if-none-match": f'W/{etag}, "other"'},
+    )
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    # The identity variant has its own ETag
+    identity = client.get(
+        "/app/assets/index-BaX1c2_d.js",
+        headers={"accept-encoding": "identity", "if-none-match": etag},
+    )
+    assert identity.status_code == 200
+    assert identity.headers["etag"] != etag
+
+
+@pytest.mark.parametrize(
+    "path, cache_control",
+    [
+        ("assets/index-BaX1c2_d.js", IMMUTABLE_CACHE_CONTROL),
+        ("assets/fonts/inter-0a1b2c3d.woff2", IMMUTABLE_CACHE_CONTROL),
+        ("assets/logo.svg", REVALIDATE_CACHE_CONTROL),
+        ("favicon-12345678.ico", REVALIDATE_CACHE_CONTROL),
+        ("index.html", REVALIDATE_CACHE_CONTROL),
+    ],
+)
+def test_only_fingerprinted_assets_are_immutable(client, path, cache_control):
+    response = client.get(f"/app/{path}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == cache_control
+
+
+def test_small_files_are_not_compressed(client):
+    response = client.get("/app/assets/logo.svg", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert response.headers["content-type"] == "image/svg+xml"
+
+
+def test_directories_and_missing_files(client, build):
+    assert client.get("/app").content == INDEX
+    missing = client.get("/app/settings/profile")
+    assert missing.status_code == 404
+    assert missing.content == b"not here"
+    # A 404 is never answered with 304
+    etag = missing.headers["etag"]
+    assert (
+        client.get("/app/missing", headers={"if-none-match": etag}).status_code == 404
+    )
+
+    (build / "404.html").unlink()
+    app = Starlette(routes=[Mount("/app", PrecompressedStaticFiles(build))])
+    assert TestClient(app).get("/app/missing").status_code == 404
+
+
+def test_large_files_are_streamed_from_disk(build):
+    static = PrecompressedStaticFiles(build, max_memory_bytes=1024)
+    response = TestClient(Starlette(routes=[Mount("/app", static)])).get(
+        "/app/assets/index-BaX1c2_d.js", headers={"accept-encoding": "gzip"}
+    )
+    # Only the precompressed brotli variant exists on disk, so gzip isn't offered
+    assert "content-encoding" not in response.headers
+    assert response.content == SCRIPT
+    assert static.stats()["memory_bytes"] < len(SCRIPT)
+
+
+def test_only_get_and_head(client):
+    assert client.post("/app/index.html").status_code == 405
+    head = client.head("/app/index.html")
+    assert head.status_code == 200
+    assert head.content == b""
@@ -0,0 +1,111 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent import graph
+from agent.configuration import Configuration
+from agent.sources import build_source_table
+from agent.sufficiency import key_terms, latest_question, precheck, result_tokens
+from agent.utils import SHORT_URL_PREFIX
+
+QUESTION = "How much did solar capacity grow in Germany?"
+
+
+def _decide(results, source_count=6):
+    return precheck(QUESTION, results, source_count, 0.9, 6, 0.4)
+
+
+def test_key_terms():
+    assert key_terms(QUESTION) == ["much", "solar", "capacity", "grow", "germany"]
+    assert key_terms("What is the latest news?") == ["news"]
+
+
+def test_result_tokens_ignore_citation_links():
+    tokens = result_tokens([f"Solar grew [germany]({SHORT_URL_PREFIX}0-0)."])
+    assert tokens == {"solar", "grew"}
+
+
+def test_sufficient():
+    decision = _decide(["Solar capacity in Germany did grow by much.", "Cheaper."])
+    assert decision == {"coverage": 1.0, "source_count": 6, "is_sufficient": True}
+
+
+def test_full_coverage_needs_enough_sources():
+    results = ["In Germany solar capacity did grow by much"]
+    assert _decide(results, source_count=5)["is_sufficient"] is None
+
+
+def test_insufficient_builds_follow_ups_from_the_missing_terms():
+    decision = _decide(["Solar panels got cheaper."])
+    assert decision["is_sufficient"] is False
+    assert decision["coverage"] == 0.2
+    assert decision["knowledge_gap"] == (
+        "The research does not cover: much, capacity, grow, germany."
+    )
+    assert decision["follow_up_queries"] == [
+        "solar much capacity grow",
+        "solar germany",
+    ]
+
+
+def test_nothing_found_searches_the_question_again():
+    decision = _decide(["Wind turbines."])
+    assert decision["follow_up_queries"] == ["much solar capacity grow germany"]
+
+
+def test_latest_question():
+    messages = [
+        HumanMessage(content="first"),
+        AIMessage(content="answer"),
+        HumanMessage(content="second"),
+        AIMessage(content="answer"),
+    ]
+    assert latest_question(messages) == "second"
+    assert latest_question([AIMessage(content="answer")]) is None
+    assert latest_question([HumanMessage(content=[{"type": "text"}])]) is None
+
+
+def _sources(branch, count):
+    return [
+        {
+            "label": f"s{idx}",
+            "short_url": f"{SHORT_URL_PREFIX}{branch}-{idx}",
+            "value": f"https://{branch}.example/{idx}",
+        }
+        for idx in range(count)
+    ]
+
+
+def _cited(text, sources):
+    return text + "".join(f" [s]({source['short_url']})" for source in sources)
+
+
+def _multi_turn_state():
+    # The first turn researched wind with six sources; this turn's question is new
+    wind, solar = _sources(0, 6), _sources(1, 2)
+    return {
+        "messages": [
+            HumanMessage(content="How fast is offshore wind growing?"),
+            AIMessage(content="Quickly."),
+            HumanMessage(content=QUESTION),
+        ],
+        "search_query": ["offshore wind growth", "german solar capacity"],
+        "web_research_result": [
+            _cited("Offshore wind grows in Germany: much capacity", wind),
+            _cited("Solar panels got cheaper.", solar),
+        ],
+        "source_table": build_source_table(wind + solar),
+        "turn_result_offset": 1,
+    }
+
+
+def test_multi_turn_precheck_only_counts_this_turns_research():
+    configurable = Configuration(sufficiency_precheck=True)
+    update = graph._precheck_reflection(_multi_turn_state(), configurable)
+    # The earlier turn's terms and sources would have made this look covered
+    assert update["is_sufficient"] is False
+    assert update["reflection_decisions"][0]["decided_by"] == "precheck"
+    assert update["reflection_decisions"][0]["source_count"] == 2
+    assert update["follow_up_queries"]
+
+
+def test_precheck_is_off_by_default():
+    assert graph._precheck_reflection(_multi_turn_state(), Configuration()) is None
@@ -13,6 +13,11 @@ export default function App() {
   const [historicalActivities, setHistoricalActivities] = useState<
     Record<string, ProcessedEvent[]>
   >({});
+  const [streamingAnswer, setStreamingAnswer] = useState("");
+  // Partial research of streaming web_research branches, by search query
+  const [streamingResearch, setStreamingResearch] = useState<
+    Record<string, { text: string; sources: string[] }>
+  >({});
   const scrollAreaRef = useRef<HTMLDivElement>(null);
   const hasFinalizeEventOccurredRef = useRef(false);
   const [error, setError] = useState<string | null>(null);
@@ -35,10 +40,13 @@ export default function App() {
           data: event.generate_query?.search_query?.join(", ") || "",
         };
       } else if (event.web_research) {
-        const sources = event.web_research.sources_gathered || [];
+        // Sources arrive interned: short id -> [label, url index]
+        const sources: [string, number][] = Object.values(
+          event.web_research.source_table?.sources || {}
+        );
         const numSources = sources.length;
         const uniqueLabels = [
-          ...new Set(sources.map((s: any) => s.label).filter(Boolean)),
+          ...new Set(sources.map(([label]) => label).filter(Boolean)),
         ];
         const exampleLabels = uniqueLabels.slice(0, 3).join(", ");
         processedEvent = {
@@ -47,6 +55,13 @@ export default function App() {
             exampleLabels || "N/A"
           }.`,
         };
+        // The branch finished, so its partial research is replaced by this event
+        const [query] = event.web_research.search_query || [];
+        setStreamingResearch((prev) => {
+          const rest = { ...prev };
+          delete rest[query];
+          return rest;
+        });
       } else if (event.reflection) {
         processedEvent = {
           title: "Reflection",
@@ -58,6 +73,8 @@ export default function App() {
           data: "Composing and presenting the final answer.",
         };
         hasFinalizeEventOccurredRef.current = true;
+        // The final message replaces the streamed preview
+        setStreamingAnswer("");
       }
       if (processedEvent) {
         setProcessedEventsTimeline((prevEvents) => [
@@ -66,6 +83,34 @@ export default function App() {
         ]);
       }
     },
+    onCustomEvent: (event: any) => {
+      // A retried answer is streamed again from the start
+      if (event?.node === "finalize_answer" && event.answer_reset) {
+        setStreamingAnswer("");
+      }
+      // Answer tokens streamed by finalize_answer, with source urls already expanded
+      if (event?.node === "finalize_answer" && event.delta) {
+        setStreamingAnswer((prev) => prev + event.delta);
+      }
+      // Partial text and sources of a web_research branch with streaming enabled
+      if (event?.node === "web_research" && event.search_query) {
+        setStreamingResearch((prev) => {
+          const current = prev[event.search_query] || { text: "", sources: [] };
+          return {
+            ...prev,
+            [event.search_query]: {
+              text: current.text + (event.delta || ""),
+              sources: [
+                ...current.sources,
+                ...(event.sources || []).map(
+                  (source: { label: string }) => source.label
+                ),
+              ],
+            },
+          };
+        });
+      }
+    },
     onError: (error: any) => {
       setError(error.message);
     },
@@ -80,7 +125,7 @@ export default function App() {
         scrollViewport.scrollTop = scrollViewport.scrollHeight;
       }
     }
-  }, [thread.messages]);
+  }, [thread.messages, streamingAnswer]);
 
   useEffect(() => {
     if (
@@ -103,6 +148,8 @@ export default function App() {
     (submittedInputValue: string, effort: string, model: string) => {
       if (!submittedInputValue.trim()) return;
       setProcessedEventsTimeline([]);
+      setStreamingAnswer("");
+      setStreamingResearch({});
       hasFinalizeEventOccurredRef.current = false;
 
       // convert effort to, initial_search_query_count and max_research_loops
@@ -144,6 +191,23 @@ export default function App() {
     [thread]
   );
 
+  // Branches still researching are shown after the completed steps
+  const liveActivityEvents: ProcessedEvent[] = [
+    ...processedEventsTimeline,
+    ...Object.entries(streamingResearch).map(([query, research]) => ({
+      title: "Web Research (in progress)",
+      data: `${query}: ${
+        research.text.length > 160
+          ? "…" + research.text.slice(-160)
+          : research.text
+      }${
+        research.sources.length
+          ? ` (${research.sources.length} sources so far)`
+          : ""
+      }`,
+    })),
+  ];
+
   const handleCancel = useCallback(() => {
     thread.stop();
     window.location.reload();
@@ -179,8 +243,9 @@ export default function App() {
               scrollAreaRef={scrollAreaRef}
               onSubmit={handleSubmit}
               onCancel={handleCancel}
-              liveActivityEvents={processedEventsTimeline}
+              liveActivityEvents={liveActivityEvents}
               historicalActivities={historicalActivities}
+              streamingAnswer={streamingAnswer}
             />
           )}
       </main>
@@ -230,6 +230,7 @@ interface ChatMessagesViewProps {
   onCancel: () => void;
   liveActivityEvents: ProcessedEvent[];
   historicalActivities: Record<string, ProcessedEvent[]>;
+  streamingAnswer: string;
 }
 
 export function ChatMessagesView({
@@ -240,6 +241,7 @@ export function ChatMessagesView({
   onCancel,
   liveActivityEvents,
   historicalActivities,
+  streamingAnswer,
 }: ChatMessagesViewProps) {
   const [copiedMessageId, setCopiedMessageId] = useState<string | null>(null);
 
@@ -300,12 +302,19 @@ export function ChatMessagesView({
                         isLoading={true}
                       />
                     </div>
-                  ) : (
+                  ) : streamingAnswer ? null : (
                     <div className="flex items-center justify-start h-full">
                       <Loader2 className="h-5 w-5 animate-spin text-neutral-400 mr-2" />
                       <span>Processing...</span>
                     </div>
                   )}
+                  {streamingAnswer && (
+                    <div className="mt-3 border-t border-neutral-700 pt-3">
+                      <ReactMarkdown components={mdComponents}>
+                        {streamingAnswer}
+                      </ReactMarkdown>
+                    </div>
+                  )}
                 </div>
               </div>
             )}